@@ -0,0 +1,210 @@
+"""
+Time each stage of a conversion at production-like scale.
+
+    python bench/bench_convert.py --rows 1000,100000 --formats csv,xlsx
+    python bench/bench_convert.py --rows 10000000 --formats csv --json big.json
+
+Tables come from test/test_write.py's synthetic generator and are kept in
+--data-dir between runs. Every (format, size) runs in a fresh process so its
+peak RSS is its own. The stages are measured as cumulative passes over the
+file, which keeps memory flat however large the table is:
+
+    load        iterate the row source
+    mapping     + pick the mapped columns out of each row
+    escape_fold + escape and fold every mapped value
+    render      + render each row to a vCard (load + ColumnPlan.render)
+    write       + write the cards through VCardWriter
+
+Per-stage seconds and rows/sec, end-to-end throughput and the run's peak
+RSS are appended to --json so runs can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "test"))
+
+from column_plan import ColumnPlan, resolve_mapping  # noqa: E402
+from row_source import open_rows  # noqa: E402
+from vcard_encoding import escape_value, fold_line  # noqa: E402
+from vcard_writer import VCardWriter  # noqa: E402
+
+MAPPING = {
+    "first_name": "Name",
+    "last_name": "Surname",
+    "phone": ["Phone", "Work Phone", "Home Phone"],
+    "phone_types": ["CELL", "WORK", "HOME"],
+    "email": "Email",
+    "address": "Address",
+    "org": "Company",
+    "title": "Title",
+    "url": "Website",
+}
+
+
+def peak_rss_kb():
+    # VmHWM starts over at exec, ru_maxrss keeps the high-water mark of the
+    # forked parent (which may just have generated a big table)
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_stages(path, out):
+    """
+    Run the cumulative passes over `path`, returns {stage: seconds}.
+    """
+    source = open_rows(path)
+    plan = ColumnPlan(source.headers, resolve_mapping(MAPPING, source.headers))
+    positions = [i for i in plan.positions.values() if i is not None]
+    positions += [i for i, _ in plan.phones]
+
+    def load():
+        for _ in source:
+            pass
+
+    def mapping():
+        for row in source:
+            [row[i] for i in positions]
+
+    def escape_fold():
+        for row in source:
+            [fold_line(escape_value(row[i])) for i in positions]
+
+    def render():
+        for row in source:
+            plan.render(row)
+
+    def write():
+        with VCardWriter(out) as writer:
+            for row in source:
+                writer.write(plan.render(row))
+
+    times = {}
+    for name, stage in [
+        ("load", load),
+        ("mapping", mapping),
+        ("escape_fold", escape_fold),
+        ("render", render),
+        ("write", write),
+    ]:
+        start = time.perf_counter()
+        stage()
+        times[name] = time.perf_counter() - start
+    return times
+
+
+def child(path, rows):
+    out = path + ".vcf"
+    try:
+        totals = run_stages(path, out)
+    finally:
+        if os.path.exists(out):
+            os.remove(out)
+    # every pass includes the load, the stage's own cost is the difference
+    # (clamped, timing noise can make a tiny stage come out negative)
+    stages = {
+        "load": totals["load"],
+        "mapping": max(0.0, totals["mapping"] - totals["load"]),
+        "escape_fold": max(0.0, totals["escape_fold"] - totals["mapping"]),
+        "render": max(0.0, totals["render"] - totals["load"]),
+        "write": max(0.0, totals["write"] - totals["render"]),
+    }
+    json.dump(
+        {
+            "rows": rows,
+            "seconds": stages,
+            "rows_per_sec": {k: rows / v if v > 0 else None for k, v in stages.items()},
+            "end_to_end_seconds": totals["write"],
+            "end_to_end_rows_per_sec": rows / totals["write"],
+            "peak_rss_kb": peak_rss_kb(),
+        },
+        sys.stdout,
+    )
+
+
+def ensure_table(data_dir, fmt, rows):
+    from test_write import SYNTHETIC_HEADERS, generate_rows, write_table
+
+    path = os.path.join(data_dir, f"table_{rows}.{fmt}")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"generating {path}", file=sys.stderr)
+        write_table(fmt, path, SYNTHETIC_HEADERS, generate_rows(rows))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="1000,100000", help="comma separated sizes")
+    parser.add_argument("--formats", default="csv,tsv,xlsx,xls,ods,yaml")
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "data"))
+    parser.add_argument("--json", default="bench_results.json")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    results = []
+    for rows in map(int, args.rows.split(",")):
+        for fmt in args.formats.split(","):
+            path = ensure_table(args.data_dir, fmt, rows)
+            if fmt == "xls":
+                from test_write import XLS_MAX_ROWS
+
+                rows_in_file = min(rows, XLS_MAX_ROWS)
+            else:
+                rows_in_file = rows
+            proc = subprocess.run(
+                [sys.executable, __file__, "--child", path, str(rows_in_file)],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode:
+                print(f"{fmt} {rows}: failed\n{proc.stderr}", file=sys.stderr)
+                continue
+            result = {"format": fmt, **json.loads(proc.stdout)}
+            results.append(result)
+            stages = "  ".join(f"{k}={v:.3f}s" for k, v in result["seconds"].items())
+            print(
+                f"{fmt:>5} {rows_in_file:>9} rows  {stages}  "
+                f"{result['end_to_end_rows_per_sec']:,.0f} rows/sec  "
+                f"peak {result['peak_rss_kb'] / 1024:.0f} MiB"
+            )
+
+    runs = []
+    if os.path.exists(args.json):
+        with open(args.json, encoding="utf-8") as f:
+            runs = json.load(f)
+    runs.append(
+        {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+    )
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(runs, f, indent=2)
+    print(f"results appended to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
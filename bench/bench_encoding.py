@@ -0,0 +1,63 @@
+"""
+Micro-benchmark of vcard_encoding against the escape/fold helpers it replaced.
+
+    python bench/bench_encoding.py [--number N]
+"""
+
+import argparse
+import os
+import sys
+import textwrap
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vcard_encoding import escape_value, fold_line  # noqa: E402
+
+
+def legacy_escape_value(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def legacy_fold_line(line: str) -> str:
+    if len(line) <= 75:
+        return line
+    parts = textwrap.wrap(line, width=75)
+    return "\r\n".join([parts[0]] + [" " + part for part in parts[1:]])
+
+
+VALUES = {
+    "short ascii": "Alice Johnson",
+    "with specials": "ACME, Inc; Sales\\Ops\nFloor 2",
+    "long ascii": "42 Long Street, Springfield; " * 8,
+    "long unicode": "東京都千代田区丸の内, " * 10,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'case':<16}{'function':<8}{'legacy µs':>12}{'new µs':>10}{'speedup':>9}")
+    for case, value in VALUES.items():
+        line = "ADR;TYPE=HOME:;;" + value
+        for name, old, new, arg in [
+            ("escape", legacy_escape_value, escape_value, value),
+            ("fold", legacy_fold_line, fold_line, line),
+        ]:
+            t_old = timeit.timeit(lambda: old(arg), number=args.number)
+            t_new = timeit.timeit(lambda: new(arg), number=args.number)
+            print(
+                f"{case:<16}{name:<8}{t_old / args.number * 1e6:>12.3f}"
+                f"{t_new / args.number * 1e6:>10.3f}{t_old / t_new:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Latency of one field-mapping change in the GUI against the table's width.
+
+    python bench/bench_mapping.py --columns 10,100,300,1000 --fields 12
+
+toga isn't needed: Selection below stands in for toga.Selection and its
+ListSource, making a row object and a listener call per item, which is the
+work a real backend repeats per item when a list changes. Each click maps a
+random field to a random free column (or to nothing) and is timed with both
+ways of updating the dropdowns:
+
+    rebuild      what the app did, rescan every selection and reassign the
+                 items of all of them
+    incremental  mapping_model.ColumnAvailability, apply only its edits
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "vCarder", "src"))
+
+from vCarder.mapping_model import INSERT, ColumnAvailability  # noqa: E402
+
+
+class Row:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Selection:
+    def __init__(self, items):
+        self.value = None
+        self.notified = 0
+        self.items = items
+
+    @property
+    def items(self):
+        return self._rows
+
+    @items.setter
+    def items(self, values):
+        self._rows = []
+        self.notify()
+        for value in values:
+            self.insert(len(self._rows), value)
+
+    def insert(self, index, value):
+        self._rows.insert(index, Row(value))
+        self.notify()
+
+    def remove(self, index):
+        del self._rows[index]
+        self.notify()
+
+    def notify(self):
+        self.notified += 1
+
+
+def rebuild(selections, columns, key, column):
+    # VCarderApp.on_mapping_selection + update_all_dropdowns before the model
+    selections[key].value = column
+    selected = {s.value for s in selections.values() if s.value}
+    cols = [c for c in columns if c not in selected]
+    for sel in selections.values():
+        val = sel.value
+        sel.items = [val] + [c for c in cols if c != val] if val else cols
+        sel.value = val
+
+
+def incremental(selections, model, key, column):
+    selections[key].value = column
+    for field, op, index, col in model.select(key, column):
+        if op == INSERT:
+            selections[field].insert(index, col)
+        else:
+            selections[field].remove(index)
+
+
+def run(columns, fields, clicks, seed):
+    columns = [f"column {i}" for i in range(columns)]
+    keys = [f"field {i}" for i in range(fields)]
+    model = ColumnAvailability(columns)
+    old = {k: Selection(columns) for k in keys}
+    new = {k: Selection(model.add(k)) for k in keys}
+    rng = random.Random(seed)
+    times = {"rebuild": [], "incremental": []}
+    notified = {"rebuild": 0, "incremental": 0}
+    for _ in range(clicks):
+        key = rng.choice(keys)
+        free = [c for c in columns if model.owners.get(c, key) == key]
+        column = rng.choice(free + [None])
+        for name, click, selections in [
+            ("rebuild", lambda: rebuild(old, columns, key, column), old),
+            ("incremental", lambda: incremental(new, model, key, column), new),
+        ]:
+            before = sum(s.notified for s in selections.values())
+            start = time.perf_counter()
+            click()
+            times[name].append(time.perf_counter() - start)
+            notified[name] += sum(s.notified for s in selections.values()) - before
+    return {
+        name: (statistics.median(t), notified[name] / clicks)
+        for name, t in times.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--columns", default="10,100,300,1000")
+    parser.add_argument("--fields", type=int, default=12)
+    parser.add_argument("--clicks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'columns':>8} {'rebuild':>22} {'incremental':>22}")
+    for columns in map(int, args.columns.split(",")):
+        result = run(columns, args.fields, args.clicks, args.seed)
+        cells = [
+            f"{seconds * 1e3:>8.3f} ms {updates:>7.0f} upd"
+            for seconds, updates in result.values()
+        ]
+        print(f"{columns:>8} " + " ".join(f"{c:>22}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Throughput of combining many tables into one export against the number of
+files read at once.
+
+    python bench/bench_multi_source.py --files 8 --rows 50000 --readers 1,2,4,8
+
+--files synthetic CSVs of --rows rows each (test/test_write.py's generator,
+kept in --data-dir) are combined into one file by multi_source.MultiSource
+with each reader count, with reader threads and with reader processes.
+Threads only overlap reading with writing; processes also render in
+parallel, so they should scale with the readers until the CPUs or the disk
+are saturated (os.cpu_count() is printed for reference).
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "test"))
+
+from bench_convert import MAPPING, ensure_table  # noqa: E402
+from multi_source import MultiSource  # noqa: E402
+from vcard_writer import VCardWriter  # noqa: E402
+
+
+def run(paths, readers, processes, out):
+    sources = MultiSource(paths, [MAPPING], readers, processes=processes)
+    start = time.perf_counter()
+    with VCardWriter(out) as writer:
+        cards = sources.write(writer)
+    return cards, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=50000, help="rows per file")
+    parser.add_argument("--readers", default="1,2,4,8", help="comma separated")
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "data"))
+    args = parser.parse_args()
+
+    table = ensure_table(args.data_dir, "csv", args.rows)
+    tmp = tempfile.mkdtemp()
+    try:
+        # distinct files, so the page cache isn't shared between readers
+        paths = []
+        for i in range(args.files):
+            paths.append(os.path.join(tmp, f"part{i}.csv"))
+            shutil.copyfile(table, paths[-1])
+        out = os.path.join(tmp, "all.vcf")
+        print(f"{args.files} files x {args.rows} rows, {os.cpu_count()} CPUs")
+        for readers in map(int, args.readers.split(",")):
+            for processes in (False, True):
+                cards, seconds = run(paths, readers, processes, out)
+                kind = "processes" if processes else "threads"
+                print(
+                    f"{readers:>3} {kind:<9}  {seconds:7.2f}s"
+                    f"  {cards / seconds:>10,.0f} rows/sec"
+                )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
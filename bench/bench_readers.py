@@ -0,0 +1,107 @@
+"""
+Peak memory of reading spreadsheets, streamed vs. tablib, as they grow.
+
+    python bench/bench_readers.py --rows 10000,100000,500000 --formats xlsx,ods
+    python bench/bench_readers.py --readers stream
+
+Tables come from test/test_write.py's synthetic generator and are kept in
+--data-dir between runs. Each (format, size, reader) iterates every row in a
+fresh process and reports the time and that process's peak RSS; a streaming
+reader should stay roughly flat while tablib grows with the file. Results are
+appended to --json.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+from bench_convert import ensure_table, peak_rss_kb  # noqa: E402
+from row_source import TablibRowSource, open_rows  # noqa: E402
+
+READERS = {"stream": open_rows, "tablib": TablibRowSource}
+
+
+def child(path, reader):
+    start = time.perf_counter()
+    rows = sum(1 for _ in READERS[reader](path))
+    json.dump(
+        {
+            "rows": rows,
+            "seconds": time.perf_counter() - start,
+            "peak_rss_kb": peak_rss_kb(),
+        },
+        sys.stdout,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="10000,100000", help="comma separated sizes")
+    parser.add_argument("--formats", default="xlsx,xls,ods")
+    parser.add_argument("--readers", default="stream,tablib")
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "data"))
+    parser.add_argument("--json", default="bench_results.json")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    results = []
+    for rows in map(int, args.rows.split(",")):
+        for fmt in args.formats.split(","):
+            path = ensure_table(args.data_dir, fmt, rows)
+            size = os.path.getsize(path)
+            for reader in args.readers.split(","):
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--child", path, reader],
+                    capture_output=True,
+                    text=True,
+                )
+                if proc.returncode:
+                    print(
+                        f"{fmt} {rows} {reader}: failed\n{proc.stderr}", file=sys.stderr
+                    )
+                    continue
+                result = {
+                    "format": fmt,
+                    "reader": reader,
+                    "file_bytes": size,
+                    **json.loads(proc.stdout),
+                }
+                results.append(result)
+                print(
+                    f"{fmt:>5} {result['rows']:>9} rows {size / 2**20:>8.1f} MiB  "
+                    f"{reader:<7}{result['seconds']:>8.2f}s  "
+                    f"peak {result['peak_rss_kb'] / 1024:.0f} MiB"
+                )
+
+    runs = []
+    if os.path.exists(args.json):
+        with open(args.json, encoding="utf-8") as f:
+            runs = json.load(f)
+    runs.append(
+        {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "benchmark": "readers",
+            "results": results,
+        }
+    )
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(runs, f, indent=2)
+    print(f"results appended to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Memory of buffered contacts, record.ContactRecord against the dicts it replaced.
+
+    python bench/bench_records.py --rows 200000
+
+Rows come from test/test_write.py's synthetic generator (kept in --data-dir)
+and are mapped like bench_convert.py does. Each kind of record is built for
+every row and kept in a list, as dedup or sorting would, and tracemalloc
+reports what the list holds; the cell strings are the same objects either
+way, so the difference is the container overhead. Results are scaled to a
+million contacts, along with the time to build and to render the records.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+from bench_convert import MAPPING, ensure_table  # noqa: E402
+from column_plan import ColumnPlan, resolve_mapping  # noqa: E402
+from main import Contact  # noqa: E402
+from row_source import open_rows  # noqa: E402
+
+
+def legacy_data(plan, row) -> dict:
+    """
+    ColumnPlan.data as it was: a dict per row with a dict per phone.
+    """
+    p = plan.positions
+    data = {f: row[i] if i is not None else "" for f, i in p.items()}
+    if p["formatted_name"] is None:
+        data["formatted_name"] = (
+            row[p["first_name"]] + " " + row[p["last_name"]]
+            if p["last_name"] is not None
+            else ""
+        )
+    data["phone"] = [{"phn": row[i], "typ": typ} for i, typ in plan.phones]
+    return data
+
+
+def measure(rows, build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = [build(row) for row in rows]
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, size, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "data"))
+    args = parser.parse_args()
+
+    source = open_rows(ensure_table(args.data_dir, "csv", args.rows))
+    plan = ColumnPlan(source.headers, resolve_mapping(MAPPING, source.headers))
+    # the cells are read up front so neither kind is charged for them
+    rows = list(source)
+    contact = Contact.__new__(Contact)
+    scale = 1_000_000 / len(rows)
+
+    results = {}
+    for name, build in [
+        ("dict", lambda row: legacy_data(plan, row)),
+        ("ContactRecord", plan.data),
+    ]:
+        records, size, seconds = measure(rows, build)
+        start = time.perf_counter()
+        for record in records:
+            contact.add_contact(record)
+        render = time.perf_counter() - start
+        results[name] = size
+        print(
+            f"{name:<14}{size / len(rows):>7.0f} B/contact"
+            f"{size * scale / 2**20:>8.0f} MiB per million"
+            f"  build {seconds:.2f}s  render {render:.2f}s"
+        )
+        del records
+    saved = (results["dict"] - results["ContactRecord"]) * scale
+    print(f"saved {saved / 2**20:.0f} MiB per million contacts")
+
+
+if __name__ == "__main__":
+    main()
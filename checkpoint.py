@@ -0,0 +1,129 @@
+import json
+import os
+import time
+
+from render_cache import RenderCache
+
+# cards written between checkpoints...
+CHECKPOINT_CARDS = 50000
+# ...or seconds, whichever comes first
+CHECKPOINT_SECONDS = 10.0
+
+
+def checkpoint_path(out) -> str:
+    return os.fspath(out) + ".ckpt"
+
+
+class Checkpoint:
+    """
+    Progress of a conversion to `out`, kept in the sidecar file <out>.ckpt so
+    a run that died can pick up where it left off.
+
+    Every `every_cards` cards or `every_seconds` seconds the output is
+    flushed and fsynced, then the sidecar is replaced (atomically) with the
+    number of rows done, the output's size at that point and what they were
+    produced from: the input's path, size and mtime and a hash of the mapping
+    (see render_cache.RenderCache.mapping_key). restore() checks those still
+    match, truncates the output back to the recorded size (dropping cards
+    written after the checkpoint) and says how many rows to skip. Only
+    exports with one card per row in row order can be resumed, so not
+    deduplicated, sorted or sharded ones. Without `resume`, an earlier
+    run's checkpoint is ignored and the conversion starts over.
+    """
+
+    def __init__(
+        self,
+        out,
+        resume=True,
+        every_cards=CHECKPOINT_CARDS,
+        every_seconds=CHECKPOINT_SECONDS,
+    ):
+        self.out = os.fspath(out)
+        self.path = checkpoint_path(out)
+        self.resume = resume
+        self.every_cards = every_cards
+        self.every_seconds = every_seconds
+        self.state = {}
+        self.resumed = 0
+
+    def _source(self, filePath, plan) -> dict:
+        st = os.stat(filePath)
+        return {
+            "input": os.path.abspath(filePath),
+            "input_size": st.st_size,
+            "input_mtime": st.st_mtime_ns,
+            "mapping": RenderCache.mapping_key(plan).hex(),
+        }
+
+    def restore(self, filePath, plan) -> int:
+        """
+        Rows of `filePath` already converted to `out` by an earlier run with
+        the same mapping (0 when there is nothing to resume); `out` is cut
+        back to the end of the last of them.
+        """
+        source = self._source(filePath, plan)
+        self.state = {**source, "rows": 0, "bytes": 0}
+        if not self.resume:
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if any(saved.get(k) != v for k, v in source.items()):
+            return 0
+        try:
+            if os.path.getsize(self.out) < saved["bytes"]:
+                return 0
+            with open(self.out, "r+b") as f:
+                f.truncate(saved["bytes"])
+        except OSError:
+            return 0
+        self.state.update(rows=saved["rows"], bytes=saved["bytes"])
+        self.resumed = saved["rows"]
+        return self.resumed
+
+    def save(self, rows, size) -> None:
+        self.state.update(rows=rows, bytes=size)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _commit(self, writer, rows):
+        writer.flush()
+        fd = writer.file.fileno()
+        os.fsync(fd)
+        # tell() of a text file is an opaque cookie, the size is in bytes
+        self.save(rows, os.fstat(fd).st_size)
+
+    def track(self, cards, writer):
+        """
+        Yield `cards` (the ones after the restored rows) on their way to
+        `writer`, checkpointing as they are written.
+        """
+        rows = self.resumed
+        pending = 0
+        deadline = time.monotonic() + self.every_seconds
+        for card in cards:
+            yield card
+            # the card is in the writer once the loop asks for the next one
+            rows += 1
+            pending += 1
+            if pending >= self.every_cards or (
+                pending % 256 == 0 and time.monotonic() > deadline
+            ):
+                self._commit(writer, rows)
+                pending = 0
+                deadline = time.monotonic() + self.every_seconds
+
+    def done(self) -> None:
+        """
+        The conversion finished: the sidecar isn't needed any more.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,538 @@
+"""
+Batch conversion of tables to vCards, driven by a saved mapping file.
+
+    python cli.py test/table_data -m mapping.json -o out/
+    python cli.py "exports/*.csv" big.xlsx -m mapping.yaml -o out/ --jobs 4
+    python cli.py exports/ -m mappings.json --combine all.vcf --jobs 4
+
+Exit status: 0 when every file converted, 1 when some failed, 2 for usage
+errors (bad arguments, unreadable mapping file, no input files).
+"""
+
+import argparse
+import glob
+import json
+import locale
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from checkpoint import (
+    CHECKPOINT_CARDS,
+    CHECKPOINT_SECONDS,
+    Checkpoint,
+    checkpoint_path,
+)
+from column_plan import FIELDS, load_mappings, pick_mapping
+from dedup import DEFAULT_MAX_KEY_ROWS, Deduplicator
+from external_sort import DEFAULT_MEMORY, ExternalSorter
+from instrument import Instrumentation
+from main import Contact
+from multi_source import MultiSource
+from phone import PhoneNormalizer
+from photo import PhotoEncoder
+from profiler import profile, suggest_mapping, with_guesses
+from render_cache import RenderCache
+from vcard_writer import ShardedWriter, VCardWriter, remove_shards, shard_paths
+
+EXIT_OK, EXIT_FAILED, EXIT_USAGE = 0, 1, 2
+# appended to an output's name while it is being written
+PART_SUFFIX = ".part"
+# invalid phone numbers quoted in a file's summary
+INVALID_EXAMPLES = 3
+# widely shared phone numbers or emails quoted in a file's summary
+SHARED_EXAMPLES = 3
+
+
+def find_inputs(patterns) -> list:
+    """
+    Expand paths, directories (their files, like test/test_read.py walks
+    table_data/) and glob patterns into a sorted list of unique files.
+    """
+    found = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.isdir(path):
+                found += [
+                    os.path.join(path, name)
+                    for name in sorted(os.listdir(path))
+                    if os.path.isfile(os.path.join(path, name))
+                ]
+            elif os.path.isfile(path):
+                found.append(path)
+    return list(dict.fromkeys(found))
+
+
+def output_names(inputs, outdir) -> dict:
+    """
+    <stem>.vcf for every input, <stem>_<ext>.vcf when stems collide
+    (table.csv and table.xlsx).
+    """
+    stems = [os.path.splitext(os.path.basename(p))[0] for p in inputs]
+    names = {}
+    for path, stem in zip(inputs, stems):
+        if stems.count(stem) > 1:
+            stem += "_" + os.path.splitext(path)[1].lstrip(".").lower()
+        names[path] = os.path.join(outdir, stem + ".vcf")
+    return names
+
+
+def convert_file(path, out, specs, options) -> dict:
+    """
+    Convert one table with the first of the mappings `specs` that fits its
+    headers, returns its summary (an "error" entry when it failed).
+    """
+    start = time.perf_counter()
+    instrument = None
+    if options["stats"]:
+        profile_to = options["profile"]
+        if isinstance(profile_to, str):
+            profile_to = os.path.join(profile_to, os.path.basename(out) + ".prof")
+        instrument = Instrumentation(options["trace_memory"], profile_to)
+    sharded = options["shard_cards"] or options["shard_bytes"]
+    # a single file is written under a temporary name and renamed when it is
+    # complete, so a failed conversion leaves no partial .vcf behind
+    target = out if sharded else out + PART_SUFFIX
+    checkpoint = None
+    started = False
+    try:
+        if instrument is None:
+            obj = Contact(path)
+        else:
+            with instrument.stage("open"):
+                obj = Contact(path)
+        if options["auto_map"]:
+            # the mapping file's fields win over the guessed ones
+            guessed = suggest_mapping(profile(path))
+            specs = [with_guesses(spec, guessed) for spec in specs or [{}]]
+        spec, obj.cols = pick_mapping(specs, obj.table.headers)
+        normalizer = PhoneNormalizer(options["region"]) if options["region"] else None
+        cache = (
+            RenderCache(options["cache"], options["cache_size"] << 20)
+            if options["cache"]
+            else None
+        )
+        sort = None
+        if options["sort_by"]:
+            # again here for worker processes that don't inherit main()'s locale
+            try:
+                ExternalSorter.set_locale(options["sort_locale"] or "")
+            except locale.Error:
+                # the environment's locale isn't installed, main() kept "C" too
+                pass
+            sort = ExternalSorter(options["sort_by"], options["sort_memory"] << 20)
+        dedup = None
+        if options["dedup"]:
+            dedup = Deduplicator(max_key_rows=options["dedup_key_rows"])
+        photos = None
+        if obj.cols.get("photo"):
+            photos = PhotoEncoder(options["photo_size"], os.path.dirname(path))
+        if not (sort or sharded or dedup):
+            checkpoint = Checkpoint(
+                target, options["resume"], every_cards=options["checkpoint_every"]
+            )
+        started = True
+        try:
+            rows = obj.create_vcard(
+                target,
+                normalizer=normalizer,
+                shard_cards=options["shard_cards"],
+                shard_bytes=options["shard_bytes"],
+                instrument=instrument,
+                cache=cache,
+                backend=options["backend"],
+                photos=photos,
+                sort=sort,
+                checkpoint=checkpoint,
+                dedup=dedup,
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+        if target != out:
+            os.replace(target, out)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        # mapping and open errors come before anything is written
+        if not started:
+            return {"input": path, "error": error}
+        if sharded:
+            remove_shards(out)
+        elif checkpoint is not None and os.path.exists(checkpoint.path):
+            # a disk-full or a bad row is what checkpoints are for
+            return {
+                "input": path,
+                "error": error + " (rerun with --resume to continue)",
+            }
+        else:
+            for leftover in (target, checkpoint_path(target)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        return {"input": path, "error": error}
+    seconds = time.perf_counter() - start
+    # a sharded export is found through its manifest, `out` itself isn't written
+    output = shard_paths(out)[0] if sharded else out
+    result = {"input": path, "output": output, "rows": rows, "seconds": seconds}
+    if options["auto_map"]:
+        result["mapping"] = spec
+    if cache is not None:
+        result["cache"] = cache.stats()
+    if normalizer is not None:
+        result["phones"] = normalizer.stats()
+    if photos is not None:
+        result["photos"] = photos.stats()
+    if checkpoint is not None and checkpoint.resumed:
+        result["resumed"] = checkpoint.resumed
+    if sort is not None:
+        result["sort"] = {"runs": sort.runs, "spilled": sort.spilled}
+    if dedup is not None:
+        result["dedup"] = dedup.report
+    if instrument is not None:
+        result["stats"] = instrument.to_dict()
+        result["stats_text"] = instrument.summary()
+    return result
+
+
+def print_invalid(stats):
+    if stats["invalid"]:
+        examples = ", ".join(repr(v) for v in stats["rejected"][:INVALID_EXAMPLES])
+        print(f"  phones: {stats['invalid']} invalid numbers dropped (e.g. {examples})")
+
+
+def print_dedup(report):
+    print(
+        f"  dedup: {report['rows']} rows -> {report['contacts']} contacts,"
+        f" {report['merged_rows']} merged"
+    )
+    if report["skipped_keys"]:
+        examples = ", ".join(
+            f"{key} ({rows} rows)"
+            for key, rows in list(report["shared_keys"].items())[:SHARED_EXAMPLES]
+        )
+        print(
+            f"  dedup: {report['skipped_keys']} shared keys not matched on"
+            f" (e.g. {examples})"
+        )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Convert tables (csv, tsv, xlsx, xls, ods, ...) to vCard files.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="table files, directories or glob patterns"
+    )
+    parser.add_argument(
+        "-m",
+        "--mapping",
+        help="JSON/YAML file naming columns by header, or a list of such mappings"
+        " (each file uses the first that fits its headers)",
+    )
+    parser.add_argument(
+        "--auto-map",
+        action="store_true",
+        help="map columns by profiling a sample of each file,"
+        " fields from --mapping take precedence",
+    )
+    parser.add_argument(
+        "-o", "--output-dir", default=".", help="where the .vcf files are written"
+    )
+    parser.add_argument(
+        "--combine",
+        metavar="OUT.vcf",
+        help="read every input concurrently and write all cards to this one file",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="files converted (or read, with --combine) at once"
+        " (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--region", help="normalize phone numbers to E.164 using this default region"
+    )
+    parser.add_argument("--shard-cards", type=int, help="max cards per output file")
+    parser.add_argument("--shard-bytes", type=int, help="max bytes per output file")
+    parser.add_argument(
+        "--cache",
+        help="SQLite file keeping rendered cards, unchanged rows are reused next run",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="MiB of rendered cards the cache keeps (default: 256)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["auto", "rows", "columnar"],
+        default="auto",
+        help="render row by row, column-wise with pandas, or pick by table (default)",
+    )
+    parser.add_argument(
+        "--photo-size",
+        type=int,
+        metavar="PX",
+        help="scale photos down to fit PX pixels and re-encode them as JPEG"
+        " (needs Pillow)",
+    )
+    parser.add_argument(
+        "--sort-by",
+        metavar="FIELDS",
+        help="order the cards by these comma separated fields"
+        " (e.g. last_name,first_name) instead of by row",
+    )
+    parser.add_argument(
+        "--sort-memory",
+        type=int,
+        default=DEFAULT_MEMORY >> 20,
+        metavar="MIB",
+        help="MiB of cards sorted in memory before spilling a run to disk"
+        f" (default: {DEFAULT_MEMORY >> 20})",
+    )
+    parser.add_argument(
+        "--sort-locale",
+        help="collate names by this locale, e.g. de_DE.UTF-8 (default: LC_COLLATE)",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="merge rows with the same phone number, email or name into one card",
+    )
+    parser.add_argument(
+        "--dedup-key-limit",
+        type=int,
+        default=DEFAULT_MAX_KEY_ROWS,
+        metavar="ROWS",
+        help="phone numbers or emails on more rows than this (a switchboard,"
+        f" info@) aren't matched on (default: {DEFAULT_MAX_KEY_ROWS})",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="carry on from where an interrupted run of the same files and mapping"
+        " left off (unsorted, unsharded exports without --dedup are"
+        " checkpointed as they go)",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=CHECKPOINT_CARDS,
+        metavar="CARDS",
+        help="cards written between checkpoints, taken at least every"
+        f" {CHECKPOINT_SECONDS:g}s too (default: {CHECKPOINT_CARDS})",
+    )
+    parser.add_argument(
+        "--stats",
+        choices=["text", "json"],
+        help="time every stage of each conversion and print it as a table or JSON",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="add each conversion's peak traced memory to --stats (slows it down)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=True,
+        metavar="DIR",
+        help="add each conversion's most expensive functions (cProfile) to"
+        " --stats, with DIR also saving <output>.prof files there",
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.mapping and not args.auto_map:
+        print("error: pass a mapping file (-m) or --auto-map", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        specs = load_mappings(args.mapping) if args.mapping else []
+    except (OSError, ValueError) as e:
+        print(f"error: cannot read mapping {args.mapping}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    sort_by = None
+    if args.sort_by:
+        sort_by = [f.strip() for f in args.sort_by.split(",") if f.strip()]
+        unknown = [f for f in sort_by if f not in FIELDS or f == "phone"]
+        if unknown:
+            print(f"error: cannot sort by {', '.join(unknown)}", file=sys.stderr)
+            return EXIT_USAGE
+    if sort_by or args.sort_locale:
+        # collate by --sort-locale, or the user's locale rather than Python's "C"
+        try:
+            ExternalSorter.set_locale(args.sort_locale or "")
+        except locale.Error as e:
+            if args.sort_locale:
+                print(f"error: locale {args.sort_locale}: {e}", file=sys.stderr)
+                return EXIT_USAGE
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        print("error: no input files found", file=sys.stderr)
+        return EXIT_USAGE
+    if args.combine:
+        return combine(inputs, specs, args)
+    os.makedirs(args.output_dir, exist_ok=True)
+    if isinstance(args.profile, str):
+        os.makedirs(args.profile, exist_ok=True)
+    # memory and profiling figures are printed with the stage timings
+    if (args.trace_memory or args.profile) and not args.stats:
+        args.stats = "text"
+    outputs = output_names(inputs, args.output_dir)
+    options = {
+        "region": args.region,
+        "shard_cards": args.shard_cards,
+        "shard_bytes": args.shard_bytes,
+        "stats": args.stats,
+        "trace_memory": args.trace_memory,
+        "profile": args.profile,
+        "cache": args.cache,
+        "cache_size": args.cache_size,
+        "backend": args.backend,
+        "photo_size": args.photo_size,
+        "auto_map": args.auto_map,
+        "sort_by": sort_by,
+        "sort_memory": args.sort_memory,
+        "sort_locale": args.sort_locale,
+        "resume": args.resume,
+        "checkpoint_every": args.checkpoint_every,
+        "dedup": args.dedup,
+        "dedup_key_rows": args.dedup_key_limit,
+    }
+
+    jobs = min(args.jobs or os.cpu_count() or 1, len(inputs))
+    if jobs == 1:
+        results = (convert_file(p, outputs[p], specs, options) for p in inputs)
+    else:
+        pool = ProcessPoolExecutor(jobs)
+        results = pool.map(
+            convert_file,
+            inputs,
+            [outputs[p] for p in inputs],
+            [specs] * len(inputs),
+            [options] * len(inputs),
+        )
+
+    failed = 0
+    for result in results:
+        if "error" in result:
+            failed += 1
+            print(f"{result['input']}: FAILED {result['error']}")
+            continue
+        # rows converted by this run, not the ones a resumed run had done
+        done = result["rows"] - result.get("resumed", 0)
+        rate = done / result["seconds"] if result["seconds"] else 0
+        print(
+            f"{result['input']} -> {result['output']}: {result['rows']} rows"
+            f" in {result['seconds']:.2f}s ({rate:,.0f} rows/sec)"
+        )
+        if "mapping" in result:
+            fields = ", ".join(f"{k}={v}" for k, v in result["mapping"].items())
+            print(f"  mapping: {fields}")
+        if "resumed" in result:
+            print(f"  resumed after {result['resumed']} rows")
+        if "sort" in result:
+            sort = result["sort"]
+            print(
+                f"  sort: {sort['runs']} runs,"
+                f" {sort['spilled'] / 2**20:.1f} MiB spilled to disk"
+            )
+        if "dedup" in result:
+            print_dedup(result["dedup"])
+        if "cache" in result:
+            cache = result["cache"]
+            print(
+                f"  cache: {cache['hits']} hits, {cache['misses']} rendered"
+                f" ({cache['hit_rate']:.1%} hit rate), {cache['evicted']} evicted"
+            )
+        if "phones" in result:
+            print_invalid(result["phones"])
+        if "photos" in result:
+            photos = result["photos"]
+            print(f"  photos: {photos['encoded']} encoded, {photos['missing']} missing")
+        if args.stats == "text":
+            print(result["stats_text"])
+        elif args.stats == "json":
+            print(json.dumps({"input": result["input"], **result["stats"]}))
+    if jobs > 1:
+        pool.shutdown()
+    print(f"{len(inputs) - failed}/{len(inputs)} files converted")
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def combine(inputs, specs, args) -> int:
+    """
+    The --combine mode: every input into the one file args.combine, see
+    multi_source.MultiSource.
+    """
+    unsupported = [
+        flag
+        for flag, value in [
+            ("--sort-by", args.sort_by),
+            ("--cache", args.cache),
+            ("--stats", args.stats),
+            ("--trace-memory", args.trace_memory),
+            ("--profile", args.profile),
+            ("--resume", args.resume),
+            ("--dedup", args.dedup),
+        ]
+        if value
+    ]
+    if unsupported:
+        print(
+            f"error: --combine can't be used with {', '.join(unsupported)}",
+            file=sys.stderr,
+        )
+        return EXIT_USAGE
+    readers = min(args.jobs or os.cpu_count() or 1, len(inputs))
+    normalizer = PhoneNormalizer(args.region) if args.region else None
+    sources = MultiSource(
+        inputs,
+        specs,
+        readers,
+        # threads only overlap reading; processes also spread the parsing
+        # and rendering over the CPUs
+        processes=readers > 1,
+        normalizer=normalizer,
+        photo_size=args.photo_size,
+        auto_map=args.auto_map,
+    )
+    start = time.perf_counter()
+    if args.shard_cards or args.shard_bytes:
+        writer = ShardedWriter(args.combine, args.shard_cards, args.shard_bytes)
+    else:
+        writer = VCardWriter(args.combine)
+    with writer:
+        sources.write(writer)
+    seconds = time.perf_counter() - start
+    failed = 0
+    for result in sources.results:
+        if "partial" in result:
+            failed += 1
+            print(
+                f"{result['input']}: FAILED after {result['rows']} rows were"
+                f" written: {result['error']}"
+            )
+        elif "error" in result:
+            failed += 1
+            print(f"{result['input']}: FAILED {result['error']}")
+        else:
+            print(f"{result['input']}: {result['rows']} rows")
+    if normalizer is not None:
+        print_invalid(normalizer.stats())
+    rate = writer.count / seconds if seconds else 0
+    print(
+        f"{len(inputs) - failed}/{len(inputs)} files -> {args.combine}:"
+        f" {writer.count} cards in {seconds:.2f}s ({rate:,.0f} rows/sec)"
+    )
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
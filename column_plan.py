@@ -0,0 +1,266 @@
+import json
+import os
+
+import yaml
+
+from photo import PhotoEncoder
+from record import ContactRecord, Phone
+from record import FIELDS as RECORD_FIELDS
+from vcard_encoding import escape_value, fold_line
+
+# keys of the mapping built by Contact.select_col, phone is [[columns], [types]]
+FIELDS = [
+    "first_name",
+    "last_name",
+    "formatted_name",
+    "additional_names",
+    "prefix",
+    "suffix",
+    "phone",
+    "email",
+    "address",
+    "url",
+    "bday",
+    "org",
+    "title",
+    "photo",
+]
+# TEL types select_col accepts, anything else becomes CELL
+PHONE_TYPES = ["CELL", "WORK", "HOME", "VOICE"]
+
+_FORMATTED_NAME = RECORD_FIELDS.index("formatted_name")
+# (field, text before and after the value) of the properties written only
+# when their cell isn't empty, in add_contact's order
+OPTIONAL_PROPERTIES = [
+    ("email", "EMAIL;TYPE=INTERNET,PREF:", ""),
+    ("address", "ADR;TYPE=HOME:;;", ";;;;"),
+    ("org", "ORG:", ""),
+    ("title", "TITLE:", ""),
+    ("url", "URL:", ""),
+]
+
+
+def _read_mapping_file(filePath):
+    with open(filePath, "r", encoding="utf-8") as f:
+        if os.path.splitext(filePath)[1].lower() in (".yaml", ".yml"):
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_mapping(filePath) -> dict:
+    """
+    Read a mapping file: JSON, or YAML for .yaml/.yml. It names the column of
+    each field by header, e.g.
+    {"first_name": "Name", "last_name": "Surname", "phone": ["Mobile", "Work"],
+     "phone_types": ["CELL", "WORK"], "email": "E-mail"}
+    """
+    spec = _read_mapping_file(filePath)
+    if not isinstance(spec, dict):
+        raise ValueError(f"{filePath}: a mapping file must hold an object")
+    return spec
+
+
+def load_mappings(filePath) -> list:
+    """
+    Read a mapping file holding one mapping or a list of them, for folders
+    mixing sheet layouts; see load_mapping and pick_mapping.
+    """
+    specs = _read_mapping_file(filePath)
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list) or not all(isinstance(s, dict) for s in specs):
+        raise ValueError(f"{filePath}: a mapping file must hold an object or a list")
+    return specs
+
+
+def pick_mapping(specs, headers):
+    """
+    The first of `specs` that resolves against `headers`, as (spec, cols).
+    Raises ValueError with every mapping's error when none does.
+    """
+    errors = []
+    for spec in specs:
+        try:
+            return spec, resolve_mapping(spec, headers)
+        except ValueError as e:
+            errors.append(str(e))
+    if len(errors) == 1:
+        raise ValueError(errors[0])
+    raise ValueError("no mapping fits: " + "; ".join(errors))
+
+
+def resolve_mapping(spec: dict, headers) -> dict:
+    """
+    Turn a mapping that names columns by header into the `cols` dict select_col
+    builds. Headers match exactly or, failing that, ignoring case and
+    surrounding spaces. Raises ValueError for unknown fields or columns.
+    """
+    unknown = set(spec) - set(FIELDS) - {"phone_types"}
+    if unknown:
+        raise ValueError(f"unknown fields in mapping: {', '.join(sorted(unknown))}")
+    if not spec.get("first_name"):
+        raise ValueError("the mapping needs a first_name column")
+    loose = {str(h).strip().lower(): h for h in headers}
+
+    def column(name):
+        if name in headers:
+            return name
+        try:
+            return loose[str(name).strip().lower()]
+        except KeyError:
+            raise ValueError(f"no column named {name!r}") from None
+
+    cols = {f: column(spec[f]) if spec.get(f) else "" for f in FIELDS if f != "phone"}
+    phones = spec.get("phone") or []
+    if isinstance(phones, str):
+        phones = [phones]
+    types = spec.get("phone_types") or []
+    if isinstance(types, str):
+        types = [types]
+    # select_col always keeps 3 types, more if more phone columns are named
+    size = max(3, len(phones))
+    cols["phone"] = [
+        [column(p) for p in phones],
+        [
+            t.strip().upper() if t.strip().upper() in PHONE_TYPES else "CELL"
+            for t in (list(types) + ["0"] * size)[:size]
+        ],
+    ]
+    return cols
+
+
+class ColumnPlan:
+    """
+    A select_col mapping compiled against a header row.
+    Column names are resolved to positions once and only the mapped fields get
+    an emitter, so rendering a row tuple is a fixed sequence of index lookups.
+    `render(row)` returns exactly what `Contact.add_contact(plan.data(row))` would.
+    With a `phone.PhoneNormalizer`, numbers are written in E.164 and invalid
+    ones are left out.
+    A mapped photo column is read through `photos` (a `photo.PhotoEncoder`,
+    a default one if not given).
+    """
+
+    def __init__(self, headers, cols: dict, normalizer=None, photos=None):
+        self.headers = list(headers)
+        self.cols = cols
+        self.normalizer = normalizer
+        # a repeated header maps to its last column, like dict(zip(headers, row))
+        index = {name: i for i, name in enumerate(self.headers)}
+
+        def pos(field):
+            return index[cols[field]] if cols.get(field) else None
+
+        self.positions = {f: pos(f) for f in FIELDS if f != "phone"}
+        # position of each ContactRecord field, None when not mapped
+        self._record = [self.positions.get(f) for f in RECORD_FIELDS]
+        self._formatted_name = self.field("formatted_name")
+        self.phones = [
+            (index[col], typ) for col, typ in zip(cols["phone"][0], cols["phone"][1])
+        ]
+        if photos is None and self.positions["photo"] is not None:
+            photos = PhotoEncoder()
+        self.photos = photos
+        self.emitters = self._compile()
+        # the PHOTO property comes folded from the encoder, it's added as is
+        self.photo = None
+        if self.positions["photo"] is not None:
+            photo, i = self.photos.property, self.positions["photo"]
+            self.photo = lambda row: photo(row[i])
+
+    def __reduce__(self):
+        # closures don't pickle, rebuild them from the mapping in worker processes
+        return (ColumnPlan, (self.headers, self.cols, self.normalizer, self.photos))
+
+    def _compile(self):
+        p = self.positions
+        esc = escape_value
+
+        def value(i):
+            return (lambda row: esc(row[i])) if i is not None else (lambda row: "")
+
+        first, last = value(p["first_name"]), value(p["last_name"])
+        additional, prefix, suffix = (
+            value(p["additional_names"]),
+            value(p["prefix"]),
+            value(p["suffix"]),
+        )
+        emitters = [
+            lambda row: f"N:{last(row)};{first(row)};{additional(row)};{prefix(row)};{suffix(row)}"
+        ]
+
+        fn, fi, la = p["formatted_name"], p["first_name"], p["last_name"]
+        if fn is not None:
+            emitters.append(lambda row: f"FN:{esc(row[fn])}")
+        elif la is not None:
+            emitters.append(lambda row: f"FN:{esc(row[fi] + ' ' + row[la])}")
+        else:
+            emitters.append(lambda row: "FN:")
+
+        if self.normalizer is None:
+            for i, typ in self.phones:
+                emitters.append(
+                    lambda row, i=i, tag=f"TEL;TYPE={typ},VOICE:": tag + esc(row[i])
+                )
+        else:
+            normalize = self.normalizer.normalize
+            for i, typ in self.phones:
+                emitters.append(
+                    lambda row, i=i, tag=f"TEL;TYPE={typ},VOICE:": (
+                        (number := normalize(row[i])) and tag + esc(number)
+                    )
+                )
+
+        # optional properties are only written when the cell has a value
+        for field, tag, end in OPTIONAL_PROPERTIES:
+            i = p[field]
+            if i is not None:
+                emitters.append(
+                    lambda row, i=i, tag=tag, end=end: row[i]
+                    and tag + esc(row[i]) + end
+                )
+        return emitters
+
+    def render(self, row) -> str:
+        lines = ["BEGIN:VCARD", "VERSION:3.0"]
+        for emit in self.emitters:
+            line = emit(row)
+            if line:
+                lines.append(fold_line(line))
+        if self.photo is not None and (line := self.photo(row)):
+            lines.append(line)
+        lines.append("END:VCARD\n")
+        return "\r\n".join(lines)
+
+    def field(self, name):
+        """
+        Function giving ContactRecord field `name` of a row as data() fills
+        it in: "" when unmapped, an unmapped formatted_name made from the
+        first and last names like the FN line.
+        """
+        p = self.positions
+        i = p.get(name)
+        if i is not None:
+            return lambda row: row[i]
+        if name == "formatted_name" and p["last_name"] is not None:
+            fi, la = p["first_name"], p["last_name"]
+            return lambda row: row[fi] + " " + row[la]
+        return lambda row: ""
+
+    def data(self, row) -> ContactRecord:
+        """
+        The record of `row`, what select_col's `self.data` dict used to hold.
+        """
+        values = [row[i] if i is not None else "" for i in self._record]
+        if self.positions["formatted_name"] is None:
+            values[_FORMATTED_NAME] = self._formatted_name(row)
+        if self.normalizer is None:
+            phones = [Phone(row[i], typ) for i, typ in self.phones]
+        else:
+            normalize = self.normalizer.normalize
+            phones = [
+                Phone(number, typ)
+                for i, typ in self.phones
+                if (number := normalize(row[i]))
+            ]
+        return ContactRecord.from_values(values, phones)
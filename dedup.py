@@ -0,0 +1,270 @@
+import hashlib
+import heapq
+import json
+import os
+import pickle
+import re
+import tempfile
+from array import array
+
+from record import ContactRecord, Phone
+
+# number of spill files records (and the key index) are grouped into
+DEFAULT_PARTITIONS = 64
+# bytes of a key's digest in the index; at 128 bits a collision merging two
+# unrelated contacts is not a practical concern
+DIGEST_SIZE = 16
+_ENTRY = DIGEST_SIZE + 8
+# rows a key may be shared by and still match them; a key on more rows is a
+# switchboard number or a shared info@ address, not one person
+DEFAULT_MAX_KEY_ROWS = 20
+# shared keys named in the report
+REPORTED_KEYS = 10
+
+_NON_DIGITS = re.compile(r"\D")
+_SPACES = re.compile(r"\s+")
+
+
+def phone_key(value: str) -> str:
+    """
+    Digits only, with a leading + kept; numbers too short to identify anyone give "".
+    """
+    digits = _NON_DIGITS.sub("", value)
+    if len(digits) < 7:
+        return ""
+    return "+" + digits if value.lstrip().startswith("+") else digits
+
+
+def email_key(value: str) -> str:
+    return value.strip().lower()
+
+
+def name_key(value: str) -> str:
+    return _SPACES.sub(" ", value).strip().casefold()
+
+
+def key_digest(key) -> bytes:
+    """
+    What the index stores for a (kind, value) key from Deduplicator.keys.
+    """
+    kind, value = key
+    return hashlib.blake2b(
+        f"{kind}\x1f{value}".encode(), digest_size=DIGEST_SIZE
+    ).digest()
+
+
+def _dump_all(path, items):
+    with open(path, "wb") as f:
+        for item in items:
+            pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _load_all(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class Deduplicator:
+    """
+    Merge records (the ContactRecords add_contact takes) that share a normalized
+    phone number, email or formatted name.
+
+    Every key goes into a hash index (keyed by its blake2b digest, see
+    key_digest) pointing at the first record that had it, and records meeting
+    through an index are joined in a union-find, so the whole run is O(n) with
+    no pairwise comparisons. The (digest, row) entries are spilled into
+    `partitions` files by digest and indexed one file at a time, and records
+    are spilled to a temp file, regrouped into `partitions` files by their
+    duplicate group, merged one partition at a time and streamed back out in
+    first-seen order. So besides one int per record, only a partition's share
+    of the keys or records is in memory at once.
+
+    A key found on more than `max_key_rows` rows doesn't match anything:
+    matching is transitive, so one switchboard number would otherwise merge
+    everyone behind it into a single card (held whole in memory). Such keys
+    are counted in report["skipped_keys"], the first REPORTED_KEYS of them
+    listed with their row counts in report["shared_keys"].
+    """
+
+    def __init__(
+        self,
+        partitions=DEFAULT_PARTITIONS,
+        tmpdir=None,
+        report_path=None,
+        max_key_rows=DEFAULT_MAX_KEY_ROWS,
+    ):
+        self.partitions = partitions
+        self.tmpdir = tmpdir
+        self.report_path = report_path
+        self.max_key_rows = max_key_rows
+        self.report = {
+            "rows": 0,
+            "contacts": 0,
+            "merged_groups": 0,
+            "merged_rows": 0,
+            "skipped_keys": 0,
+            "shared_keys": {},
+        }
+
+    def keys(self, record):
+        for ph in record.get("phone") or []:
+            if key := phone_key(ph["phn"]):
+                yield "tel", key
+        if key := email_key(record.get("email", "")):
+            yield "email", key
+        if key := name_key(record.get("formatted_name", "")):
+            yield "fn", key
+
+    def _find(self, i):
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a != b:
+            # the earliest record stays the root so groups keep input order
+            if b < a:
+                a, b = b, a
+            self._parent[b] = a
+
+    @staticmethod
+    def _entries(path):
+        with open(path, "rb") as f:
+            while chunk := f.read(_ENTRY * 4096):
+                for start in range(0, len(chunk), _ENTRY):
+                    yield chunk[start : start + DIGEST_SIZE], int.from_bytes(
+                        chunk[start + DIGEST_SIZE : start + _ENTRY], "little"
+                    )
+
+    def _index(self, path):
+        # join the rows sharing a key of one key partition; a first pass
+        # counts each key's rows so the shared ones can be left out
+        counts = {}
+        for digest, _ in self._entries(path):
+            counts[digest] = counts.get(digest, 0) + 1
+        for digest, rows in counts.items():
+            if rows > self.max_key_rows:
+                self._shared[digest] = rows
+        index = {}
+        for digest, i in self._entries(path):
+            if digest in self._shared:
+                continue
+            first = index.setdefault(digest, i)
+            if first != i:
+                self._union(first, i)
+
+    def run(self, records):
+        """
+        Consume `records` and yield the merged ones, in order of first appearance.
+        """
+        with tempfile.TemporaryDirectory(dir=self.tmpdir) as tmp:
+            spill = os.path.join(tmp, "records")
+            self._parent = array("q")
+            # digest -> rows, of the keys too widely shared to match on
+            self._shared = {}
+            key_parts = [os.path.join(tmp, f"keys{p}") for p in range(self.partitions)]
+            key_files = [open(path, "wb") for path in key_parts]
+
+            def keyed():
+                for i, record in enumerate(records):
+                    self._parent.append(i)
+                    row = i.to_bytes(8, "little")
+                    for key in self.keys(record):
+                        digest = key_digest(key)
+                        key_files[digest[0] % self.partitions].write(digest + row)
+                    yield record
+
+            try:
+                _dump_all(spill, keyed())
+            finally:
+                for f in key_files:
+                    f.close()
+            for path in key_parts:
+                self._index(path)
+                os.remove(path)
+            self.report["rows"] = len(self._parent)
+            self.report["skipped_keys"] = len(self._shared)
+            named = self.report["shared_keys"]
+
+            parts = [os.path.join(tmp, f"part{p}") for p in range(self.partitions)]
+            files = [open(path, "wb") for path in parts]
+            try:
+                for i, record in enumerate(_load_all(spill)):
+                    # the shared keys were only digests so far, name a few
+                    if self._shared and len(named) < REPORTED_KEYS:
+                        for kind, value in self.keys(record):
+                            rows = self._shared.get(key_digest((kind, value)))
+                            if rows and len(named) < REPORTED_KEYS:
+                                named.setdefault(f"{kind}:{value}", rows)
+                    root = self._find(i)
+                    pickle.dump((root, i, record), files[root % self.partitions])
+            finally:
+                for f in files:
+                    f.close()
+            os.remove(spill)
+            self._parent = self._shared = None
+
+            report = (
+                open(self.report_path, "w", encoding="utf-8")
+                if self.report_path
+                else None
+            )
+            try:
+                merged = []
+                for path in parts:
+                    groups = {}
+                    for root, i, record in _load_all(path):
+                        groups.setdefault(root, []).append((i, record))
+                    out = path + ".merged"
+                    _dump_all(out, self._merge_groups(groups, report))
+                    os.remove(path)
+                    merged.append(out)
+                for _, record in heapq.merge(*map(_load_all, merged)):
+                    yield record
+            finally:
+                if report:
+                    report.close()
+
+    def _merge_groups(self, groups, report):
+        for root in sorted(groups):
+            members = groups[root]
+            self.report["contacts"] += 1
+            if len(members) > 1:
+                self.report["merged_groups"] += 1
+                self.report["merged_rows"] += len(members) - 1
+                if report:
+                    entry = {
+                        "formatted_name": members[0][1].get("formatted_name", ""),
+                        "rows": [i for i, _ in members],
+                    }
+                    report.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            yield root, merge_records([r for _, r in members])
+
+
+def merge_records(records):
+    """
+    Combine duplicates: the first record wins, empty fields are filled from the
+    others and every distinct phone number is kept as its own TEL.
+    """
+    merged = ContactRecord(records[0])
+    phones = list(merged.phone)
+    seen = {phone_key(ph["phn"]) or ph["phn"] for ph in phones}
+    for record in records[1:]:
+        for key, value in record.items():
+            if key == "phone":
+                for ph in value or []:
+                    number = phone_key(ph["phn"]) or ph["phn"]
+                    if number not in seen:
+                        seen.add(number)
+                        phones.append(Phone.of(ph))
+            elif value and not merged.get(key):
+                merged[key] = value
+    merged.phone = phones
+    return merged
@@ -0,0 +1,145 @@
+import heapq
+import locale
+import os
+import pickle
+import tempfile
+from itertools import count, islice
+
+# characters of cards (and keys) held in memory before a sorted run is spilled
+DEFAULT_MEMORY = 64 << 20
+# fields cards are ordered by when none are given
+DEFAULT_FIELDS = ("last_name", "first_name")
+# entries pickled per block of a run file; merging reads a block per run
+BLOCK_SIZE = 512
+# runs merged at once; more are first merged into longer runs, which keeps
+# the number of open files bounded however small the budget
+MAX_FANIN = 128
+# rough per-entry cost, in characters, of the tuple and list slot around a card
+_OVERHEAD = 64
+
+
+def _dump_run(path, entries):
+    with open(path, "wb") as f:
+        for start in range(0, len(entries), BLOCK_SIZE):
+            pickle.dump(entries[start : start + BLOCK_SIZE], f, pickle.HIGHEST_PROTOCOL)
+
+
+def _dump_blocks(path, entries):
+    with open(path, "wb") as f:
+        while block := list(islice(entries, BLOCK_SIZE)):
+            pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _load_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+class ExternalSorter:
+    """
+    Order cards by contact fields (last then first name by default) without
+    holding the export in memory.
+
+    Cards come in with their key, computed once per row by key(): `collate`
+    (locale.strxfrm by default, so the LC_COLLATE locale decides, see
+    set_locale) applied to each field. They are buffered until `memory`
+    characters are held, then sorted and spilled as a run to a temp file;
+    at the end the runs are k-way merged with a heap, reading a block of each
+    at a time. Equal keys keep their input order. An export that fits in the
+    budget is sorted in memory and never touches the disk.
+    `runs` and `spilled` (characters written) report the last sort.
+    """
+
+    def __init__(
+        self,
+        fields=DEFAULT_FIELDS,
+        memory=DEFAULT_MEMORY,
+        tmpdir=None,
+        collate=locale.strxfrm,
+    ):
+        self.fields = tuple(fields)
+        self.memory = memory
+        self.tmpdir = tmpdir
+        self.collate = collate
+        self.runs = 0
+        self.spilled = 0
+
+    @staticmethod
+    def set_locale(name=""):
+        """
+        Collate by locale `name` (e.g. "de_DE.UTF-8"), by default the one the
+        environment names (LC_ALL, LC_COLLATE or LANG); Python starts in the
+        "C" locale, which orders by code point, until this is called. Raises
+        locale.Error when the system doesn't have it. This sets LC_COLLATE for
+        the whole process.
+        """
+        locale.setlocale(locale.LC_COLLATE, name)
+
+    def key(self, values) -> tuple:
+        collate = self.collate
+        return tuple(collate(v.casefold()) for v in values)
+
+    def row_key(self, plan):
+        """
+        Function giving the key of a row of `plan`, the same as record_key()
+        of plan.data(row): unmapped fields sort as "", an unmapped
+        formatted_name by the first and last names.
+        """
+        getters = [plan.field(f) for f in self.fields]
+        return lambda row: self.key([get(row) for get in getters])
+
+    def record_key(self, record) -> tuple:
+        return self.key([record.get(f) or "" for f in self.fields])
+
+    def tap(self, items, key, keys):
+        """
+        Yield `items` unchanged, appending key(item) to the deque `keys`.
+        """
+        for item in items:
+            keys.append(key(item))
+            yield item
+
+    def sort(self, cards, keys):
+        """
+        Yield `cards` ordered by `keys`, the deque tap() fills in step with
+        them (the renderers read rows ahead, so keys are consumed as cards
+        come out rather than zipped up front).
+        """
+        self.runs = 0
+        self.spilled = 0
+        with tempfile.TemporaryDirectory(dir=self.tmpdir) as tmp:
+            paths = []
+            buffer, held = [], 0
+            seq, names = count(), count()
+            for card in cards:
+                key = keys.popleft()
+                buffer.append((key, next(seq), card))
+                held += len(card) + sum(map(len, key)) + _OVERHEAD
+                if held >= self.memory:
+                    buffer.sort()
+                    path = os.path.join(tmp, f"run{next(names)}")
+                    _dump_run(path, buffer)
+                    paths.append(path)
+                    self.spilled += held
+                    buffer, held = [], 0
+            buffer.sort()
+            self.runs = len(paths) + (1 if buffer else 0)
+            if not paths:
+                for _, _, card in buffer:
+                    yield card
+                return
+            while len(paths) >= MAX_FANIN:
+                path = os.path.join(tmp, f"run{next(names)}")
+                group, paths = paths[:MAX_FANIN], paths[MAX_FANIN:]
+                _dump_blocks(path, heapq.merge(*map(_load_run, group)))
+                for done in group:
+                    os.remove(done)
+                paths.append(path)
+            runs = [_load_run(path) for path in paths] + [iter(buffer)]
+            for _, _, card in heapq.merge(*runs):
+                yield card
@@ -0,0 +1,154 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    """
+    Opt-in stage timers for a conversion.
+
+    Each stage accumulates wall and CPU seconds plus an item count. Stages can
+    nest (rendering pulls rows from the load stage); a stage is only charged
+    its own time, the nested stage's time is taken off. Pass one to
+    Contact.create_vcard(instrument=...). Without it nothing is wrapped, so
+    disabled instrumentation costs nothing.
+
+    trace_memory: track the tracemalloc peak of the whole run (slows Python
+        allocations down noticeably while enabled)
+    profile: run cProfile over the whole run (everything inside run(), from
+        the first row read to the last card written), True keeps the top
+        functions for summary(), a path also dumps the pstats file there
+    """
+
+    def __init__(self, trace_memory=False, profile=False):
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.stages = {}
+        self.total = None
+        self.peak_memory = None
+        self.profile_text = ""
+        self._stack = []
+
+    def _start(self):
+        self._stack.append([time.perf_counter(), time.process_time(), 0.0, 0.0])
+
+    def _stop(self, name, items=0):
+        wall0, cpu0, child_wall, child_cpu = self._stack.pop()
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"wall": 0.0, "cpu": 0.0, "items": 0}
+        stage["wall"] += wall - child_wall
+        stage["cpu"] += cpu - child_cpu
+        stage["items"] += items
+        if self._stack:
+            self._stack[-1][2] += wall
+            self._stack[-1][3] += cpu
+
+    @contextmanager
+    def stage(self, name):
+        self._start()
+        try:
+            yield
+        finally:
+            self._stop(name)
+
+    def timed(self, name, iterable):
+        """
+        Yield from `iterable`, charging every step to stage `name`.
+        """
+        it = iter(iterable)
+        while True:
+            self._start()
+            try:
+                item = next(it)
+            except StopIteration:
+                self._stop(name)
+                return
+            self._stop(name, 1)
+            yield item
+
+    def wrap(self, name, func):
+        """
+        `func` with every call charged to stage `name`.
+        """
+
+        def timed_call(*args):
+            self._start()
+            try:
+                return func(*args)
+            finally:
+                self._stop(name, 1)
+
+        return timed_call
+
+    @contextmanager
+    def run(self):
+        """
+        Wrap a whole conversion: records its total time and starts tracemalloc
+        and cProfile when asked.
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        profiler = cProfile.Profile() if self.profile else None
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield self
+        finally:
+            if profiler:
+                profiler.disable()
+            self.total = {
+                "wall": time.perf_counter() - wall0,
+                "cpu": time.process_time() - cpu0,
+            }
+            if self.trace_memory:
+                self.peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            if profiler:
+                if isinstance(self.profile, str):
+                    profiler.dump_stats(self.profile)
+                out = io.StringIO()
+                stats = pstats.Stats(profiler, stream=out).sort_stats("cumulative")
+                stats.print_stats(20)
+                self.profile_text = out.getvalue()
+
+    def to_dict(self) -> dict:
+        stages = {}
+        for name, s in self.stages.items():
+            stages[name] = dict(s)
+            stages[name]["per_sec"] = s["items"] / s["wall"] if s["wall"] else None
+        return {
+            "stages": stages,
+            "total": self.total,
+            "peak_memory_bytes": self.peak_memory,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def summary(self) -> str:
+        lines = [
+            f"{'stage':<10}{'wall s':>10}{'cpu s':>10}{'items':>12}{'items/s':>14}"
+        ]
+        for name, s in self.to_dict()["stages"].items():
+            rate = f"{s['per_sec']:,.0f}" if s["per_sec"] else "-"
+            lines.append(
+                f"{name:<10}{s['wall']:>10.3f}{s['cpu']:>10.3f}"
+                f"{s['items']:>12,}{rate:>14}"
+            )
+        if self.total:
+            lines.append(
+                f"{'total':<10}{self.total['wall']:>10.3f}{self.total['cpu']:>10.3f}"
+            )
+        if self.peak_memory is not None:
+            lines.append(f"peak traced memory: {self.peak_memory / 2**20:.1f} MiB")
+        if self.profile_text:
+            lines.append(self.profile_text)
+        return "\n".join(lines)
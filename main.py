@@ -1,77 +1,110 @@
-import tablib
-import textwrap
+import os
+from collections import deque
+from itertools import islice
+
 from tabulate import tabulate
 
+from column_plan import ColumnPlan
+from columnar import render_auto, render_columnar
+from parallel import render_cards
+from photo import PhotoEncoder, photo_property
+from profiler import profile, suggest_mapping
+from record import ContactRecord
+from row_source import open_rows, preview
+from vcard_encoding import escape_value, fold_line
+from vcard_writer import DEFAULT_FLUSH_SIZE, ShardedWriter, VCardWriter
+
 
 class Contact:
+    # the photo.PhotoEncoder add_contact reads photo paths with, set by vcards()
+    photos = None
+
     def __init__(self, filePath):
         self.filePath = filePath
-        mode = (
-            "rb" if self.filePath.lower().endswith((".xls", ".xlsx", ".ods")) else "r"
-        )
-        with open(self.filePath, mode) as f:
-            content = f.read()
-        self.table = tablib.Dataset().load(content)
-        # except tablib.exceptions.UnsupportedFormat: handle this exception in object creation of this class
-        self.fin_vcard = r""
+        # rows are read lazily, only the headers are loaded here
+        self.table = open_rows(self.filePath)
 
     def show_table(self):
-        print(tabulate(self.table.dict[:5], headers="keys", tablefmt="grid"))
+        # reads just the head of the file, not the whole table
+        headers, rows = preview(self.filePath, 5)
+        print(
+            tabulate(
+                rows,
+                headers=headers,
+                tablefmt="grid",
+            )
+        )
 
     def escape_value(self, value: str) -> str:
-        return (
-            value.replace("\\", "\\\\")
-            .replace(";", "\\;")
-            .replace(",", "\\,")
-            .replace("\n", "\\n")
-        )
+        return escape_value(value)
 
     def fold_line(self, line: str) -> str:
         """
-        Fold lines longer than 75 characters according to vCard 3.0 spec.
+        Fold lines longer than 75 octets according to vCard 3.0 spec.
         Continuation lines start with a single space.
         """
-        if len(line) <= 75:
-            return line
-        parts = textwrap.wrap(line, width=75)
-        return "\r\n".join([parts[0]] + [" " + part for part in parts[1:]])
+        return fold_line(line)
 
-    def add_contact(self, data: dict) -> str:
+    def add_contact(self, data) -> str:
         """
-        Generate a vCard 3.0 formatted string from provided data.
+        Generate a vCard 3.0 formatted string from provided data, a
+        record.ContactRecord or a dict of its fields.
         """
+        if not isinstance(data, ContactRecord):
+            data = ContactRecord(data)
         lines = [
             "BEGIN:VCARD",
             "VERSION:3.0",
-            f"N:{self.escape_value(data['last_name'])};{self.escape_value(data['first_name'])};{self.escape_value(data.get('additional_names',''))};{self.escape_value(data.get('prefix',''))};{self.escape_value(data.get('suffix',''))}",
-            f"FN:{self.escape_value(data['formatted_name'])}",
+            f"N:{self.escape_value(data.last_name)};{self.escape_value(data.first_name)};{self.escape_value(data.additional_names)};{self.escape_value(data.prefix)};{self.escape_value(data.suffix)}",
+            f"FN:{self.escape_value(data.formatted_name)}",
         ]
 
-        if data.get("phone"):
-            for ph in data["phone"]:
-                lines.append(
-                    x := f"TEL;TYPE={ph['typ']},VOICE:{self.escape_value(ph['phn'])}"
-                )
-            print(x)
-        if data.get("email"):
-            lines.append(f"EMAIL;TYPE=INTERNET,PREF:{self.escape_value(data['email'])}")
-        if data.get("address"):
-            adr = data["address"]
-            lines.append(f"ADR;TYPE=HOME:;;{self.escape_value(adr)};;;;")
-        if data.get("org"):
-            lines.append(f"ORG:{self.escape_value(data['org'])}")
-        if data.get("title"):
-            lines.append(f"TITLE:{self.escape_value(data['title'])}")
-        if data.get("url"):
-            lines.append(f"URL:{self.escape_value(data['url'])}")
-
-        lines.append("END:VCARD\n")
+        for ph in data.phone:
+            lines.append(f"TEL;TYPE={ph.typ},VOICE:{self.escape_value(ph.phn)}")
+        if data.email:
+            lines.append(f"EMAIL;TYPE=INTERNET,PREF:{self.escape_value(data.email)}")
+        if data.address:
+            lines.append(f"ADR;TYPE=HOME:;;{self.escape_value(data.address)};;;;")
+        if data.org:
+            lines.append(f"ORG:{self.escape_value(data.org)}")
+        if data.title:
+            lines.append(f"TITLE:{self.escape_value(data.title)}")
+        if data.url:
+            lines.append(f"URL:{self.escape_value(data.url)}")
 
         # Fold long lines
         folded = [self.fold_line(line) for line in lines]
+        if data.photo:
+            photos = self.photos
+            photo = (
+                photos.property(data.photo) if photos else photo_property(data.photo)
+            )
+            # PHOTO properties come folded
+            if photo:
+                folded.append(photo)
+        folded.append("END:VCARD\n")
         return "\r\n".join(folded)
 
+    def suggest_columns(self):
+        """
+        Print the column INDEX the profiler guesses for each field, as hints
+        for the select_col prompts.
+        """
+        spec = suggest_mapping(profile(self.filePath))
+        if not spec:
+            return
+        index = {h: i for i, h in enumerate(self.table.headers)}
+        print("Suggested columns:")
+        for field, columns in spec.items():
+            if field == "phone_types":
+                print(f"  phone types: {','.join(columns)}")
+                continue
+            if isinstance(columns, str):
+                columns = [columns]
+            print(f"  {field}: " + ", ".join(f"{index.get(c)} ({c})" for c in columns))
+
     def select_col(self):
+        self.suggest_columns()
         self.cols = {
             "first_name": self.table.headers[
                 int(input("Enter the INDEX of column for first_name: ").strip())
@@ -133,6 +166,13 @@ class Contact:
             )
             and self.table.headers[int(x)]
             or "",
+            "address": (
+                x := input(
+                    "Enter the INDEX of column for address [optional]: "
+                ).strip()
+            )
+            and self.table.headers[int(x)]
+            or "",
             "url": (
                 x := input("Enter the INDEX of column for url [optional]: ").strip()
             )
@@ -157,45 +197,176 @@ class Contact:
             )
             and self.table.headers[int(x)]
             or "",
+            "photo": (
+                x := input(
+                    "Enter the INDEX of column for photo file paths [optional]: "
+                ).strip()
+            )
+            and self.table.headers[int(x)]
+            or "",
         }
 
-        for row in self.table.dict:
-            self.data = {
-                "first_name": row[self.cols["first_name"]],
-                "last_name": row[self.cols["last_name"]]
-                if self.cols["last_name"]
-                else "",
-                "formatted_name": row[self.cols["formatted_name"]]
-                if self.cols["formatted_name"]
-                else row[self.cols["first_name"]] + (" " + row[self.cols["last_name"]])
-                if self.cols["last_name"]
-                else "",
-                "additional_names": row[self.cols["additional_names"]]
-                if self.cols["additional_names"]
-                else "",
-                "prefix": row[self.cols["prefix"]] if self.cols["prefix"] else "",
-                "suffix": row[self.cols["suffix"]] if self.cols["suffix"] else "",
-                "phone": [
-                    {"phn": row[phn], "typ": typ}
-                    for phn, typ in zip(
-                        self.cols["phone"][0],
-                        self.cols["phone"][1],
-                    )
-                ],
-                "email": row[self.cols["email"]] if self.cols["email"] else "",
-                "url": row[self.cols["url"]] if self.cols["url"] else "",
-                "bday": row[self.cols["bday"]] if self.cols["bday"] else "",
-                "org": row[self.cols["org"]] if self.cols["org"] else "",
-                "title": row[self.cols["title"]] if self.cols["title"] else "",
-            }
-            self.fin_vcard += self.add_contact(self.data)
-
-    def create_vcard(self):
-        with open("./contact.vcf", "w", encoding="utf-8") as f:
-            f.write(self.fin_vcard)
-
-
-obj = Contact("./test/table_data/table.csv")
-obj.show_table()
-obj.select_col()
-obj.create_vcard()
+    def vcards(
+        self,
+        workers=1,
+        dedup=None,
+        normalizer=None,
+        instrument=None,
+        cache=None,
+        backend="auto",
+        photos=None,
+        sort=None,
+        skip=0,
+    ):
+        """
+        Yield one rendered vCard per table row, using the mapping from select_col.
+        With `workers` > 1 (None: one per CPU) large tables are rendered by a
+        process pool, the cards still come out in row order.
+        With a `dedup.Deduplicator`, rows describing the same person are merged
+        into one card first (`dedup.report` has the counts afterwards).
+        With a `phone.PhoneNormalizer`, TEL values are written in E.164 and
+        invalid numbers are dropped and counted by the normalizer.
+        With an `instrument.Instrumentation`, time spent loading, mapping,
+        deduplicating and rendering is recorded per stage.
+        With a `render_cache.RenderCache`, rows rendered by an earlier run are
+        taken from it (rows are then rendered in this process, and the cache is
+        not used when deduplicating).
+        `backend` picks how a single process renders: "rows" one row at a time,
+        "columnar" with pandas a column at a time (see columnar.py), "auto"
+        columnar for large tables where it pays off.
+        A mapped photo column is read through `photos` (a `photo.PhotoEncoder`,
+        by default one reading relative paths from the table's folder); when
+        rendering in this process, images are loaded ahead on its threads.
+        With an `external_sort.ExternalSorter`, the cards come out ordered by
+        its fields instead of in row order, sorted within its memory budget.
+        The first `skip` rows are left out (a resumed checkpoint).
+        """
+        if photos is None and self.cols.get("photo"):
+            photos = PhotoEncoder(base_dir=os.path.dirname(self.filePath))
+        self.photos = photos
+        plan = ColumnPlan(self.table.headers, self.cols, normalizer, photos)
+        rows = self.table
+        if skip:
+            rows = islice(rows, skip, None)
+        serial = dedup or cache or backend == "columnar" or workers == 1
+        if photos is not None and serial and plan.positions["photo"] is not None:
+            rows = photos.prefetch(rows, plan.positions["photo"])
+        if instrument is not None:
+            rows = instrument.timed("load", rows)
+        # sort keys of the rows (or merged records) on their way to be rendered
+        keys = deque()
+        if dedup is not None:
+            records = map(plan.data, rows)
+            add_contact = self.add_contact
+            if instrument is not None:
+                records = instrument.timed("map", records)
+                records = instrument.timed("dedup", dedup.run(records))
+                add_contact = instrument.wrap("render", add_contact)
+            else:
+                records = dedup.run(records)
+            if sort is not None:
+                records = sort.tap(records, sort.record_key, keys)
+            cards = map(add_contact, records)
+        else:
+            if sort is not None:
+                rows = sort.tap(rows, sort.row_key(plan), keys)
+            if cache is not None:
+                cards = cache.render(rows, plan)
+            elif backend == "columnar":
+                cards = render_columnar(rows, plan)
+            elif backend == "auto" and workers == 1:
+                cards = render_auto(rows, plan)
+            else:
+                cards = render_cards(rows, plan, workers)
+            if instrument is not None:
+                cards = instrument.timed("render", cards)
+        if sort is not None:
+            cards = sort.sort(cards, keys)
+            if instrument is not None:
+                cards = instrument.timed("sort", cards)
+        yield from cards
+
+    def create_vcard(
+        self,
+        out="./contact.vcf",
+        flush_size=DEFAULT_FLUSH_SIZE,
+        workers=1,
+        dedup=None,
+        normalizer=None,
+        shard_cards=None,
+        shard_bytes=None,
+        instrument=None,
+        progress=None,
+        cache=None,
+        backend="auto",
+        photos=None,
+        sort=None,
+        checkpoint=None,
+    ):
+        """
+        Render every row and write it to `out` (a path or a file-like object)
+        as it goes, so only `flush_size` characters are held before each write.
+        `workers`, `dedup`, `normalizer`, `cache`, `backend`, `photos` and
+        `sort` are passed on to vcards().
+        With `shard_cards` and/or `shard_bytes` the export is split into numbered
+        files next to `out` plus a manifest, see vcard_writer.ShardedWriter.
+        An `instrument.Instrumentation` also times the writes and the whole run.
+        `progress` is called with the number of cards written so far after each
+        card; an exception raised from it stops the conversion.
+        With a `checkpoint.Checkpoint`, progress is saved next to `out` as it
+        goes and a run that was interrupted carries on from its last
+        checkpoint (not with `dedup`, `sort` or sharding).
+        Returns the number of cards written.
+        """
+        skip = 0
+        if checkpoint is not None:
+            if dedup is not None or sort is not None or shard_cards or shard_bytes:
+                raise ValueError(
+                    "deduplicated, sorted or sharded exports can't be checkpointed"
+                )
+            plan = ColumnPlan(self.table.headers, self.cols, normalizer, photos)
+            skip = checkpoint.restore(self.filePath, plan)
+        if shard_cards or shard_bytes:
+            threads = workers or os.cpu_count() or 1
+            writer = ShardedWriter(out, shard_cards, shard_bytes, flush_size, threads)
+        else:
+            writer = VCardWriter(out, flush_size, append=skip > 0)
+            writer.count = skip
+        cards = self.vcards(
+            workers, dedup, normalizer, instrument, cache, backend, photos, sort, skip
+        )
+        if checkpoint is not None:
+            cards = checkpoint.track(cards, writer)
+        if progress is not None:
+            cards = _reporting(cards, progress, skip)
+        if instrument is None:
+            with writer:
+                for card in cards:
+                    writer.write(card)
+        else:
+            with instrument.run():
+                write = instrument.wrap("write", writer.write)
+                try:
+                    for card in cards:
+                        write(card)
+                except BaseException:
+                    writer.abort()
+                    raise
+                with instrument.stage("write"):
+                    writer.close()
+        if checkpoint is not None:
+            checkpoint.done()
+        return writer.count
+
+
+def _reporting(cards, progress, start=0):
+    for done, card in enumerate(cards, start + 1):
+        yield card
+        progress(done)
+
+
+if __name__ == "__main__":
+    obj = Contact("./test/table_data/table.csv")
+    obj.show_table()
+    obj.select_col()
+    obj.create_vcard()
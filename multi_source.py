@@ -0,0 +1,243 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from column_plan import ColumnPlan, pick_mapping, resolve_mapping
+from photo import PhotoEncoder
+from profiler import profile, suggest_mapping, with_guesses
+from row_source import open_rows
+
+# cards per batch a reader hands to the writer
+BATCH_CARDS = 500
+# batches waiting for the writer before readers block
+QUEUE_BATCHES = 32
+# seconds between checks that readers are still alive while waiting
+POLL_INTERVAL = 0.1
+
+
+def header_signature(headers) -> tuple:
+    """
+    What sources are grouped by to share a mapping: the headers, ignoring case
+    and surrounding spaces.
+    """
+    return tuple(str(h).strip().lower() for h in headers)
+
+
+def _put(out, item, stop):
+    # a put that gives up once the writer has stopped listening
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class SourceMapper:
+    """
+    Maps a source to its ColumnPlan in the reader that reads it: the first of
+    `specs` that fits its headers (completed by the profiler with `auto_map`).
+    The spec picked for a header signature is kept and resolved again against
+    each source's own headers, so files differing only in header case share
+    the pick and still get their exact column names.
+
+    Threads share one mapper; a copy pickled to a worker process starts with
+    an empty cache of its own.
+    """
+
+    def __init__(self, specs, normalizer=None, photo_size=None, auto_map=False):
+        self.specs = list(specs)
+        self.normalizer = normalizer
+        self.photo_size = photo_size
+        self.auto_map = auto_map
+        # header signature -> spec picked for it
+        self.picked = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return (
+            SourceMapper,
+            (self.specs, self.normalizer, self.photo_size, self.auto_map),
+        )
+
+    def plan(self, path):
+        """
+        (ColumnPlan, header signature, spec picked) for the source at `path`.
+        """
+        headers = open_rows(path).headers
+        signature = header_signature(headers)
+        with self._lock:
+            spec = self.picked.get(signature)
+        if spec is None:
+            specs = self.specs
+            if self.auto_map:
+                guessed = suggest_mapping(profile(path))
+                specs = [with_guesses(spec, guessed) for spec in specs or [{}]]
+            spec, cols = pick_mapping(specs, headers)
+            with self._lock:
+                self.picked.setdefault(signature, spec)
+        else:
+            cols = resolve_mapping(spec, headers)
+        photos = None
+        if cols.get("photo"):
+            photos = PhotoEncoder(self.photo_size, os.path.dirname(path))
+        plan = ColumnPlan(headers, cols, self.normalizer, photos)
+        return plan, signature, spec
+
+
+def _read_sources(tasks, out, stop, batch_cards, mapper, hand_back):
+    """
+    Reader loop: take (index, path) tasks until a None, map the source and
+    put ("mapped", index, (signature, spec)), render its rows in batches of
+    ("cards", index, cards), then ("done", index, (seconds, invalid)) or
+    ("error", index, (seconds, message)). With `hand_back` (a worker process)
+    `invalid` is the phone counts of the process's normalizer copy.
+    """
+    while (task := tasks.get()) is not None:
+        index, path = task
+        start = time.perf_counter()
+        try:
+            plan, signature, spec = mapper.plan(path)
+            if not _put(out, ("mapped", index, (signature, spec)), stop):
+                return
+            batch = []
+            for row in open_rows(path):
+                batch.append(plan.render(row))
+                if len(batch) >= batch_cards:
+                    if not _put(out, ("cards", index, batch), stop):
+                        return
+                    batch = []
+            if batch and not _put(out, ("cards", index, batch), stop):
+                return
+        except Exception as e:
+            message = f"{type(e).__name__}: {e}"
+            _put(out, ("error", index, (time.perf_counter() - start, message)), stop)
+            continue
+        invalid = None
+        if hand_back and mapper.normalizer is not None:
+            invalid = mapper.normalizer.take_invalid()
+        done = (time.perf_counter() - start, invalid)
+        if not _put(out, ("done", index, done), stop):
+            return
+
+
+class MultiSource:
+    """
+    Many tables into one export in a single pass.
+
+    Every source is mapped by a SourceMapper in the reader that reads it, so
+    opening, profiling and mapping the sources is spread over the readers
+    too; the spec picked for a header signature is kept in `mappings`.
+    `readers` sources are read and rendered at a time, by threads or, with
+    `processes`, by worker processes (which is what spreads parsing and
+    rendering over several CPUs), and the cards go through a queue of at most
+    `queue_batches` batches to the one writer. Each source's cards keep their
+    row order, sources interleave in the output.
+
+    A source that can't be mapped or read is reported in `results` with its
+    "error" and the others are still written. Cards are written as they
+    come, so a source failing partway has its first `rows` in the export;
+    its result says so with "partial".
+    """
+
+    def __init__(
+        self,
+        paths,
+        specs,
+        readers=4,
+        processes=False,
+        normalizer=None,
+        photo_size=None,
+        auto_map=False,
+        batch_cards=BATCH_CARDS,
+        queue_batches=QUEUE_BATCHES,
+    ):
+        self.paths = list(paths)
+        self.readers = max(1, min(readers, len(self.paths)))
+        self.processes = processes
+        self.normalizer = normalizer
+        self.mapper = SourceMapper(specs, normalizer, photo_size, auto_map)
+        self.batch_cards = batch_cards
+        self.queue_batches = queue_batches
+        # header signature -> spec picked for it
+        self.mappings = {}
+        self.results = [{"input": path, "rows": 0} for path in self.paths]
+
+    def plan(self, path) -> ColumnPlan:
+        return self.mapper.plan(path)[0]
+
+    def _start(self):
+        if self.processes:
+            ctx = multiprocessing.get_context()
+            tasks, out = ctx.Queue(), ctx.Queue(self.queue_batches)
+            stop, worker = ctx.Event(), ctx.Process
+        else:
+            tasks, out = queue.Queue(), queue.Queue(self.queue_batches)
+            stop, worker = threading.Event(), threading.Thread
+        workers = [
+            worker(
+                target=_read_sources,
+                args=(
+                    tasks,
+                    out,
+                    stop,
+                    self.batch_cards,
+                    self.mapper,
+                    self.processes,
+                ),
+                daemon=True,
+            )
+            for _ in range(self.readers)
+        ]
+        return tasks, out, stop, workers
+
+    def write(self, writer) -> int:
+        """
+        Read every source and write its cards to `writer` (a VCardWriter or
+        ShardedWriter). Returns the number of cards written.
+        """
+        tasks, out, stop, workers = self._start()
+        for index, path in enumerate(self.paths):
+            tasks.put((index, path))
+        for _ in workers:
+            tasks.put(None)
+        for w in workers:
+            w.start()
+        pending = len(self.paths)
+        written = 0
+        try:
+            while pending:
+                try:
+                    kind, index, value = out.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    if not any(w.is_alive() for w in workers):
+                        raise RuntimeError("a reader stopped without finishing")
+                    continue
+                result = self.results[index]
+                if kind == "cards":
+                    for card in value:
+                        writer.write(card)
+                    written += len(value)
+                    result["rows"] += len(value)
+                    continue
+                if kind == "mapped":
+                    signature, spec = value
+                    self.mappings.setdefault(signature, spec)
+                    continue
+                pending -= 1
+                if kind == "error":
+                    result["seconds"], result["error"] = value
+                    if result["rows"]:
+                        result["partial"] = True
+                else:
+                    result["seconds"], invalid = value
+                    if invalid is not None:
+                        self.normalizer.merge_invalid(invalid)
+        finally:
+            stop.set()
+            for w in workers:
+                w.join(timeout=5)
+        return written
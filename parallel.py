@@ -0,0 +1,74 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+# rows per task handed to a worker process
+DEFAULT_CHUNK_SIZE = 5000
+# inputs with fewer rows than this are rendered in-process
+SERIAL_THRESHOLD = 20000
+
+_plan = None
+
+
+def _init_worker(plan):
+    global _plan
+    _plan = plan
+
+
+def _render_chunk(rows):
+    render = _plan.render
+    cards = [render(row) for row in rows]
+    if _plan.normalizer is None:
+        return cards, None
+    # the worker's copy of the normalizer counted this chunk's invalid numbers
+    return cards, _plan.normalizer.take_invalid()
+
+
+def _collect(future, plan):
+    cards, invalid = future.result()
+    if invalid is not None:
+        plan.normalizer.merge_invalid(invalid)
+    return cards
+
+
+def _chunks(rows, size):
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def render_cards(
+    rows,
+    plan,
+    workers=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    serial_threshold=SERIAL_THRESHOLD,
+):
+    """
+    Yield `plan.render(row)` for every row, in input order.
+    Rows are split into chunks of `chunk_size` and rendered by a pool of
+    `workers` processes (default: one per CPU). At most two chunks per worker
+    are in flight, so memory stays bounded. Inputs shorter than
+    `serial_threshold` rows, or a single worker, render in this process instead.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(plan.render, rows)
+        return
+    it = iter(rows)
+    head = list(islice(it, serial_threshold))
+    if len(head) < serial_threshold:
+        yield from map(plan.render, head)
+        return
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(plan,)
+    ) as pool:
+        pending = deque()
+        for chunk in _chunks(chain(head, it), chunk_size):
+            pending.append(pool.submit(_render_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from _collect(pending.popleft(), plan)
+        while pending:
+            yield from _collect(pending.popleft(), plan)
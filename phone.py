@@ -0,0 +1,95 @@
+from functools import lru_cache
+
+import phonenumbers
+
+# distinct numbers remembered by a PhoneNormalizer
+DEFAULT_CACHE_SIZE = 65536
+# invalid numbers kept in PhoneNormalizer.rejected for the report
+MAX_REJECTED = 1000
+
+
+class PhoneNormalizer:
+    """
+    Normalize phone numbers to E.164 (+14155550123).
+    Numbers without a country code are read as `region` (ISO 3166 code, e.g.
+    "US", "IN"). Results are memoized in a bounded LRU cache, since the same
+    numbers repeat a lot in real sheets; `stats()` reports its hit rate.
+    Invalid numbers normalize to None, are counted in `invalid` and the first
+    MAX_REJECTED distinct ones are kept in `rejected`.
+    """
+
+    def __init__(self, region="US", cache_size=DEFAULT_CACHE_SIZE):
+        self.region = region.upper()
+        self.cache_size = cache_size
+        self.invalid = 0
+        self.rejected = []
+        self._e164 = lru_cache(maxsize=cache_size)(self._parse)
+
+    def __reduce__(self):
+        # the cache isn't picklable, worker processes start with their own
+        return (PhoneNormalizer, (self.region, self.cache_size))
+
+    def _parse(self, value: str):
+        try:
+            number = phonenumbers.parse(value, self.region)
+        except phonenumbers.NumberParseException:
+            return None
+        if not phonenumbers.is_valid_number(number):
+            return None
+        return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+    def normalize(self, value: str, rows: int = 1):
+        """
+        E.164 form of `value`, "" for a blank cell or None if it isn't a valid number.
+        `rows` is how many cells hold `value`, for callers normalizing each
+        distinct value of a column once; an invalid one counts that many times.
+        """
+        value = value.strip()
+        if not value:
+            return ""
+        result = self._e164(value)
+        if result is None:
+            self.invalid += rows
+            self._reject(value)
+        return result
+
+    def _reject(self, value):
+        if len(self.rejected) < MAX_REJECTED and value not in self.rejected:
+            self.rejected.append(value)
+
+    def take_invalid(self):
+        """
+        (invalid, rejected) counted since the last call, and start over; how
+        worker processes hand their counts back, see merge_invalid.
+        """
+        counts = (self.invalid, self.rejected)
+        self.invalid, self.rejected = 0, []
+        return counts
+
+    def merge_invalid(self, counts) -> None:
+        """
+        Add the (invalid, rejected) of take_invalid() from another normalizer.
+        """
+        invalid, rejected = counts
+        self.invalid += invalid
+        for value in rejected:
+            self._reject(value)
+
+    def normalize_many(self, values) -> list:
+        """
+        Normalize a whole column in one call, repeated values come from the cache.
+        """
+        normalize = self.normalize
+        return [normalize(v) for v in values]
+
+    def stats(self) -> dict:
+        info = self._e164.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+            "cached": info.currsize,
+            "invalid": self.invalid,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,266 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from vcard_encoding import fold_line
+
+# bytes of encoded PHOTO properties a PhotoEncoder keeps
+DEFAULT_CACHE_BYTES = 64 << 20
+# threads reading and encoding images
+DEFAULT_WORKERS = 8
+# rows whose photos are being loaded ahead of the one being rendered
+PREFETCH_ROWS = 64
+# paths whose content digest a PhotoEncoder remembers, least recently used go first
+DIGEST_PATHS = 1 << 16
+
+# leading bytes -> the TYPE parameter of the PHOTO property
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"BM", "BMP"),
+]
+
+
+def image_type(data: bytes, path="") -> str:
+    for signature, kind in _SIGNATURES:
+        if data.startswith(signature):
+            return kind
+    if data[8:12] == b"WEBP":
+        return "WEBP"
+    ext = os.path.splitext(path)[1].lstrip(".").upper()
+    return "JPEG" if ext == "JPG" else ext or "JPEG"
+
+
+class PhotoEncoder:
+    """
+    Turn image paths from a photo column into vCard PHOTO properties
+    (PHOTO;ENCODING=b;TYPE=JPEG:<base64>, already folded, so renderers add
+    them as they are instead of folding the base64 again for every card).
+
+    Relative paths are read from `base_dir`. With `max_size` (pixels), images
+    larger than that on either side are scaled down to fit and re-encoded as
+    JPEG, which needs Pillow. Properties are cached by the image's SHA-256, so
+    a logo shared by many rows, under any path, is encoded once; the cache
+    holds up to `cache_bytes` of properties, least recently used go first.
+    Missing or unreadable images give "" and are counted in `missing` once per
+    path, for the last `digest_paths` paths looked up.
+
+    prefetch() loads the images of upcoming rows on `workers` threads, so disk
+    reads and encoding overlap with rendering the rows before them.
+
+    The caches are per process: an encoder pickled to parallel.py's worker
+    processes arrives empty, so with several workers an image shared across
+    their chunks is encoded once in each of them.
+    """
+
+    def __init__(
+        self,
+        max_size=None,
+        base_dir=None,
+        cache_bytes=DEFAULT_CACHE_BYTES,
+        workers=DEFAULT_WORKERS,
+        digest_paths=DIGEST_PATHS,
+    ):
+        if max_size:
+            # fail at setup rather than on the first photo
+            import PIL.Image  # noqa: F401
+        self.max_size = max_size
+        self.base_dir = base_dir
+        self.cache_bytes = cache_bytes
+        self.workers = workers
+        self.digest_paths = digest_paths
+        self.encoded = 0
+        self.missing = 0
+        self._lines = OrderedDict()
+        self._size = 0
+        # path -> SHA-256 of its content, None for paths that can't be read
+        self._digests = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # the cache and lock stay behind, worker processes start their own
+        return (
+            PhotoEncoder,
+            (
+                self.max_size,
+                self.base_dir,
+                self.cache_bytes,
+                self.workers,
+                self.digest_paths,
+            ),
+        )
+
+    def _path(self, path):
+        if self.base_dir and not os.path.isabs(path):
+            return os.path.join(self.base_dir, path)
+        return path
+
+    def stamp(self, path: str) -> str:
+        """
+        The mtime and size of the image at `path`, "" if there is none, which
+        changes when the file is replaced without reading it.
+        """
+        path = path.strip()
+        if not path:
+            return ""
+        try:
+            st = os.stat(self._path(path))
+        except OSError:
+            return ""
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def _digest(self, path):
+        # b"" for a path not seen (or forgotten), None for an unreadable one
+        with self._lock:
+            digest = self._digests.get(path, b"")
+            if digest != b"":
+                self._digests.move_to_end(path)
+            return digest
+
+    def _remember(self, path, digest):
+        # under self._lock
+        self._digests[path] = digest
+        self._digests.move_to_end(path)
+        if len(self._digests) > self.digest_paths:
+            self._digests.popitem(last=False)
+
+    def _cached(self, digest):
+        with self._lock:
+            line = self._lines.get(digest)
+            if line is not None:
+                self._lines.move_to_end(digest)
+            return line
+
+    def _store(self, digest, line):
+        with self._lock:
+            if digest in self._lines:
+                return
+            self._lines[digest] = line
+            self._size += len(line)
+            while self._size > self.cache_bytes and len(self._lines) > 1:
+                _, old = self._lines.popitem(last=False)
+                self._size -= len(old)
+
+    def _downscale(self, data):
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= self.max_size:
+                return data, None
+            image.thumbnail((self.max_size, self.max_size))
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, "JPEG", quality=85, optimize=True)
+            return out.getvalue(), "JPEG"
+
+    def property(self, path: str) -> str:
+        """
+        The PHOTO property for the image at `path`, "" if it can't be read.
+        """
+        path = path.strip()
+        if not path:
+            return ""
+        digest = self._digest(path)
+        if digest is None:
+            return ""
+        if digest and (line := self._cached(digest)) is not None:
+            return line
+        try:
+            with open(self._path(path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return self._unreadable(path)
+        digest = hashlib.sha256(data).digest()
+        with self._lock:
+            self._remember(path, digest)
+        line = self._cached(digest)
+        if line is not None:
+            return line
+        kind = None
+        if self.max_size:
+            try:
+                data, kind = self._downscale(data)
+            except OSError:
+                # not an image Pillow can read
+                return self._unreadable(path)
+        kind = kind or image_type(data, path)
+        line = fold_line(
+            f"PHOTO;ENCODING=b;TYPE={kind}:" + base64.b64encode(data).decode("ascii")
+        )
+        with self._lock:
+            self.encoded += 1
+        self._store(digest, line)
+        return line
+
+    def _unreadable(self, path):
+        with self._lock:
+            if self._digests.get(path, b"") is not None:
+                self._remember(path, None)
+                self.missing += 1
+        return ""
+
+    def _load(self, path):
+        # the line stays in the cache, not in the finished future
+        self.property(path)
+
+    def prefetch(self, rows, index, ahead=PREFETCH_ROWS):
+        """
+        Yield `rows` unchanged, each once the image in its column `index` has
+        been loaded into the cache by the thread pool, keeping up to `ahead`
+        rows in flight. A path goes to the pool once while rows in flight
+        share it, rows repeating one just wait for it.
+        """
+        # path -> [future, rows in flight with it]; paths leave with their last row
+        submitted = {}
+        with ThreadPoolExecutor(self.workers) as pool:
+            pending = deque()
+
+            def done():
+                row, path = pending.popleft()
+                if path:
+                    entry = submitted[path]
+                    entry[0].result()
+                    entry[1] -= 1
+                    if not entry[1]:
+                        del submitted[path]
+                return row
+
+            for row in rows:
+                path = row[index].strip()
+                if path:
+                    entry = submitted.get(path)
+                    if entry is None:
+                        entry = submitted[path] = [pool.submit(self._load, path), 0]
+                    entry[1] += 1
+                pending.append((row, path))
+                if len(pending) >= ahead:
+                    yield done()
+            while pending:
+                yield done()
+
+    def stats(self) -> dict:
+        return {
+            "encoded": self.encoded,
+            "missing": self.missing,
+            "cached_bytes": self._size,
+        }
+
+
+_default = None
+
+
+def photo_property(path: str) -> str:
+    """
+    PhotoEncoder.property with a shared encoder, for the dict renderers.
+    """
+    global _default
+    if _default is None:
+        _default = PhotoEncoder()
+    return _default.property(path)
@@ -0,0 +1,255 @@
+import random
+import re
+import time
+
+from row_source import head_rows
+
+# rows kept in the reservoir the columns are profiled on
+SAMPLE_SIZE = 500
+# the reservoir draws from at most this many rows from the top of the file...
+MAX_SCAN_ROWS = 50000
+# ...or as many as can be read in this many seconds
+TIME_BUDGET = 0.25
+# share of a column's sampled values that must look like a kind for it to be
+# mapped on its values alone, without a telling header
+MIN_SHARE = 0.6
+
+# value kinds, tried in this order; the first pattern a value matches wins
+_KINDS = [
+    ("email", re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")),
+    ("url", re.compile(r"^(?:https?://|www\.)\S+$|^[\w-]+(?:\.[\w-]+)+/\S*$", re.I)),
+    # an image file's path, what a photo column holds
+    (
+        "image",
+        re.compile(r"^\S(?:.*\S)?\.(?:jpe?g|png|gif|bmp|webp|tiff?|heic)$", re.I),
+    ),
+    (
+        "date",
+        re.compile(
+            r"^(?:\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4})"
+            r"(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?$"
+        ),
+    ),
+    (
+        "phone",
+        re.compile(r"^\+?(?:[\s().\-/]*\d){7,15}[\s()]*(?:(?:x|ext\.?)\s*\d+)?$"),
+    ),
+    (
+        "organization",
+        re.compile(
+            r"\b(?:inc|llc|ltd|gmbh|corp|corporation|company|co|plc|ag|sa|bv"
+            r"|group|holdings|limited)\b\.?$",
+            re.I,
+        ),
+    ),
+    (
+        "address",
+        re.compile(
+            # house number first, street type last, or German style
+            r"^\d{1,6}[a-z]?,?\s+[^\W\d_]"
+            r"|\b(?:street|st|avenue|ave|road|rd|lane|ln|drive|boulevard|blvd"
+            r"|court|ct|place|pl|square|sq)\b\.?(?:,|$)"
+            r"|(?:straße|strasse|str\.|gasse|weg|platz) ?\d+[a-z]?(?:,|$)",
+            re.I,
+        ),
+    ),
+    ("name", re.compile(r"^[^\W\d_]+(?:[ '’.-]+[^\W\d_]+)*\.?$")),
+]
+KINDS = [kind for kind, _ in _KINDS]
+
+# header patterns (on the lowercased header, "_" and "-" read as spaces)
+_HINTS = {
+    "first_name": re.compile(
+        r"\b(?:first|given|fore) ?name\b|^(?:first|name|vorname)$"
+    ),
+    "last_name": re.compile(r"\b(?:last|sur|family) ?name\b|^(?:last|surname)$"),
+    "formatted_name": re.compile(r"\b(?:full|display|contact) ?name\b"),
+    "phone": re.compile(r"phone|mobile|\bcell|\btel\b|telephone|\bfax\b"),
+    "email": re.compile(r"e ?mail"),
+    "url": re.compile(r"\burl\b|web|site|homepage|\blink"),
+    "bday": re.compile(r"birth|\bbday\b|\bdob\b"),
+    "org": re.compile(r"company|\borg|employer|business name|firm"),
+    "title": re.compile(r"\btitle\b|position|\brole\b|\bjob\b"),
+    "address": re.compile(r"address|\baddr\b|street|adresse|anschrift"),
+    "photo": re.compile(r"photo|picture|\bpic\b|image|avatar|portrait|headshot"),
+}
+# the value kind each field holds
+FIELD_KINDS = {
+    "first_name": "name",
+    "last_name": "name",
+    "formatted_name": "name",
+    "phone": "phone",
+    "email": "email",
+    "url": "url",
+    "bday": "date",
+    "org": "organization",
+    "address": "address",
+    "photo": "image",
+}
+# fields a column's values alone are enough to map; names and titles look
+# alike, those need their header to tell
+_BY_VALUE = {"phone", "email", "url", "bday", "org", "address", "photo"}
+# phone header words -> TEL type, CELL otherwise
+_PHONE_TYPES = [
+    (re.compile(r"work|office|business"), "WORK"),
+    (re.compile(r"home|private"), "HOME"),
+]
+
+
+def kind_of(value: str):
+    """
+    The kind of a cell (one of KINDS), None when it looks like none of them.
+    """
+    for kind, pattern in _KINDS:
+        if pattern.search(value):
+            return kind
+    return None
+
+
+def sample_rows(
+    rows, size=SAMPLE_SIZE, max_rows=MAX_SCAN_ROWS, budget=TIME_BUDGET, seed=0
+):
+    """
+    A uniform sample of up to `size` rows (reservoir sampling) of the first
+    `max_rows` rows of `rows`, or of as many as could be read in `budget`
+    seconds. Returns (sample, rows read).
+    """
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + budget
+    sample = []
+    seen = 0
+    for row in rows:
+        if seen < size:
+            sample.append(row)
+        else:
+            j = rng.randrange(seen + 1)
+            if j < size:
+                sample[j] = row
+        seen += 1
+        if seen >= max_rows or (seen % 256 == 0 and time.perf_counter() > deadline):
+            break
+    return sample, seen
+
+
+def profile_columns(headers, rows) -> list:
+    """
+    One profile per column of `rows`: {"column": header, "filled": share of
+    non-empty cells, "kinds": {kind: share of the non-empty cells}}.
+    """
+    profiles = []
+    for i, header in enumerate(headers):
+        values = [v for v in (row[i].strip() for row in rows) if v]
+        counts = dict.fromkeys(KINDS, 0)
+        for value in values:
+            kind = kind_of(value)
+            if kind is not None:
+                counts[kind] += 1
+        profiles.append(
+            {
+                "column": header,
+                "filled": len(values) / len(rows) if rows else 0.0,
+                "kinds": {
+                    k: n / len(values) if values else 0.0 for k, n in counts.items()
+                },
+            }
+        )
+    return profiles
+
+
+def profile(filePath, size=SAMPLE_SIZE, max_rows=MAX_SCAN_ROWS, budget=TIME_BUDGET):
+    """
+    Profile the columns of `filePath` from a sample of its first rows, see
+    sample_rows and profile_columns. Reads a bounded head of the file, so it
+    takes about the same time however large the file is.
+    """
+    headers, rows = head_rows(filePath)
+    try:
+        sample, _ = sample_rows(rows, size, max_rows, budget)
+    finally:
+        getattr(rows, "close", lambda: None)()
+    return profile_columns(headers, sample)
+
+
+def _hint(field, header):
+    return bool(_HINTS[field].search(re.sub(r"[_\-]+", " ", str(header).lower())))
+
+
+def score(field, column_profile) -> float:
+    """
+    How well a column fits a field: above 1 when its header names the field
+    (plus the share of matching values), the share of matching values when
+    those alone tell, else 0.
+    """
+    kind = FIELD_KINDS.get(field)
+    share = column_profile["kinds"].get(kind, 0.0) if kind else 0.0
+    if _hint(field, column_profile["column"]):
+        return 1.0 + share
+    if field in _BY_VALUE and share >= MIN_SHARE:
+        return share
+    return 0.0
+
+
+def suggest_mapping(profiles) -> dict:
+    """
+    A mapping spec (what column_plan.load_mapping reads) from column profiles.
+    Each column goes to one field, best scores first; every column that fits
+    `phone` becomes a phone, typed from its header. With no column named like
+    a first name, the most name-like one left is used. {} when no column
+    looks like a name at all.
+    """
+    pairs = sorted(
+        (
+            (score(field, p), -i, field, p["column"])
+            for i, p in enumerate(profiles)
+            for field in _HINTS
+        ),
+        reverse=True,
+    )
+    spec, used = {}, set()
+    phones = []
+    for value, _, field, column in pairs:
+        if value <= 0 or column in used:
+            continue
+        if field == "phone":
+            phones.append(column)
+        elif field in spec:
+            continue
+        else:
+            spec[field] = column
+        used.add(column)
+    if "first_name" not in spec:
+        names = [
+            (p["kinds"]["name"] * p["filled"], -i, p["column"])
+            for i, p in enumerate(profiles)
+            if p["column"] not in used
+        ]
+        best = max(names, default=None)
+        if best is None or best[0] < MIN_SHARE:
+            return {}
+        spec["first_name"] = best[2]
+    if phones:
+        # left to right, as the columns are in the sheet
+        order = {p["column"]: i for i, p in enumerate(profiles)}
+        phones.sort(key=order.get)
+        spec["phone"] = phones
+        spec["phone_types"] = [phone_type(column) for column in phones]
+    return spec
+
+
+def phone_type(header) -> str:
+    header = str(header).lower()
+    for pattern, typ in _PHONE_TYPES:
+        if pattern.search(header):
+            return typ
+    return "CELL"
+
+
+def with_guesses(spec, guessed) -> dict:
+    """
+    Mapping `spec` completed with the fields it leaves out from `guessed`, a
+    suggest_mapping result; the fields of `spec` win.
+    """
+    guessed = dict(guessed)
+    if "phone" in spec:
+        guessed.pop("phone_types", None)
+    return {**guessed, **spec}
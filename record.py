@@ -0,0 +1,150 @@
+import sys
+from collections.abc import Mapping
+from itertools import chain
+
+# the scalar fields of a contact, in the order add_contact writes them
+FIELDS = (
+    "first_name",
+    "last_name",
+    "additional_names",
+    "prefix",
+    "suffix",
+    "formatted_name",
+    "email",
+    "address",
+    "org",
+    "title",
+    "url",
+    "bday",
+    "photo",
+)
+
+
+class Phone(Mapping):
+    """
+    A TEL of a contact. Reads like the {"phn": ..., "typ": ...} dicts it
+    replaces; the type is interned, so the few distinct types are shared by
+    every phone instead of stored once per row.
+    """
+
+    __slots__ = ("phn", "typ")
+
+    def __init__(self, phn="", typ="CELL"):
+        self.phn = phn
+        self.typ = sys.intern(typ)
+
+    @classmethod
+    def of(cls, ph):
+        """
+        `ph` as a Phone, from a Phone or a {"phn", "typ"} dict.
+        """
+        if isinstance(ph, Phone):
+            return ph
+        return cls(ph["phn"], ph.get("typ") or "CELL")
+
+    def __getitem__(self, key):
+        if key == "phn":
+            return self.phn
+        if key == "typ":
+            return self.typ
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return 2
+
+    def __reduce__(self):
+        return (Phone, (self.phn, self.typ))
+
+    def __repr__(self):
+        return f"Phone({self.phn!r}, {self.typ!r})"
+
+
+class ContactRecord(Mapping):
+    """
+    One contact, the compact form of the `data` dict add_contact takes: a
+    slot per field and a list of Phone, about a third of the memory of the
+    dict with nested phone dicts, which counts once rows are buffered for
+    dedup or sorting.
+
+    It is built and read like that dict: `ContactRecord(data, **fields)`
+    takes a dict (phone dicts become Phone), `record["org"]`, `.get()`,
+    `dict(record)` and `record == data` all work. Fields not given are "",
+    phones []; keys that aren't fields (extra columns of a caller's dict)
+    are ignored, setting one afterwards raises KeyError.
+    """
+
+    __slots__ = FIELDS + ("phone",)
+
+    def __init__(self, data=(), **fields):
+        for name in FIELDS:
+            setattr(self, name, "")
+        self.phone = []
+        if isinstance(data, Mapping):
+            data = data.items()
+        for key, value in chain(data, fields.items()):
+            if key in _SLOTS:
+                self[key] = value
+
+    @classmethod
+    def from_values(cls, values, phone):
+        """
+        A record from the FIELDS `values` in order and a list of Phone, the
+        fast path for renderers building one per row.
+        """
+        record = cls.__new__(cls)
+        (
+            record.first_name,
+            record.last_name,
+            record.additional_names,
+            record.prefix,
+            record.suffix,
+            record.formatted_name,
+            record.email,
+            record.address,
+            record.org,
+            record.title,
+            record.url,
+            record.bday,
+            record.photo,
+        ) = values
+        record.phone = phone
+        return record
+
+    def __getitem__(self, key):
+        if key in _SLOTS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _SLOTS:
+            return getattr(self, key)
+        return default
+
+    def __setitem__(self, key, value):
+        if key not in _SLOTS:
+            raise KeyError(key)
+        if key == "phone":
+            value = [Phone.of(ph) for ph in value or []]
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __reduce__(self):
+        # a flat tuple pickles smaller than the default slot state dict
+        return (
+            ContactRecord.from_values,
+            (tuple(getattr(self, name) for name in FIELDS), self.phone),
+        )
+
+    def __repr__(self):
+        return f"ContactRecord({dict(self)!r})"
+
+
+_SLOTS = frozenset(ContactRecord.__slots__)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import sqlite3
+from itertools import islice
+
+# default cap on the rendered text kept in a cache file
+DEFAULT_MAX_BYTES = 256 * 2**20
+# rows looked up per query, below SQLite's bound parameter limit
+BATCH_SIZE = 500
+# bump when the card layout changes so old caches stop matching
+FORMAT_VERSION = 1
+
+
+class RenderCache:
+    """
+    Rendered vCards kept in an SQLite file between runs, so re-exporting a
+    sheet where few rows changed only renders those rows.
+
+    A card is keyed by a hash of the row's mapped cells salted with the
+    mapping (columns, phone types, phone region), so editing an unmapped
+    column still hits and changing the mapping misses everything. A mapped
+    photo column also keys on each image file's mtime and size, so replacing
+    an image under the same path renders its card again. Every hit marks its
+    card as used by this run; cards last used by the oldest runs are evicted
+    once the stored text goes over `max_bytes`. `stats()` reports the hit
+    rate of this run.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        # several cli.py jobs may share one cache file, wait for each other's writes
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS cards (
+                key BLOB PRIMARY KEY,
+                card TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                run INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS cards_run ON cards (run);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);
+            """)
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'run'").fetchone()
+        self.run = (row[0] if row else 0) + 1
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('run', ?)", (self.run,))
+
+    def close(self):
+        if self.db is None:
+            return
+        self.evict()
+        self.db.commit()
+        self.db.close()
+        self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def mapping_key(plan) -> bytes:
+        """
+        Digest of everything besides the cells that decides how a row renders.
+        """
+        spec = {
+            "version": FORMAT_VERSION,
+            "positions": plan.positions,
+            "phones": plan.phones,
+            "region": getattr(plan.normalizer, "region", None),
+            "photo_size": getattr(plan.photos, "max_size", None),
+        }
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).digest()
+
+    def render(self, rows, plan):
+        """
+        Yield plan.render(row) for every row, in order, taking unchanged rows
+        from the cache and storing the ones that had to be rendered.
+        """
+        salt = self.mapping_key(plan)[:16]
+        mapped = [i for i in plan.positions.values() if i is not None]
+        mapped += [i for i, _ in plan.phones]
+        photo = plan.positions.get("photo")
+        stamp = plan.photos.stamp if photo is not None else None
+        rows = iter(rows)
+        while batch := list(islice(rows, BATCH_SIZE)):
+            keys = []
+            for row in batch:
+                cells = [row[i] for i in mapped]
+                if stamp is not None:
+                    cells.append(stamp(row[photo]))
+                keys.append(
+                    hashlib.blake2b(
+                        "\x1f".join(cells).encode(), digest_size=16, salt=salt
+                    ).digest()
+                )
+            marks = ",".join("?" * len(keys))
+            found, stale = {}, []
+            for key, card, run in self.db.execute(
+                f"SELECT key, card, run FROM cards WHERE key IN ({marks})", keys
+            ):
+                found[key] = card
+                if run < self.run:
+                    stale.append(key)
+            # one UPDATE per batch keeps the last-used run exact for eviction
+            if stale:
+                self.db.execute(
+                    f"UPDATE cards SET run = ? WHERE key IN ({','.join('?' * len(stale))})",
+                    [self.run, *stale],
+                )
+            new = {}
+            for key, row in zip(keys, batch):
+                card = found.get(key) or new.get(key)
+                if card is None:
+                    card = new[key] = plan.render(row)
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                yield card
+            if new:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?)",
+                    [(k, c, len(c), self.run) for k, c in new.items()],
+                )
+        self.db.commit()
+
+    def size(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM cards").fetchone()[0]
+
+    def evict(self):
+        """
+        Drop the least recently used cards until the stored text fits max_bytes.
+        """
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        before = self.db.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        # whole runs go oldest first, then single cards of the oldest run left
+        for run, run_size in self.db.execute(
+            "SELECT run, SUM(size) FROM cards GROUP BY run ORDER BY run"
+        ).fetchall():
+            if total - run_size < self.max_bytes:
+                break
+            self.db.execute("DELETE FROM cards WHERE run = ?", (run,))
+            total -= run_size
+        if total > self.max_bytes:
+            drop = []
+            for key, size in self.db.execute(
+                "SELECT key, size FROM cards ORDER BY run, key"
+            ):
+                drop.append((key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self.db.executemany("DELETE FROM cards WHERE key = ?", drop)
+        self.evicted += (
+            before - self.db.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evicted": self.evicted,
+        }
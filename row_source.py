@@ -0,0 +1,693 @@
+import csv
+import json
+import os
+import posixpath
+import threading
+import xml.sax
+import zipfile
+from html.parser import HTMLParser
+from itertools import islice
+from xml.etree import ElementTree
+
+import tablib
+import yaml
+
+# bytes read per step by the incremental (ods, json, html) readers
+CHUNK_SIZE = 1 << 16
+
+
+def cell_text(value) -> str:
+    """
+    A spreadsheet cell as text: None is "", whole floats lose their ".0" (so
+    numbers typed into a sheet, like phones, come out as written).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def fit_row(row, width) -> tuple:
+    """
+    `row` as a tuple of `width` cell strings, padded with "" or cut.
+    """
+    row = [cell_text(v) for v in row[:width]]
+    if len(row) < width:
+        row += [""] * (width - len(row))
+    return tuple(row)
+
+
+def is_blank(row) -> bool:
+    """
+    Whether a fitted row has no text in any cell. Such rows (empty lines, a
+    line of just commas, an empty spreadsheet row) are skipped by every
+    reader, so previews, the profiler and conversions see the same rows.
+    """
+    return not any(row)
+
+
+class RowSource:
+    """
+    Lazy source of table rows.
+    `headers` is read up front, iterating yields each data row as a tuple of str
+    padded/trimmed to the header width. Every iteration re-reads from the start.
+    """
+
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.headers = []
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """
+        Number of data rows, by reading through the file once.
+        """
+        return sum(1 for _ in self)
+
+    def _fit(self, row):
+        return fit_row(row, len(self.headers))
+
+
+class DelimitedRowSource(RowSource):
+    """
+    Streams CSV/TSV files one row at a time through the csv module.
+    """
+
+    def __init__(self, filePath, delimiter=","):
+        super().__init__(filePath)
+        self.delimiter = delimiter
+        with self._open() as f:
+            self.headers = next(csv.reader(f, delimiter=self.delimiter), [])
+
+    def _open(self):
+        return open(self.filePath, "r", newline="", encoding="utf-8-sig")
+
+    def __iter__(self):
+        with self._open() as f:
+            reader = csv.reader(f, delimiter=self.delimiter)
+            next(reader, None)
+            for row in reader:
+                row = self._fit(row)
+                if not is_blank(row):
+                    yield row
+
+
+class TablibRowSource(RowSource):
+    """
+    Fallback for formats that can't be streamed: loads the whole file with tablib.
+    When a head reader exists for the format only the header row is read up
+    front and tablib loads the file on first iteration.
+    """
+
+    def __init__(self, filePath):
+        super().__init__(filePath)
+        self._dataset = None
+        # count() may run on a worker thread while rows are read on another
+        self._load_lock = threading.Lock()
+        if file_ext(filePath) in HEAD_READERS:
+            self.headers = preview(filePath, 0)[0]
+        else:
+            self.headers = self.dataset.headers or []
+
+    @property
+    def dataset(self):
+        if self._dataset is None:
+            with self._load_lock:
+                if self._dataset is None:
+                    mode = (
+                        "rb"
+                        if self.filePath.lower().endswith((".xls", ".xlsx", ".ods"))
+                        else "r"
+                    )
+                    with open(self.filePath, mode) as f:
+                        content = f.read()
+                    self._dataset = tablib.Dataset().load(content)
+        return self._dataset
+
+    def __iter__(self):
+        for row in self.dataset:
+            row = self._fit(list(row))
+            if not is_blank(row):
+                yield row
+
+    def count(self) -> int:
+        # the dataset is loaded once and kept for the conversion that follows
+        return sum(1 for _ in self)
+
+
+def iter_delimited_rows(filePath, delimiter=","):
+    with open(filePath, "r", newline="", encoding="utf-8-sig") as f:
+        # the header is the first line like DelimitedRowSource's, head_rows
+        # skips the blank rows after it
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_XLSX_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_XLSX_ROW = _XLSX_NS + "row"
+_XLSX_CELL = _XLSX_NS + "c"
+_XLSX_VALUE = _XLSX_NS + "v"
+_XLSX_TEXT = _XLSX_NS + "t"
+
+
+def _xlsx_part(base, target):
+    # a relationship target, relative to the folder of the part it is from
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(base, target))
+
+
+def _xlsx_rels(book, part):
+    path = posixpath.join(
+        posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels"
+    )
+    base = posixpath.dirname(part)
+    return {
+        rel.get("Id"): (
+            rel.get("Type").rsplit("/", 1)[-1],
+            _xlsx_part(base, rel.get("Target")),
+        )
+        for rel in ElementTree.fromstring(book.read(path))
+    }
+
+
+def _xlsx_text(element):
+    # a shared or inline string: one <t>, or rich text runs (phonetic runs left out)
+    text = element.find(_XLSX_TEXT)
+    if text is not None:
+        return text.text or ""
+    return "".join(
+        run.findtext(_XLSX_TEXT) or "" for run in element.iterfind(_XLSX_NS + "r")
+    )
+
+
+def _xlsx_shared_strings(book, part):
+    # the shared strings in order, parsed as they are asked for
+    if part is None:
+        return
+    with book.open(part) as f:
+        parent = None
+        for event, element in ElementTree.iterparse(f, ("start", "end")):
+            if event == "start":
+                parent = parent if parent is not None else element
+            elif element.tag == _XLSX_NS + "si":
+                yield _xlsx_text(element)
+                # drop the strings already handed out from the tree
+                parent.clear()
+
+
+def _xlsx_date_styles(book, part):
+    # cell style index -> timedelta? for the styles whose number format is a date
+    from openpyxl.styles.numbers import (
+        BUILTIN_FORMATS,
+        is_date_format,
+        is_timedelta_format,
+    )
+
+    if part is None:
+        return {}
+    root = ElementTree.fromstring(book.read(part))
+    formats = dict(BUILTIN_FORMATS)
+    for fmt in root.iterfind(f"{_XLSX_NS}numFmts/{_XLSX_NS}numFmt"):
+        formats[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+    dates = {}
+    for i, xf in enumerate(root.iterfind(f"{_XLSX_NS}cellXfs/{_XLSX_NS}xf")):
+        code = formats.get(int(xf.get("numFmtId", 0)))
+        if code and is_date_format(code):
+            dates[i] = is_timedelta_format(code)
+    return dates
+
+
+def iter_xlsx_rows(filePath):
+    """
+    Rows of the active sheet, the values openpyxl's read-only mode gives, but
+    parsed with iterparse from the sheet XML as it is decompressed: nothing is
+    sized up front (openpyxl reads a sheet without a <dimension> to the end
+    before its first row) and shared strings are read only as far as the
+    rows so far refer to.
+    """
+    from openpyxl.utils.cell import column_index_from_string
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+    from openpyxl.utils.datetime import from_excel, from_ISO8601
+
+    with zipfile.ZipFile(filePath) as book:
+        root_rels = ElementTree.fromstring(book.read("_rels/.rels"))
+        workbook = next(
+            _xlsx_part("", rel.get("Target"))
+            for rel in root_rels
+            if rel.get("Type").endswith("/officeDocument")
+        )
+        rels = _xlsx_rels(book, workbook)
+        parts = {kind: part for kind, part in rels.values()}
+        root = ElementTree.fromstring(book.read(workbook))
+        props = root.find(_XLSX_NS + "workbookPr")
+        date1904 = props is not None and props.get("date1904") in ("1", "true")
+        epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+        view = root.find(f"{_XLSX_NS}bookViews/{_XLSX_NS}workbookView")
+        sheets = root.findall(f"{_XLSX_NS}sheets/{_XLSX_NS}sheet")
+        active = int(view.get("activeTab", 0)) if view is not None else 0
+        sheet = rels[sheets[min(active, len(sheets) - 1)].get(_XLSX_REL)][1]
+        dates = _xlsx_date_styles(book, parts.get("styles"))
+        strings, shared = [], _xlsx_shared_strings(book, parts.get("sharedStrings"))
+
+        def value(cell):
+            kind = cell.get("t", "n")
+            if kind == "inlineStr":
+                inline = cell.find(_XLSX_NS + "is")
+                return None if inline is None else _xlsx_text(inline)
+            text = cell.findtext(_XLSX_VALUE) or None
+            if text is None:
+                return None
+            if kind == "n":
+                number = (
+                    float(text)
+                    if "." in text or "E" in text or "e" in text
+                    else int(text)
+                )
+                style = int(cell.get("s", 0))
+                if style in dates:
+                    try:
+                        return from_excel(number, epoch, timedelta=dates[style])
+                    except (OverflowError, ValueError):
+                        return "#VALUE!"
+                return number
+            if kind == "s":
+                i = int(text)
+                strings.extend(islice(shared, i + 1 - len(strings)))
+                return strings[i]
+            if kind == "b":
+                return bool(int(text))
+            if kind == "d":
+                return from_ISO8601(text)
+            # "str" (a formula's text) and "e" (an error) are the text itself
+            return text
+
+        try:
+            with book.open(sheet) as f:
+                done, parent = 0, None
+                for event, element in ElementTree.iterparse(f, ("start", "end")):
+                    if event == "start":
+                        if element.tag == _XLSX_NS + "sheetData":
+                            parent = element
+                        continue
+                    if element.tag != _XLSX_ROW:
+                        continue
+                    index = int(element.get("r", done + 1))
+                    # rows missing from the XML come out empty, like openpyxl's
+                    for _ in range(done + 1, index):
+                        yield ()
+                    done = index
+                    row, column = [], 0
+                    for cell in element.iter(_XLSX_CELL):
+                        ref = cell.get("r")
+                        column = (
+                            column_index_from_string(ref.rstrip("0123456789"))
+                            if ref
+                            else column + 1
+                        )
+                        row += [None] * (column - 1 - len(row))
+                        row.append(value(cell))
+                    # drop the rows already read from the tree
+                    parent.clear()
+                    yield tuple(row)
+        finally:
+            shared.close()
+
+
+def iter_xls_rows(filePath):
+    """
+    Rows of the first sheet; xlrd's on_demand mode skips loading the other sheets.
+    Date and error cells are converted like tablib does, to a datetime and the
+    error text ("#DIV/0!"), instead of xlrd's serial number and error code.
+    """
+    import xlrd
+
+    book = xlrd.open_workbook(filePath, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for i in range(sheet.nrows):
+            row = sheet.row_values(i)
+            for j, type_ in enumerate(sheet.row_types(i)):
+                if type_ == xlrd.XL_CELL_DATE:
+                    row[j] = xlrd.xldate_as_datetime(row[j], book.datemode)
+                elif type_ == xlrd.XL_CELL_ERROR:
+                    row[j] = xlrd.error_text_from_code[row[j]]
+            yield row
+    finally:
+        book.release_resources()
+
+
+_TABLE_NS = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+_OFFICE_NS = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+_TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+# value attribute holding the cell's value for each office:value-type
+_ODS_VALUES = {
+    "float": "value",
+    "percentage": "value",
+    "currency": "value",
+    "date": "date-value",
+    "time": "time-value",
+    "boolean": "boolean-value",
+}
+
+
+class _OdsRows(xml.sax.ContentHandler):
+    """
+    SAX handler collecting the rows of the first table of an ODS content.xml.
+    Repeated cells and rows are expanded, except blank runs at the end of a row
+    and blank rows, which is how spreadsheets pad out to the sheet size.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.done = False
+        self._depth = 0
+        self._row = None
+        self._cell = None
+        self._text = None
+
+    def startElementNS(self, name, qname, attrs):
+        ns, tag = name
+        if self.done:
+            return
+        if ns == _TABLE_NS:
+            if tag == "table":
+                self._depth += 1
+            elif self._depth != 1:
+                return
+            elif tag == "table-row":
+                self._row, self._blank = [], 0
+                self._row_repeat = int(
+                    attrs.get((_TABLE_NS, "number-rows-repeated"), 1)
+                )
+            elif tag in ("table-cell", "covered-table-cell"):
+                kind = attrs.get((_OFFICE_NS, "value-type"))
+                value = attrs.get((_OFFICE_NS, _ODS_VALUES.get(kind, "")))
+                if value is not None and kind in ("float", "percentage", "currency"):
+                    value = cell_text(float(value))
+                self._cell = value
+                self._text = []
+                self._repeat = int(attrs.get((_TABLE_NS, "number-columns-repeated"), 1))
+        elif self._text is not None and ns == _TEXT_NS:
+            if tag == "p" and self._text:
+                self._text.append("\n")
+            elif tag == "s":
+                self._text.append(" " * int(attrs.get((_TEXT_NS, "c"), 1)))
+            elif tag == "tab":
+                self._text.append("\t")
+            elif tag == "line-break":
+                self._text.append("\n")
+
+    def characters(self, content):
+        if self._text is not None:
+            self._text.append(content)
+
+    def endElementNS(self, name, qname):
+        ns, tag = name
+        if self.done or ns != _TABLE_NS:
+            return
+        if tag == "table":
+            self._depth -= 1
+            self.done = self._depth == 0
+        elif self._depth != 1:
+            return
+        elif tag in ("table-cell", "covered-table-cell"):
+            value = self._cell if self._cell is not None else "".join(self._text)
+            self._text = None
+            if value == "":
+                self._blank += self._repeat
+            else:
+                self._row += [""] * self._blank + [value] * self._repeat
+                self._blank = 0
+        elif tag == "table-row":
+            if self._row:
+                self.rows += [self._row] * min(self._row_repeat, 1 << 20)
+            self._row = None
+
+
+def iter_ods_rows(filePath):
+    """
+    Rows of the first sheet, parsed with SAX from content.xml as it is
+    decompressed, so only the rows not yet consumed are held in memory.
+    """
+    handler = _OdsRows()
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_namespaces, True)
+    parser.setContentHandler(handler)
+    with zipfile.ZipFile(filePath) as book, book.open("content.xml") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            parser.feed(chunk)
+            rows, handler.rows = handler.rows, []
+            yield from rows
+            if handler.done:
+                return
+        parser.close()
+        yield from handler.rows
+
+
+def _records_to_rows(records):
+    # a list of objects, as tablib writes yaml and json: keys of the first are the headers
+    headers = None
+    for record in records:
+        if headers is None:
+            headers = list(record)
+            yield headers
+        yield [record.get(h) for h in headers]
+
+
+def iter_yaml_rows(filePath):
+    """
+    Rows of a YAML list of mappings, composed one list item at a time.
+    """
+
+    def records():
+        with open(filePath, "r", encoding="utf-8") as f:
+            loader = yaml.SafeLoader(f)
+            try:
+                for event in (yaml.StreamStartEvent, yaml.DocumentStartEvent):
+                    if not loader.check_event(event):
+                        return
+                    loader.get_event()
+                if not loader.check_event(yaml.SequenceStartEvent):
+                    return
+                loader.get_event()
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    yield loader.construct_document(loader.compose_node(None, None))
+            finally:
+                loader.dispose()
+
+    return _records_to_rows(records())
+
+
+def iter_json_rows(filePath):
+    """
+    Rows of a JSON array of objects, decoded one object at a time.
+    """
+
+    def records():
+        decoder = json.JSONDecoder()
+        with open(filePath, "r", encoding="utf-8") as f:
+            buf, pos, started = "", 0, False
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf):
+                    if not started:
+                        if buf[pos] != "[":
+                            raise ValueError(f"{filePath}: expected a JSON array")
+                        started, pos = True, pos + 1
+                        continue
+                    if buf[pos] == "]":
+                        return
+                    try:
+                        record, pos = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        pass
+                    else:
+                        yield record
+                        continue
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    if pos < len(buf):
+                        raise ValueError(f"{filePath}: truncated JSON")
+                    return
+                buf, pos = buf[pos:] + chunk, 0
+
+    return _records_to_rows(records())
+
+
+class _HtmlRows(HTMLParser):
+    """
+    Collects the rows (th and td cells) of the first <table>.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.done = False
+        self._depth = 0
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._depth += 1
+        elif self._depth == 1 and tag == "tr":
+            self._row = []
+        elif self._row is not None and tag in ("td", "th"):
+            self._cell = []
+        elif self._cell is not None and tag == "br":
+            self._cell.append("\n")
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            self._depth -= 1
+            self.done = self.done or self._depth == 0
+        elif tag in ("td", "th") and self._cell is not None:
+            self._row.append("".join(self._cell).strip())
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._row:
+                self.rows.append(self._row)
+            self._row = None
+
+
+def iter_html_rows(filePath):
+    parser = _HtmlRows()
+    with open(filePath, "r", encoding="utf-8") as f:
+        while not parser.done and (chunk := f.read(CHUNK_SIZE)):
+            parser.feed(chunk)
+            rows, parser.rows = parser.rows, []
+            yield from rows
+        parser.close()
+        yield from parser.rows
+
+
+# file extension -> reader yielding the header row and then the data rows
+# as raw values; used for head-only previews
+HEAD_READERS = {
+    ".csv": lambda path: iter_delimited_rows(path, ","),
+    ".tsv": lambda path: iter_delimited_rows(path, "\t"),
+    ".xlsx": iter_xlsx_rows,
+    ".xls": iter_xls_rows,
+    ".ods": iter_ods_rows,
+    ".yaml": iter_yaml_rows,
+    ".yml": iter_yaml_rows,
+    ".json": iter_json_rows,
+    ".html": iter_html_rows,
+    ".htm": iter_html_rows,
+}
+
+
+def head_rows(filePath):
+    """
+    The headers of a table and an iterator over its rows (tuples of str, like
+    a RowSource gives, blank rows skipped) that reads no further into the
+    file than it is asked to. Formats without a head reader fall back to a
+    full load. Close the iterator when done with it early.
+    """
+    reader = HEAD_READERS.get(file_ext(filePath))
+    if reader is None:
+        source = open_rows(filePath)
+        return source.headers, iter(source)
+    it = reader(filePath)
+    try:
+        headers = [cell_text(h) for h in next(it, [])]
+    except BaseException:
+        getattr(it, "close", lambda: None)()
+        raise
+
+    def rows():
+        try:
+            for row in it:
+                row = fit_row(list(row), len(headers))
+                if not is_blank(row):
+                    yield row
+        finally:
+            # closes the file / workbook behind a generator left half-way
+            getattr(it, "close", lambda: None)()
+
+    return headers, rows()
+
+
+def preview(filePath, rows=5):
+    """
+    The headers and first `rows` rows of a table, reading no more of the file
+    than that, see head_rows.
+    Returns (headers, [tuple of str, ...]) like a RowSource would give.
+    """
+    headers, it = head_rows(filePath)
+    try:
+        return headers, list(islice(it, rows))
+    finally:
+        getattr(it, "close", lambda: None)()
+
+
+class StreamingRowSource(RowSource):
+    """
+    Rows straight from a spreadsheet reader (iter_xlsx_rows, iter_xls_rows,
+    iter_ods_rows, iter_html_rows, iter_json_rows, iter_yaml_rows), one at a
+    time, instead of tablib's whole-file load.
+    The first row is the header; blank rows are skipped as for CSV.
+    """
+
+    def __init__(self, filePath, reader):
+        super().__init__(filePath)
+        self.reader = reader
+        rows = reader(filePath)
+        try:
+            self.headers = [cell_text(h) for h in next(rows, [])]
+        finally:
+            rows.close()
+
+    def __iter__(self):
+        rows = self.reader(self.filePath)
+        try:
+            next(rows, None)
+            for row in rows:
+                row = self._fit(row)
+                if not is_blank(row):
+                    yield row
+        finally:
+            rows.close()
+
+
+# file extension -> row source factory, anything else falls back to tablib
+SOURCES = {
+    ".csv": lambda path: DelimitedRowSource(path, ","),
+    ".tsv": lambda path: DelimitedRowSource(path, "\t"),
+    ".xlsx": lambda path: StreamingRowSource(path, iter_xlsx_rows),
+    ".xls": lambda path: StreamingRowSource(path, iter_xls_rows),
+    ".ods": lambda path: StreamingRowSource(path, iter_ods_rows),
+    ".html": lambda path: StreamingRowSource(path, iter_html_rows),
+    ".htm": lambda path: StreamingRowSource(path, iter_html_rows),
+    ".json": lambda path: StreamingRowSource(path, iter_json_rows),
+    ".yaml": lambda path: StreamingRowSource(path, iter_yaml_rows),
+    ".yml": lambda path: StreamingRowSource(path, iter_yaml_rows),
+}
+
+
+def register_source(ext: str, factory) -> None:
+    """
+    Register a row source factory (called with the file path) for an extension.
+    """
+    SOURCES[ext.lower()] = factory
+
+
+def file_ext(filePath) -> str:
+    return os.path.splitext(filePath)[1].lower()
+
+
+def open_rows(filePath) -> RowSource:
+    """
+    Pick the row source for `filePath` by its extension.
+    """
+    return SOURCES.get(file_ext(filePath), TablibRowSource)(filePath)
@@ -0,0 +1,44 @@
+import os
+import sys
+
+# the converter modules live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# test_read.py / test_write.py are scripts that work on ./table_data relative to
+# the current directory, they are run by hand rather than collected
+collect_ignore = ["test_read.py", "test_write.py"]
+
+import pytest  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+TABLE_DATA = os.path.join(os.path.dirname(__file__), "table_data")
+
+
+@pytest.fixture
+def table_cols():
+    """
+    The select_col answers that produced the checked-in contact.vcf
+    (first_name=Name, last_name=City, phone=Phone).
+    """
+    cols = dict.fromkeys(
+        [
+            "first_name",
+            "last_name",
+            "formatted_name",
+            "additional_names",
+            "prefix",
+            "suffix",
+            "email",
+            "address",
+            "url",
+            "bday",
+            "org",
+            "title",
+            "photo",
+        ],
+        "",
+    )
+    cols.update(
+        first_name="Name", last_name="City", phone=[["Phone"], ["CELL", "CELL", "CELL"]]
+    )
+    return cols
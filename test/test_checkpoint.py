@@ -0,0 +1,138 @@
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from checkpoint import Checkpoint, checkpoint_path
+from conftest import ROOT, TABLE_DATA
+from main import Contact
+from test_write import SYNTHETIC_HEADERS, generate_rows, write_table
+
+MAPPING = {
+    "first_name": "Name",
+    "last_name": "Surname",
+    "phone": ["Phone", "Work Phone", "Home Phone"],
+    "phone_types": ["CELL", "WORK", "HOME"],
+    "email": "Email",
+    "org": "Company",
+    "title": "Title",
+}
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_at(count):
+    def progress(done):
+        if done == count:
+            raise Interrupted
+
+    return progress
+
+
+def reference():
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        return f.read()
+
+
+def test_resumes_from_the_last_checkpoint(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    out = str(tmp_path / "out.vcf")
+    with pytest.raises(Interrupted):
+        obj.create_vcard(
+            out, checkpoint=Checkpoint(out, every_cards=2), progress=interrupt_at(4)
+        )
+    with open(checkpoint_path(out), encoding="utf-8") as f:
+        saved = json.load(f)
+    # cards 3 and 4 were written after the last checkpoint
+    assert saved["rows"] == 2 and os.path.getsize(out) > saved["bytes"]
+    seen = []
+    checkpoint = Checkpoint(out, every_cards=2)
+    assert obj.create_vcard(out, checkpoint=checkpoint, progress=seen.append) == 5
+    assert checkpoint.resumed == 2 and seen == [3, 4, 5]
+    with open(out, "rb") as f:
+        assert f.read() == reference()
+    assert not os.path.exists(checkpoint_path(out))
+
+
+def test_saved_size_is_in_bytes(tmp_path, table_cols):
+    # multi-byte names, where a text file's tell() cookie isn't a byte count
+    table = tmp_path / "names.csv"
+    table.write_text(
+        "Name,City,Phone\n" + "Zoë,Köln,+49 221 1234567\n" * 5, encoding="utf-8"
+    )
+    obj = Contact(str(table))
+    obj.cols = table_cols
+    out = str(tmp_path / "out.vcf")
+    with pytest.raises(Interrupted):
+        obj.create_vcard(
+            out, checkpoint=Checkpoint(out, every_cards=2), progress=interrupt_at(3)
+        )
+    with open(checkpoint_path(out), encoding="utf-8") as f:
+        saved = json.load(f)
+    with open(out, "rb") as f:
+        written = f.read()
+    assert saved["rows"] == 2
+    assert written[: saved["bytes"]].count(b"END:VCARD") == 2
+    assert written[: saved["bytes"]].endswith(b"END:VCARD\n")
+
+
+def test_starts_over_when_the_mapping_changed(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = {**table_cols, "last_name": ""}
+    out = str(tmp_path / "out.vcf")
+    with pytest.raises(Interrupted):
+        obj.create_vcard(
+            out, checkpoint=Checkpoint(out, every_cards=1), progress=interrupt_at(3)
+        )
+    obj.cols = table_cols
+    checkpoint = Checkpoint(out, every_cards=1)
+    obj.create_vcard(out, checkpoint=checkpoint)
+    assert checkpoint.resumed == 0
+    with open(out, "rb") as f:
+        assert f.read() == reference()
+    # without resume an earlier run's checkpoint is ignored
+    with pytest.raises(Interrupted):
+        obj.create_vcard(
+            out, checkpoint=Checkpoint(out, every_cards=1), progress=interrupt_at(3)
+        )
+    obj.create_vcard(out, checkpoint=Checkpoint(out, resume=False))
+    with open(out, "rb") as f:
+        assert f.read() == reference()
+
+
+def test_killed_runs_resume_to_the_same_output(tmp_path):
+    table = str(tmp_path / "big.csv")
+    write_table("csv", table, SYNTHETIC_HEADERS, generate_rows(40000))
+    mapping = tmp_path / "mapping.json"
+    mapping.write_text(json.dumps(MAPPING), encoding="utf-8")
+    cli = [sys.executable, os.path.join(ROOT, "cli.py"), table, "-m", str(mapping)]
+    clean, resumed = tmp_path / "clean", tmp_path / "resumed"
+    subprocess.run(cli + ["-o", str(clean)], check=True, capture_output=True)
+    expected = (clean / "big.vcf").read_bytes()
+
+    args = cli + ["-o", str(resumed), "--resume", "--checkpoint-every", "500"]
+    # the output is written as big.vcf.part until it is complete
+    out = resumed / "big.vcf.part"
+    rng = random.Random(7)
+    # kill three runs at random points once they are writing, then let one
+    # finish
+    for _ in range(3):
+        proc = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+        while proc.poll() is None and not os.path.exists(checkpoint_path(out)):
+            time.sleep(0.01)
+        time.sleep(rng.uniform(0, 0.2))
+        proc.send_signal(signal.SIGKILL)
+        proc.wait()
+    proc = subprocess.run(args, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert "resumed after" in proc.stdout
+    assert (resumed / "big.vcf").read_bytes() == expected
+    assert os.listdir(resumed) == ["big.vcf"]
@@ -0,0 +1,209 @@
+import json
+import locale
+import os
+
+import pytest
+
+from cli import EXIT_FAILED, EXIT_OK, EXIT_USAGE, find_inputs, main
+from column_plan import resolve_mapping
+from conftest import ROOT, TABLE_DATA
+from vcard_writer import ShardedWriter, VCardWriter
+
+MAPPING = {"first_name": "Name", "last_name": "City", "phone": "Phone"}
+
+
+@pytest.fixture
+def mapping(tmp_path):
+    path = tmp_path / "mapping.json"
+    path.write_text(json.dumps(MAPPING), encoding="utf-8")
+    return str(path)
+
+
+def test_resolve_mapping_by_header(table_cols):
+    headers = ["Name", "Age", "City", "Phone"]
+    assert resolve_mapping(MAPPING, headers) == table_cols
+    loose = resolve_mapping({"first_name": " name ", "phone": ["PHONE"]}, headers)
+    assert loose["first_name"] == "Name"
+    with pytest.raises(ValueError):
+        resolve_mapping({"first_name": "Nope"}, headers)
+    with pytest.raises(ValueError):
+        resolve_mapping({"first_name": "Name", "nickname": "Name"}, headers)
+
+
+def test_converts_globs_with_a_pool(tmp_path, mapping, capsys):
+    pattern = os.path.join(TABLE_DATA, "table.xls*")
+    csv = os.path.join(TABLE_DATA, "table.csv")
+    out = tmp_path / "out"
+    code = main([pattern, csv, "-m", mapping, "-o", str(out), "-j", "2"])
+    assert code == EXIT_OK
+    assert sorted(os.listdir(out)) == [
+        "table_csv.vcf",
+        "table_xls.vcf",
+        "table_xlsx.vcf",
+    ]
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert (out / "table_csv.vcf").read_bytes() == f.read()
+    printed = capsys.readouterr().out
+    assert "5 rows" in printed and "rows/sec" in printed
+
+
+def test_exit_codes(tmp_path, mapping):
+    bad = tmp_path / "broken.csv"
+    bad.write_text("Other\nx\n", encoding="utf-8")
+    out = str(tmp_path / "out")
+    assert (
+        main(
+            [
+                str(bad),
+                os.path.join(TABLE_DATA, "table.csv"),
+                "-m",
+                mapping,
+                "-o",
+                out,
+                "-j",
+                "1",
+            ]
+        )
+        == EXIT_FAILED
+    )
+    # the failed file leaves no partial output behind
+    assert sorted(os.listdir(out)) == ["table.vcf"]
+    assert (
+        main([str(tmp_path / "missing*.csv"), "-m", mapping, "-o", out]) == EXIT_USAGE
+    )
+    assert main([str(bad), "-m", str(tmp_path / "nope.json"), "-o", out]) == EXIT_USAGE
+
+
+def failing_write(cls, monkeypatch, at):
+    # the disk fills up when card `at` is written
+    write = cls.write
+    calls = []
+
+    def full(self, card):
+        calls.append(card)
+        if len(calls) == at:
+            raise OSError(28, "No space left on device")
+        write(self, card)
+
+    monkeypatch.setattr(cls, "write", full)
+
+
+def test_failed_sharded_export_leaves_nothing(tmp_path, mapping, monkeypatch, capsys):
+    csv = os.path.join(TABLE_DATA, "table.csv")
+    out = tmp_path / "out"
+    args = [csv, "-m", mapping, "-o", str(out), "--shard-cards", "2"]
+    assert main(args) == EXIT_OK
+    manifest = out / "table.manifest.json"
+    assert f"-> {manifest}: 5 rows" in capsys.readouterr().out
+    failing_write(ShardedWriter, monkeypatch, 4)
+    assert main(args) == EXIT_FAILED
+    assert os.listdir(out) == []
+
+
+def test_failed_run_resumes(tmp_path, mapping, monkeypatch, capsys):
+    csv = os.path.join(TABLE_DATA, "table.csv")
+    out = tmp_path / "out"
+    args = [csv, "-m", mapping, "-o", str(out), "--checkpoint-every", "2"]
+    with monkeypatch.context() as patch:
+        failing_write(VCardWriter, patch, 4)
+        assert main(args) == EXIT_FAILED
+    assert "rerun with --resume to continue" in capsys.readouterr().out
+    assert sorted(os.listdir(out)) == ["table.vcf.part", "table.vcf.part.ckpt"]
+    assert main(args + ["--resume"]) == EXIT_OK
+    assert "resumed after 2 rows" in capsys.readouterr().out
+    assert os.listdir(out) == ["table.vcf"]
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert (out / "table.vcf").read_bytes() == f.read()
+
+
+def test_directories_are_walked():
+    names = [os.path.basename(p) for p in find_inputs([TABLE_DATA])]
+    assert "table.csv" in names and "table.ods" in names
+
+
+def test_auto_map(tmp_path, capsys):
+    csv = os.path.join(TABLE_DATA, "table.csv")
+    out = tmp_path / "out"
+    assert main([csv, "-o", str(out)]) == EXIT_USAGE
+    assert main([csv, "--auto-map", "-o", str(out)]) == EXIT_OK
+    assert "mapping: first_name=Name" in capsys.readouterr().out
+    # the mapping file fills in what the profiler can't tell
+    spec = tmp_path / "last.json"
+    spec.write_text(json.dumps({"last_name": "City"}), encoding="utf-8")
+    assert main([csv, "--auto-map", "-m", str(spec), "-o", str(out)]) == EXIT_OK
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert (out / "table.vcf").read_bytes() == f.read()
+
+
+def test_sort_by(tmp_path, mapping, capsys):
+    csv = os.path.join(TABLE_DATA, "table.csv")
+    out = tmp_path / "out"
+    assert (
+        main([csv, "-m", mapping, "-o", str(out), "--sort-by", "phone"]) == EXIT_USAGE
+    )
+    code = main([csv, "-m", mapping, "-o", str(out), "--sort-by", "last_name"])
+    assert code == EXIT_OK
+    assert "sort: 1 runs" in capsys.readouterr().out
+    text = (out / "table.vcf").read_text(encoding="utf-8")
+    assert text.index("FN:Charlie") < text.index("FN:Alice")
+
+
+def test_sort_uses_the_environment_locale(tmp_path, mapping, monkeypatch):
+    calls = []
+    monkeypatch.setattr(locale, "setlocale", lambda *args: calls.append(args))
+    csv = os.path.join(TABLE_DATA, "table.csv")
+    args = [csv, "-m", mapping, "-o", str(tmp_path)]
+    assert main(args) == EXIT_OK and calls == []
+    assert main(args + ["--sort-by", "last_name"]) == EXIT_OK
+    assert calls[0] == (locale.LC_COLLATE, "")
+
+
+def test_combine(tmp_path, mapping, capsys):
+    inputs = [os.path.join(TABLE_DATA, n) for n in ("table.csv", "table.xlsx")]
+    out = tmp_path / "all.vcf"
+    args = inputs + ["-m", mapping, "--combine", str(out)]
+    assert main(args + ["--sort-by", "last_name"]) == EXIT_USAGE
+    assert main(args + ["-j", "2"]) == EXIT_OK
+    assert "2/2 files -> " in capsys.readouterr().out
+    with open(os.path.join(ROOT, "contact.vcf"), encoding="utf-8") as f:
+        cards = f.read().split("END:VCARD\n")
+    assert sorted(out.read_text(encoding="utf-8").split("END:VCARD\n")) == sorted(
+        cards[:-1] * 2 + [""]
+    )
+
+
+def test_converts_html_tables(tmp_path, mapping):
+    html = os.path.join(TABLE_DATA, "table.html")
+    assert main([html, "-m", mapping, "-o", str(tmp_path)]) == EXIT_OK
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert (tmp_path / "table.vcf").read_bytes() == f.read()
+
+
+def test_dedup(tmp_path, mapping, capsys):
+    path = tmp_path / "people.csv"
+    rows = ["Name,City,Phone", "Ann,Paris,+33 1 23 45 67 89", "Ann,Paris,"]
+    # colleagues behind one switchboard stay apart
+    rows += [f"Person {i},Berlin,+49 30 1234567" for i in range(4)]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    args = [str(path), "-m", mapping, "-o", str(tmp_path), "--dedup"]
+    assert main(args + ["--dedup-key-limit", "3"]) == EXIT_OK
+    printed = capsys.readouterr().out
+    assert "dedup: 6 rows -> 5 contacts, 1 merged" in printed
+    assert "1 shared keys not matched on (e.g. tel:+49301234567 (4 rows))" in printed
+    assert sorted(os.listdir(tmp_path)) == ["mapping.json", "people.csv", "people.vcf"]
+    assert (tmp_path / "people.vcf").read_text(encoding="utf-8").count("BEGIN") == 5
+    assert main(args) == EXIT_OK
+    assert "6 rows -> 2 contacts" in capsys.readouterr().out
+
+
+def test_memory_and_profile(tmp_path, mapping, capsys):
+    csv = os.path.join(TABLE_DATA, "table.csv")
+    out, profiles = tmp_path / "out", tmp_path / "profiles"
+    args = [csv, "-m", mapping, "-o", str(out), "--trace-memory"]
+    assert main(args + ["--profile", str(profiles)]) == EXIT_OK
+    printed = capsys.readouterr().out
+    assert "peak traced memory" in printed and "cumulative" in printed
+    assert os.listdir(profiles) == ["table.vcf.prof"]
+    assert main(args + ["--stats", "json"]) == EXIT_OK
+    stats = json.loads(capsys.readouterr().out.splitlines()[1])
+    assert stats["peak_memory_bytes"] > 0
@@ -0,0 +1,63 @@
+import pickle
+
+from column_plan import ColumnPlan
+from columnar import ColumnarRenderer
+from main import Contact
+
+HEADERS = ["First", "Last", "Mobile", "Work", "Email", "Company", "Title", "Site"]
+ROWS = [
+    ("Ann", "Lee", "555-1", "555-2", "ann@example.com", "ACME, Inc", "CTO", "a.io"),
+    ("Bo;b", "", "", "555-3", "", "", "", ""),
+    ("Émile", "Zola\nJr", "+33 1", "", "", "Les " * 30, "", "x"),
+]
+
+
+def full_cols(**overrides):
+    cols = dict.fromkeys(
+        ["formatted_name", "additional_names", "prefix", "suffix", "bday"], ""
+    )
+    cols.update(
+        first_name="First",
+        last_name="Last",
+        phone=[["Mobile", "Work"], ["CELL", "WORK", "CELL"]],
+        email="Email",
+        url="Site",
+        org="Company",
+        title="Title",
+    )
+    cols.update(overrides)
+    return cols
+
+
+def test_render_matches_add_contact():
+    contact = Contact.__new__(Contact)
+    for cols in [
+        full_cols(),
+        full_cols(last_name="", email="", org=""),
+        full_cols(formatted_name="Company", prefix="Title"),
+    ]:
+        plan = ColumnPlan(HEADERS, cols)
+        for row in ROWS:
+            assert plan.render(row) == contact.add_contact(plan.data(row))
+
+
+def test_unmapped_fields_get_no_emitter():
+    narrow = ColumnPlan(HEADERS, full_cols(email="", url="", org="", title=""))
+    wide = ColumnPlan(HEADERS, full_cols())
+    assert len(wide.emitters) - len(narrow.emitters) == 4
+
+
+def test_plan_pickles_by_mapping():
+    plan = ColumnPlan(HEADERS, full_cols())
+    clone = pickle.loads(pickle.dumps(plan))
+    assert [clone.render(r) for r in ROWS] == [plan.render(r) for r in ROWS]
+
+
+def test_address_renders_like_add_contact():
+    plan = ColumnPlan(HEADERS + ["Street"], full_cols(address="Street"))
+    rows = [row + ("1 Long Road; Flat 2, " * 6,) for row in ROWS]
+    cards = [plan.render(row) for row in rows]
+    assert "ADR;TYPE=HOME:;;1 Long Road\\; Flat 2\\, 1" in cards[0]
+    contact = Contact.__new__(Contact)
+    assert cards == [contact.add_contact(plan.data(row)) for row in rows]
+    assert ColumnarRenderer(plan).render(rows) == cards
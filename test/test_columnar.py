@@ -0,0 +1,52 @@
+import os
+
+from column_plan import ColumnPlan
+from columnar import ColumnarRenderer, distinct_ratio, render_auto
+from conftest import ROOT, TABLE_DATA
+from main import Contact
+from phone import PhoneNormalizer
+from test_column_plan import HEADERS, ROWS, full_cols
+
+# the same rows many times over, plus one with a long non-ASCII name to fold
+MANY = ROWS * 50 + [("Ωμέγα" * 10, "Ünïcode", "", "", "", "", "", "")]
+
+
+def test_matches_add_contact():
+    contact = Contact.__new__(Contact)
+    for cols in [
+        full_cols(),
+        full_cols(last_name="", email="", org=""),
+        full_cols(formatted_name="Company", prefix="Title"),
+        full_cols(additional_names="Site", suffix="Work"),
+    ]:
+        plan = ColumnPlan(HEADERS, cols)
+        expected = [contact.add_contact(plan.data(row)) for row in MANY]
+        assert ColumnarRenderer(plan).render(MANY) == expected
+
+
+def test_matches_with_normalized_phones():
+    rows = [
+        ("Ann", "Lee", "(415) 555-0132", "not a number", "", "", "", ""),
+        ("Bob", "Ray", "", "+44 20 7946 0958", "", "", "", ""),
+    ] * 3
+    plan = ColumnPlan(HEADERS, full_cols(), PhoneNormalizer("US"))
+    assert ColumnarRenderer(plan).render(rows) == [plan.render(r) for r in rows]
+
+
+def test_auto_goes_columnar_for_repetitive_tables():
+    plan = ColumnPlan(HEADERS, full_cols())
+    assert distinct_ratio(MANY, plan) < 0.05
+    unique = [(f"n{i}",) + ROWS[0][1:4] + (f"{i}@x",) + ROWS[0][5:] for i in range(100)]
+    assert distinct_ratio(unique, plan) > 0.2
+    for rows in (MANY, unique):
+        expected = [plan.render(r) for r in rows]
+        assert list(render_auto(rows, plan, threshold=10)) == expected
+
+
+def test_create_vcard_columnar(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    out = tmp_path / "out.vcf"
+    obj.create_vcard(str(out), backend="columnar")
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert out.read_bytes() == f.read()
@@ -0,0 +1,109 @@
+import json
+import os
+
+from dedup import Deduplicator, key_digest, merge_records, phone_key
+from main import Contact
+
+
+def record(name, phones=(), email=""):
+    return {
+        "first_name": name.split()[0],
+        "last_name": "",
+        "formatted_name": name,
+        "phone": [{"phn": p, "typ": "CELL"} for p in phones],
+        "email": email,
+        "org": "",
+    }
+
+
+def test_phone_key_ignores_formatting():
+    assert phone_key("+1 (212) 555-0187") == "+12125550187"
+    assert phone_key("212.555.0187") == "2125550187"
+    assert phone_key("n/a") == ""
+
+
+def test_transitive_duplicates_are_merged_in_input_order(tmp_path):
+    rows = [
+        record("Ann Lee", ["555-000-1111"]),
+        record("Bob Roe", ["555-000-2222"]),
+        record("A. Lee", ["(555) 000 3333"], email="ANN@example.com"),
+        # links row 0 (phone) and row 2 (email) together
+        record("Annie", ["5550001111", "555 000 4444"], email="ann@example.com "),
+        record("bob  roe"),
+    ]
+    report = tmp_path / "report.jsonl"
+    dedup = Deduplicator(partitions=3, tmpdir=tmp_path, report_path=str(report))
+    merged = list(dedup.run(iter(rows)))
+
+    assert [r["formatted_name"] for r in merged] == ["Ann Lee", "Bob Roe"]
+    assert [p["phn"] for p in merged[0]["phone"]] == [
+        "555-000-1111",
+        "(555) 000 3333",
+        "555 000 4444",
+    ]
+    assert merged[0]["email"] == "ANN@example.com"
+    assert dedup.report == {
+        "rows": 5,
+        "contacts": 2,
+        "merged_groups": 2,
+        "merged_rows": 3,
+        "skipped_keys": 0,
+        "shared_keys": {},
+    }
+    groups = [json.loads(line) for line in report.read_text().splitlines()]
+    assert sorted(g["rows"] for g in groups) == [[0, 2, 3], [1, 4]]
+
+
+def test_merge_fills_empty_fields():
+    a = record("Ann", ["111-1111"])
+    b = dict(record("Ann", ["111 1111"]), org="ACME")
+    merged = merge_records([a, b])
+    assert merged["org"] == "ACME"
+    assert len(merged["phone"]) == 1
+
+
+def test_contact_dedup(tmp_path, table_cols):
+    table = tmp_path / "dupes.csv"
+    table.write_text(
+        "Name,City,Phone\n"
+        "Alice,Paris,+33 1 23 45 67 89\n"
+        "Bob,Rome,+39 06 1234567\n"
+        "Alice,Paris,+33123456789\n",
+        encoding="utf-8",
+    )
+    obj = Contact(str(table))
+    obj.cols = table_cols
+    dedup = Deduplicator(tmpdir=tmp_path)
+    cards = list(obj.vcards(dedup=dedup))
+    assert len(cards) == 2
+    assert dedup.report["merged_rows"] == 1
+
+
+def test_index_is_keyed_by_digest_not_hash(tmp_path):
+    # rows are only joined by keys that are actually equal, whatever hash() says
+    assert key_digest(("tel", "5550001111")) != key_digest(("email", "5550001111"))
+    rows = [record(f"Person {i}", [f"555-{i:07d}"]) for i in range(500)]
+    dedup = Deduplicator(partitions=2, tmpdir=tmp_path)
+    assert len(list(dedup.run(iter(rows + rows[:10])))) == 500
+    assert dedup.report["merged_rows"] == 10
+    assert os.listdir(tmp_path) == []
+
+
+def test_widely_shared_keys_are_not_matched(tmp_path):
+    # everyone calls through the switchboard and writes to info@
+    rows = [
+        record(
+            f"Person {i}", ["+1 212 555 0100", f"+1 212 555 {i:04d}"], "info@acme.com"
+        )
+        for i in range(1000, 1030)
+    ]
+    rows.append(record("Person 1000 again", ["+1 212 555 1000"]))
+    dedup = Deduplicator(partitions=2, tmpdir=tmp_path, max_key_rows=5)
+    merged = list(dedup.run(iter(rows)))
+    assert len(merged) == 30
+    assert dedup.report["merged_rows"] == 1
+    assert dedup.report["skipped_keys"] == 2
+    assert dedup.report["shared_keys"] == {
+        "tel:+12125550100": 30,
+        "email:info@acme.com": 30,
+    }
@@ -0,0 +1,86 @@
+import os
+import random
+from collections import deque
+
+import external_sort
+from column_plan import ColumnPlan
+from conftest import TABLE_DATA
+from dedup import Deduplicator
+from external_sort import ExternalSorter
+from main import Contact
+from vcard_reader import iter_vcards
+
+NAMES = ["Émile", "zoe", "Zoe", "adam", "Bob", "bob", "Ünal", "carl"]
+
+
+def sort_all(sorter, items):
+    keys = deque()
+    cards = sorter.tap(items, lambda item: sorter.key(item[:2]), keys)
+    return list(sorter.sort((f"{a} {b} {i}" for a, b, i in cards), keys))
+
+
+def test_spilled_runs_merge_like_an_in_memory_sort(tmp_path, monkeypatch):
+    rng = random.Random(3)
+    items = [(rng.choice(NAMES), rng.choice(NAMES), i) for i in range(3000)]
+    expected = [
+        f"{a} {b} {i}"
+        for a, b, i in sorted(items, key=lambda t: (t[0].casefold(), t[1].casefold()))
+    ]
+    sorter = ExternalSorter(memory=10000, tmpdir=tmp_path, collate=str)
+    assert sort_all(sorter, items) == expected
+    assert sorter.runs > 20 and sorter.spilled > 0
+    # more runs than are merged at once go through intermediate merges
+    monkeypatch.setattr(external_sort, "MAX_FANIN", 4)
+    assert sort_all(sorter, items) == expected
+    assert os.listdir(tmp_path) == []
+
+
+def test_fits_in_memory_without_spilling(tmp_path):
+    sorter = ExternalSorter(tmpdir=tmp_path)
+    items = [("b", "x", 0), ("a", "y", 1), ("b", "x", 2)]
+    assert sort_all(sorter, items) == ["a y 1", "b x 0", "b x 2"]
+    assert sorter.runs == 1 and sorter.spilled == 0
+
+
+def test_create_vcard_sorted(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    out = tmp_path / "sorted.vcf"
+    sorter = ExternalSorter(memory=200, tmpdir=tmp_path)
+    assert obj.create_vcard(str(out), sort=sorter) == 5
+    cities = [r["last_name"] for r in iter_vcards(str(out))]
+    assert cities == sorted(cities, key=str.casefold) and len(set(cities)) == 5
+    assert sorter.runs > 1
+    # every card is still there
+    unsorted = tmp_path / "rows.vcf"
+    obj.create_vcard(str(unsorted))
+    cards = unsorted.read_text(encoding="utf-8").split("END:VCARD\n")
+    assert sorted(cards) == sorted(out.read_text(encoding="utf-8").split("END:VCARD\n"))
+
+
+def test_sorts_merged_records(tmp_path, table_cols):
+    table = tmp_path / "dupes.csv"
+    table.write_text(
+        "Name,City,Phone\n"
+        "Zed,Rome,+39 06 1234567\n"
+        "Alice,Paris,+33 1 23 45 67 89\n"
+        "Zed,Rome,+390612 34567\n",
+        encoding="utf-8",
+    )
+    obj = Contact(str(table))
+    obj.cols = table_cols
+    sorter = ExternalSorter(fields=["first_name"], tmpdir=tmp_path)
+    cards = list(obj.vcards(dedup=Deduplicator(tmpdir=tmp_path), sort=sorter))
+    assert [c.split("FN:")[1].split("\r\n")[0] for c in cards] == [
+        "Alice Paris",
+        "Zed Rome",
+    ]
+
+
+def test_row_key_derives_fields_like_record_key(table_cols):
+    plan = ColumnPlan(["Name", "City", "Phone"], table_cols)
+    sorter = ExternalSorter(fields=["formatted_name", "org"], collate=str)
+    row_key = sorter.row_key(plan)
+    for row in [("Zed", "Rome", "1"), ("Alice", "Paris", "2")]:
+        assert row_key(row) == sorter.record_key(plan.data(row))
+    assert row_key(("Zed", "Rome", "1")) == ("zed rome", "")
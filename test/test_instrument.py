@@ -0,0 +1,51 @@
+import json
+import os
+import time
+
+from conftest import TABLE_DATA
+from dedup import Deduplicator
+from instrument import Instrumentation
+from main import Contact
+
+
+def test_nested_stages_are_charged_their_own_time():
+    instr = Instrumentation()
+
+    def slow_rows():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+
+    with instr.run():
+        for _ in instr.timed("render", instr.timed("load", slow_rows())):
+            time.sleep(0.005)
+    stages = instr.to_dict()["stages"]
+    assert stages["load"]["items"] == 3 and stages["render"]["items"] == 3
+    assert stages["load"]["wall"] >= 0.03
+    # render's own time excludes the sleeps inside load
+    assert stages["render"]["wall"] < 0.01
+    assert instr.total["wall"] >= 0.045
+
+
+def test_create_vcard_reports_stages(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    instr = Instrumentation(trace_memory=True, profile=str(tmp_path / "render.prof"))
+    assert obj.create_vcard(str(tmp_path / "out.vcf"), instrument=instr) == 5
+    report = json.loads(instr.to_json())
+    assert set(report["stages"]) == {"load", "render", "write"}
+    assert report["stages"]["load"]["items"] == 5
+    assert report["peak_memory_bytes"] > 0
+    assert (tmp_path / "render.prof").exists()
+    summary = instr.summary()
+    assert "render" in summary and "cumulative" in summary
+
+
+def test_dedup_stages(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    instr = Instrumentation()
+    obj.create_vcard(
+        str(tmp_path / "out.vcf"), dedup=Deduplicator(tmpdir=tmp_path), instrument=instr
+    )
+    assert set(instr.stages) == {"load", "map", "dedup", "render", "write"}
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from column_plan import pick_mapping
+from conftest import ROOT, TABLE_DATA
+from multi_source import MultiSource, header_signature
+from vcard_writer import VCardWriter
+
+TABLE = {"first_name": "Name", "last_name": "City", "phone": ["Phone"]}
+CRM = {"first_name": "Given Name", "phone": ["Mobile"], "phone_types": ["WORK"]}
+
+
+def reference_cards():
+    with open(os.path.join(ROOT, "contact.vcf"), encoding="utf-8") as f:
+        return [c + "END:VCARD\n" for c in f.read().split("END:VCARD\n")[:-1]]
+
+
+def write_crm(path, count):
+    lines = ["Given Name,Mobile"]
+    lines += [f"Person {i},+1 415 555 {i:04d}" for i in range(count)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def combine(tmp_path, paths, **kwargs):
+    out = tmp_path / "all.vcf"
+    sources = MultiSource(paths, [TABLE, CRM], batch_cards=7, **kwargs)
+    with VCardWriter(str(out)) as writer:
+        written = sources.write(writer)
+    cards = [c + "END:VCARD\n" for c in out.read_text("utf-8").split("END:VCARD\n")]
+    assert written == len(cards) - 1
+    return sources, cards[:-1]
+
+
+def test_picks_the_first_mapping_that_fits():
+    headers = ["Given Name", "Mobile"]
+    spec, cols = pick_mapping([TABLE, CRM], headers)
+    assert spec is CRM and cols["first_name"] == "Given Name"
+    with pytest.raises(ValueError, match="no mapping fits"):
+        pick_mapping([TABLE, CRM], ["Other"])
+    assert header_signature([" Name", "CITY "]) == header_signature(["name", "city"])
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_mixed_layouts_into_one_file(tmp_path, processes):
+    crm = tmp_path / "crm.csv"
+    write_crm(crm, 40)
+    paths = [
+        os.path.join(TABLE_DATA, "table.csv"),
+        str(crm),
+        os.path.join(TABLE_DATA, "table.xlsx"),
+        os.path.join(TABLE_DATA, "table.ods"),
+    ]
+    sources, cards = combine(tmp_path, paths, readers=3, processes=processes)
+    assert [r["rows"] for r in sources.results] == [5, 40, 5, 5]
+    # one mapping resolved per layout, the three table files share theirs
+    assert len(sources.mappings) == 2
+    people = [c for c in cards if "N:;Person" in c]
+    assert [c.split("N:;")[1].split(";")[0] for c in people] == [
+        f"Person {i}" for i in range(40)
+    ]
+    assert "TEL;TYPE=WORK,VOICE:+1 415 555 0000" in people[0]
+    tables = [c for c in cards if "N:;Person" not in c]
+    assert sorted(tables) == sorted(reference_cards() * 3)
+
+
+def test_unreadable_sources_are_reported(tmp_path):
+    other = tmp_path / "other.csv"
+    other.write_text("Other\nx\n", encoding="utf-8")
+    missing = str(tmp_path / "missing.csv")
+    paths = [str(other), os.path.join(TABLE_DATA, "table.csv"), missing]
+    sources, cards = combine(tmp_path, paths, readers=2)
+    assert cards == reference_cards()
+    first, table, gone = sources.results
+    assert "no mapping fits" in first["error"]
+    assert table["rows"] == 5 and "error" not in table
+    assert "error" in gone
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_headers_resolve_per_source(tmp_path, processes):
+    # same layout, different case: one pick, each file mapped by its own names
+    lower = tmp_path / "lower.csv"
+    with open(os.path.join(TABLE_DATA, "table.csv"), encoding="utf-8") as f:
+        header, rest = f.read().split("\n", 1)
+    lower.write_text(header.lower() + "\n" + rest, encoding="utf-8")
+    paths = [os.path.join(TABLE_DATA, "table.csv"), str(lower)]
+    sources, cards = combine(tmp_path, paths, readers=1, processes=processes)
+    assert [r["rows"] for r in sources.results] == [5, 5]
+    assert len(sources.mappings) == 1
+    assert sorted(cards) == sorted(reference_cards() * 2)
+
+
+def test_partly_written_sources_are_reported(tmp_path):
+    broken = tmp_path / "broken.csv"
+    write_crm(broken, 2000)
+    with open(broken, "ab") as f:
+        f.write(b"Bad \xff\xfe,+1 415 555 0000\n")
+    sources, cards = combine(tmp_path, [str(broken)], readers=1)
+    (result,) = sources.results
+    assert result["partial"] and "UnicodeDecodeError" in result["error"]
+    assert result["rows"] == len(cards) > 0
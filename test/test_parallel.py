@@ -0,0 +1,46 @@
+import csv
+
+from column_plan import ColumnPlan
+from main import Contact
+from parallel import render_cards
+
+
+def write_table(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Age", "City", "Phone"])
+        for i in range(rows):
+            writer.writerow(
+                [f"Näme {i}, Jr", i, "City;" * (i % 30), f"+1-555-{i:07d}"]
+            )
+
+
+def test_parallel_output_is_byte_identical(tmp_path, table_cols):
+    table = tmp_path / "big.csv"
+    write_table(table, 3000)
+    obj = Contact(str(table))
+    obj.cols = table_cols
+
+    serial, parallel = tmp_path / "serial.vcf", tmp_path / "parallel.vcf"
+    obj.create_vcard(str(serial))
+    cards = render_cards(
+        obj.table,
+        ColumnPlan(obj.table.headers, obj.cols),
+        workers=3,
+        chunk_size=128,
+        serial_threshold=500,
+    )
+    with open(parallel, "w", encoding="utf-8", newline="") as f:
+        f.writelines(cards)
+    assert parallel.read_bytes() == serial.read_bytes()
+
+
+def test_small_inputs_stay_serial(tmp_path, table_cols):
+    table = tmp_path / "small.csv"
+    write_table(table, 10)
+    obj = Contact(str(table))
+    obj.cols = table_cols
+    a, b = tmp_path / "a.vcf", tmp_path / "b.vcf"
+    obj.create_vcard(str(a))
+    obj.create_vcard(str(b), workers=4)
+    assert a.read_bytes() == b.read_bytes()
@@ -0,0 +1,93 @@
+import pickle
+
+from cli import main
+from column_plan import ColumnPlan
+from columnar import ColumnarRenderer
+from main import Contact
+from parallel import render_cards
+from phone import PhoneNormalizer
+
+
+def test_normalizes_to_e164_with_default_region():
+    us = PhoneNormalizer("US")
+    assert us.normalize("(415) 555-0132") == "+14155550132"
+    assert us.normalize("+44 20 7946 0958") == "+442079460958"
+    india = PhoneNormalizer("in")
+    assert india.normalize("098450 12345") == "+919845012345"
+
+
+def test_invalid_numbers_are_flagged():
+    norm = PhoneNormalizer("US")
+    assert norm.normalize("12") is None
+    assert norm.normalize("not a number") is None
+    assert norm.normalize("  ") == ""
+    assert norm.invalid == 2
+    assert norm.rejected == ["12", "not a number"]
+
+
+def test_batch_and_cache_hit_rate():
+    norm = PhoneNormalizer("US", cache_size=2)
+    column = ["415-555-0132"] * 8 + ["212 555 0187", "415 555 0132"]
+    result = norm.normalize_many(column)
+    assert result[:8] == ["+14155550132"] * 8
+    assert result[8] == "+12125550187"
+    stats = norm.stats()
+    assert stats["hits"] == 7 and stats["misses"] == 3
+    assert stats["hit_rate"] == 0.7
+    assert stats["cached"] == 2
+
+
+def test_plan_writes_e164_and_drops_invalid(tmp_path):
+    cols = dict.fromkeys(
+        ["last_name", "formatted_name", "additional_names", "prefix", "suffix"], ""
+    )
+    cols.update(
+        dict.fromkeys(["email", "url", "bday", "org", "title"], ""),
+        first_name="Name",
+        phone=[["Mobile", "Office"], ["CELL", "WORK", "CELL"]],
+    )
+    norm = PhoneNormalizer("US")
+    plan = ColumnPlan(["Name", "Mobile", "Office"], cols, norm)
+    row = ("Ann", "415.555.0132", "ext. 12")
+    card = plan.render(row)
+    assert "TEL;TYPE=CELL,VOICE:+14155550132\r\n" in card
+    assert "WORK" not in card
+    assert norm.invalid == 1
+    assert Contact.__new__(Contact).add_contact(plan.data(row)) == card
+    clone = pickle.loads(pickle.dumps(plan))
+    assert clone.render(row) == card
+
+
+def test_invalid_numbers_are_counted_per_row_by_every_renderer():
+    headers = ["Name", "Mobile"]
+    cols = {"first_name": "Name", "phone": [["Mobile"], ["CELL"]]}
+    rows = [(f"P{i}", "12" if i % 3 == 0 else f"415 555 {i:04d}") for i in range(900)]
+    for render in (
+        lambda plan: [plan.render(row) for row in rows],
+        lambda plan: ColumnarRenderer(plan).render(rows),
+        lambda plan: list(
+            render_cards(rows, plan, workers=2, chunk_size=100, serial_threshold=10)
+        ),
+    ):
+        norm = PhoneNormalizer("US")
+        cards = render(ColumnPlan(headers, cols, norm))
+        assert len(cards) == 900
+        assert norm.invalid == 300 and norm.rejected == ["12"]
+
+
+def test_cli_flags_invalid_numbers(tmp_path, capsys):
+    table = tmp_path / "phones.csv"
+    table.write_text("Name,Phone\nAnn,415 555 0132\nBob,12\nCy,n/a\n", encoding="utf-8")
+    mapping = tmp_path / "m.json"
+    mapping.write_text('{"first_name": "Name", "phone": "Phone"}', encoding="utf-8")
+    args = [str(table), "-m", str(mapping), "-o", str(tmp_path), "--region", "US"]
+    assert main(args) == 0
+    assert "phones: 2 invalid numbers dropped (e.g. '12', 'n/a')" in (
+        capsys.readouterr().out
+    )
+    # counted by the reader processes of --combine too
+    copy = tmp_path / "copy.csv"
+    copy.write_text(table.read_text(encoding="utf-8"), encoding="utf-8")
+    combined = [str(table), str(copy), "--combine", str(tmp_path / "all.vcf")]
+    assert main(combined + args[1:] + ["-j", "2"]) == 0
+    assert "phones: 4 invalid numbers dropped" in capsys.readouterr().out
@@ -0,0 +1,136 @@
+import base64
+import io
+import os
+
+import pytest
+
+import column_plan
+from column_plan import ColumnPlan
+from columnar import ColumnarRenderer
+from conftest import TABLE_DATA
+from main import Contact
+from photo import PhotoEncoder, image_type
+from test_column_plan import HEADERS, ROWS, full_cols
+from vcard_encoding import fold_line
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def photos(tmp_path):
+    (tmp_path / "logo.png").write_bytes(PNG)
+    (tmp_path / "copy.png").write_bytes(PNG)
+    (tmp_path / "face.jpg").write_bytes(b"\xff\xd8\xff" + b"face" * 100)
+    return tmp_path
+
+
+def test_shared_images_encode_once(photos):
+    encoder = PhotoEncoder(base_dir=str(photos))
+    line = encoder.property("logo.png")
+    # folded once here, not again for every card it goes into
+    assert line == fold_line(
+        "PHOTO;ENCODING=b;TYPE=PNG:" + base64.b64encode(PNG).decode()
+    )
+    # same content under another path, and an absolute path to the first
+    assert encoder.property("copy.png") == line
+    assert encoder.property(str(photos / "logo.png")) == line
+    assert encoder.property(" face.jpg ").startswith("PHOTO;ENCODING=b;TYPE=JPEG:")
+    assert encoder.stats()["encoded"] == 2
+
+
+def test_missing_images_are_counted_once(photos):
+    encoder = PhotoEncoder(base_dir=str(photos))
+    assert encoder.property("gone.png") == ""
+    assert encoder.property("gone.png") == ""
+    assert encoder.property("") == ""
+    assert encoder.missing == 1
+
+
+def test_image_type():
+    assert image_type(b"GIF89a...") == "GIF"
+    assert image_type(b"RIFF\0\0\0\0WEBPVP8 ") == "WEBP"
+    assert image_type(b"????", "x.jpg") == "JPEG"
+
+
+def test_renderers_agree(photos, monkeypatch):
+    headers = HEADERS + ["Photo"]
+    names = ["logo.png", "face.jpg", "gone.png", "copy.png"]
+    rows = [row + (names[i % 4],) for i, row in enumerate(ROWS * 4)]
+    encoder = PhotoEncoder(base_dir=str(photos))
+    plan = ColumnPlan(headers, full_cols(photo="Photo"), photos=encoder)
+    contact = Contact.__new__(Contact)
+    contact.photos = encoder
+    expected = [contact.add_contact(plan.data(row)) for row in rows]
+    assert [plan.render(row) for row in rows] == expected
+    assert ColumnarRenderer(plan).render(rows) == expected
+    # folded at 75 octets like every other long line
+    card = expected[0]
+    assert "PHOTO;ENCODING=b;TYPE=PNG:" in card
+    assert max(len(line) for line in card.split("\r\n")) <= 75
+    assert "PHOTO" not in expected[2]
+    # the cached property isn't folded again for every card
+    folded = []
+    monkeypatch.setattr(
+        column_plan, "fold_line", lambda line: folded.append(line) or fold_line(line)
+    )
+    assert plan.render(rows[0]) == expected[0]
+    assert folded and not any(line.startswith("PHOTO") for line in folded)
+
+
+def test_prefetch_keeps_order(photos):
+    encoder = PhotoEncoder(base_dir=str(photos), workers=4)
+    rows = [(str(i), ["logo.png", "face.jpg", "nope"][i % 3]) for i in range(50)]
+    assert list(encoder.prefetch(rows, 1, ahead=8)) == rows
+    assert encoder.encoded == 2 and encoder.missing == 1
+
+
+def test_remembered_paths_are_bounded(photos):
+    encoder = PhotoEncoder(base_dir=str(photos), digest_paths=2)
+    line = encoder.property("logo.png")
+    rows = [(str(i), name) for i, name in enumerate(["copy.png", "face.jpg"] * 20)]
+    assert list(encoder.prefetch(rows, 1, ahead=4)) == rows
+    assert list(encoder._digests) == ["copy.png", "face.jpg"]
+    # a forgotten path is read again, its content is still encoded only once
+    assert encoder.property("logo.png") == line
+    assert encoder.encoded == 2
+
+
+def test_create_vcard_reads_photos_next_to_the_table(tmp_path):
+    with open(os.path.join(TABLE_DATA, "table.csv"), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    lines = [lines[0] + ",Photo"] + [line + ",logo.png" for line in lines[1:]]
+    (tmp_path / "table.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    (tmp_path / "logo.png").write_bytes(PNG)
+    obj = Contact(str(tmp_path / "table.csv"))
+    obj.cols = full_cols(
+        first_name="Name",
+        last_name="City",
+        email="",
+        org="",
+        title="",
+        url="",
+        phone=[["Phone"], ["CELL"]],
+        photo="Photo",
+    )
+    out = tmp_path / "out.vcf"
+    rows = obj.create_vcard(str(out))
+    text = out.read_text(encoding="utf-8")
+    assert text.count("PHOTO;ENCODING=b;TYPE=PNG:") == rows == 5
+    assert obj.photos.encoded == 1
+    # an encoder passed for a table without a mapped photo column goes unused
+    obj.cols["photo"] = ""
+    assert obj.create_vcard(str(out), photos=PhotoEncoder()) == 5
+    assert "PHOTO" not in out.read_text(encoding="utf-8")
+
+
+def test_downscale(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    out = io.BytesIO()
+    Image.new("RGB", (400, 200), "red").save(out, "PNG")
+    (tmp_path / "big.png").write_bytes(out.getvalue())
+    encoder = PhotoEncoder(max_size=100, base_dir=str(tmp_path))
+    line = encoder.property("big.png")
+    assert line.startswith("PHOTO;ENCODING=b;TYPE=JPEG:")
+    data = base64.b64decode(line.split(":", 1)[1])
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (100, 50)
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from row_source import preview
+
+TABLE_DATA = os.path.join(os.path.dirname(__file__), "table_data")
+
+FIRST_ROWS = [
+    ("Alice", "24", "New York", "+1-212-555-0187"),
+    ("Bob", "30", "Los Angeles", "+1-310-555-0143"),
+]
+
+
+@pytest.mark.parametrize(
+    "name", ["table.csv", "table.html", "table.ods", "table.xls", "table.xlsx"]
+)
+def test_preview_reads_the_head(name):
+    headers, rows = preview(os.path.join(TABLE_DATA, name), 2)
+    assert headers == ["Name", "Age", "City", "Phone"]
+    assert rows == FIRST_ROWS
+
+
+def test_preview_of_records_formats(tmp_path):
+    # yaml and json tables are lists of objects, the first one's keys are the headers
+    headers, rows = preview(os.path.join(TABLE_DATA, "table.yaml"), 5)
+    assert headers == ["Age", "City", "Name", "Phone"]
+    assert len(rows) == 5 and rows[0] == ("24", "New York", "Alice", "+1-212-555-0187")
+
+    path = tmp_path / "t.json"
+    path.write_text('[{"a": 1, "b": "x"}, {"a": 2.0}, {"a": 3}]', encoding="utf-8")
+    assert preview(str(path), 2) == (["a", "b"], [("1", "x"), ("2", "")])
+
+
+def test_preview_stops_at_the_head(tmp_path):
+    path = tmp_path / "big.json"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('[{"n": 0}')
+        for i in range(1, 200000):
+            f.write(f', {{"n": {i}}}')
+        # a broken tail proves the reader never got there
+        f.write(", {broken")
+    assert preview(str(path), 3) == (["n"], [("0",), ("1",), ("2",)])
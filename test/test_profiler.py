@@ -0,0 +1,124 @@
+import csv
+import os
+import time
+
+from column_plan import resolve_mapping
+from conftest import TABLE_DATA
+from profiler import kind_of, profile, sample_rows, suggest_mapping
+
+CRM = ["Given Name", "Family Name", "Mobile", "Office Phone", "E-mail", "Employer"]
+CRM += ["Job Title", "Homepage", "DOB", "Notes"]
+
+
+def write_crm(path, count):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CRM)
+        for i in range(count):
+            writer.writerow(
+                [
+                    "Ann",
+                    "Lee",
+                    f"+1 415 555 {i % 10000:04d}",
+                    "(212) 555-0100",
+                    f"ann{i}@example.com",
+                    "ACME Inc",
+                    "CTO",
+                    "https://example.com/ann",
+                    "1990-01-02",
+                    "met at a conference",
+                ]
+            )
+
+
+def test_kinds():
+    assert kind_of("ann@example.com") == "email"
+    assert kind_of("https://a.io/x") == "url"
+    assert kind_of("2020-01-31") == kind_of("31/01/2020") == "date"
+    assert kind_of("+1 (415) 555-0132") == "phone"
+    assert kind_of("Initech Ltd.") == "organization"
+    assert kind_of("Zoë O'Brien") == "name"
+    assert kind_of("42 Long Street, Springfield") == kind_of("Baker St") == "address"
+    assert kind_of("Hauptstr. 12, Berlin") == "address"
+    assert kind_of("photos/Ann Lee.PNG") == kind_of("ann.jpg") == "image"
+    assert kind_of("24") is None
+
+
+def test_sample_is_bounded_and_uniform():
+    sample, seen = sample_rows(iter(range(10000)), size=100, max_rows=5000)
+    assert len(sample) == 100 and seen == 5000
+    assert max(sample) >= 2500 and all(v < 5000 for v in sample)
+    sample, seen = sample_rows(iter(range(10)), size=100)
+    assert sample == list(range(10)) and seen == 10
+
+
+def test_suggests_crm_mapping(tmp_path):
+    path = str(tmp_path / "crm.csv")
+    write_crm(path, 300)
+    spec = suggest_mapping(profile(path))
+    assert spec == {
+        "first_name": "Given Name",
+        "last_name": "Family Name",
+        "phone": ["Mobile", "Office Phone"],
+        "phone_types": ["CELL", "WORK"],
+        "email": "E-mail",
+        "org": "Employer",
+        "title": "Job Title",
+        "url": "Homepage",
+        "bday": "DOB",
+    }
+    resolve_mapping(spec, CRM)
+
+
+def test_values_alone_map_unnamed_columns(tmp_path):
+    path = tmp_path / "plain.csv"
+    path.write_text(
+        "a,b,c\n" + "Ann Lee,ann@example.com,555 123 4567\n" * 20, encoding="utf-8"
+    )
+    assert suggest_mapping(profile(str(path))) == {
+        "first_name": "a",
+        "email": "b",
+        "phone": ["c"],
+        "phone_types": ["CELL"],
+    }
+    numbers = tmp_path / "numbers.csv"
+    numbers.write_text("x\n1\n2\n", encoding="utf-8")
+    assert suggest_mapping(profile(str(numbers))) == {}
+
+
+def test_address_and_photo_columns(tmp_path):
+    places = tmp_path / "places.csv"
+    places.write_text(
+        "Name,Street Address,Picture\n" + "Ann Lee,Hauptstr. 12,ann.jpg\n" * 20,
+        encoding="utf-8",
+    )
+    assert suggest_mapping(profile(str(places))) == {
+        "first_name": "Name",
+        "address": "Street Address",
+        "photo": "Picture",
+    }
+    # and by their values alone
+    places.write_text(
+        "Name,d,e\n" + "Ann Lee,10 Downing Street,photos/ann.png\n" * 20,
+        encoding="utf-8",
+    )
+    assert suggest_mapping(profile(str(places))) == {
+        "first_name": "Name",
+        "address": "d",
+        "photo": "e",
+    }
+
+
+def test_reads_only_a_bounded_head(tmp_path):
+    path = str(tmp_path / "big.csv")
+    write_crm(path, 60000)
+    start = time.perf_counter()
+    spec = suggest_mapping(profile(path, max_rows=20000))
+    assert time.perf_counter() - start < 1
+    assert spec["first_name"] == "Given Name"
+
+
+def test_checked_in_tables():
+    for name in ("table.csv", "table.xlsx", "table.ods"):
+        spec = suggest_mapping(profile(os.path.join(TABLE_DATA, name)))
+        assert spec["first_name"] == "Name" and spec["phone"] == ["Phone"]
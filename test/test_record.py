@@ -0,0 +1,53 @@
+import pickle
+
+import pytest
+
+from column_plan import ColumnPlan
+from main import Contact
+from record import ContactRecord, Phone
+from test_column_plan import HEADERS, ROWS, full_cols
+from vcard_writer import create_vcard
+
+DATA = {
+    "first_name": "Ann",
+    "last_name": "Lee",
+    "formatted_name": "Ann Lee",
+    "phone": [{"phn": "555-1", "typ": "WORK"}, {"phn": "555-2"}],
+    "org": "ACME",
+}
+
+
+def test_reads_like_the_dict():
+    record = ContactRecord(DATA, email="ann@example.com")
+    assert record["org"] == record.org == "ACME"
+    assert record.get("suffix") == "" and record.get("nickname", 1) == 1
+    assert record.phone == [Phone("555-1", "WORK"), Phone("555-2", "CELL")]
+    assert record.phone[0]["phn"] == "555-1"
+    assert dict(record)["email"] == "ann@example.com"
+    assert ContactRecord(dict(record)) == record
+    assert not hasattr(record, "__dict__")
+    # like dict(), any keys are taken; the ones that aren't fields are dropped
+    assert ContactRecord({**DATA, "nickname": "A"}, age=3) == ContactRecord(DATA)
+    with pytest.raises(KeyError):
+        record["nickname"] = "A"
+
+
+def test_phone_types_are_shared():
+    typ = "".join(["WO", "RK"])
+    assert Phone("1", typ).typ is Phone("2", "WORK").typ
+
+
+def test_pickles():
+    record = ContactRecord(DATA)
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_renderers_take_records_and_dicts():
+    contact = Contact.__new__(Contact)
+    assert contact.add_contact(ContactRecord(DATA)) == contact.add_contact(DATA)
+    assert create_vcard(ContactRecord(DATA)) == create_vcard(DATA)
+    plan = ColumnPlan(HEADERS, full_cols())
+    for row in ROWS:
+        record = plan.data(row)
+        assert isinstance(record, ContactRecord)
+        assert contact.add_contact(dict(record)) == plan.render(row)
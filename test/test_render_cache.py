@@ -0,0 +1,114 @@
+import os
+
+from column_plan import ColumnPlan
+from conftest import ROOT, TABLE_DATA
+from main import Contact
+from photo import PhotoEncoder
+from render_cache import RenderCache
+
+HEADERS = ["Name", "City", "Phone", "Notes"]
+
+
+def plan_for(table_cols):
+    return ColumnPlan(HEADERS, table_cols)
+
+
+def rows(count, changed=()):
+    return [
+        (f"name{i}{'!' if i in changed else ''}", f"city{i}", f"+1-212-555-{i:04d}", "")
+        for i in range(count)
+    ]
+
+
+def test_warm_run_reuses_cards(tmp_path, table_cols):
+    plan = plan_for(table_cols)
+    path = str(tmp_path / "cache.db")
+    with RenderCache(path) as cache:
+        cold = list(cache.render(rows(1200), plan))
+        assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 1200
+    assert cold == [plan.render(r) for r in rows(1200)]
+
+    # two changed rows and an edit to an unmapped column
+    warm_rows = rows(1200, changed={5, 700})
+    warm_rows[9] = warm_rows[9][:3] + ("new note",)
+    with RenderCache(path) as cache:
+        warm = list(cache.render(warm_rows, plan))
+        stats = cache.stats()
+    assert warm == [plan.render(r) for r in warm_rows]
+    assert (stats["hits"], stats["misses"]) == (1198, 2)
+    assert stats["hit_rate"] == 1198 / 1200
+
+
+def test_mapping_change_misses(tmp_path, table_cols):
+    path = str(tmp_path / "cache.db")
+    with RenderCache(path) as cache:
+        list(cache.render(rows(10), plan_for(table_cols)))
+    table_cols["last_name"] = ""
+    with RenderCache(path) as cache:
+        list(cache.render(rows(10), plan_for(table_cols)))
+        assert cache.stats()["misses"] == 10
+
+
+def test_eviction_keeps_the_latest_runs(tmp_path, table_cols):
+    plan = plan_for(table_cols)
+    path = str(tmp_path / "cache.db")
+    card_size = len(plan.render(rows(1)[0]))
+    for start in (0, 100, 200):
+        with RenderCache(path, max_bytes=150 * card_size) as cache:
+            batch = [(f"n{i}", "c", "p", "") for i in range(start, start + 100)]
+            list(cache.render(batch, plan))
+    with RenderCache(path) as cache:
+        assert cache.size() <= 150 * card_size
+        # the last run's cards are all still there
+        list(cache.render([(f"n{i}", "c", "p", "") for i in range(200, 300)], plan))
+        assert cache.stats()["misses"] == 0
+
+
+def test_create_vcard_with_cache(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        expected = f.read()
+    for _ in range(2):
+        with RenderCache(str(tmp_path / "cache.db")) as cache:
+            obj.create_vcard(str(tmp_path / "out.vcf"), cache=cache)
+        assert (tmp_path / "out.vcf").read_bytes() == expected
+    assert cache.stats()["hit_rate"] == 1.0
+
+
+def test_eviction_keeps_cards_hit_since(tmp_path, table_cols):
+    plan = plan_for(table_cols)
+    path = str(tmp_path / "cache.db")
+    card_size = len(plan.render(rows(1)[0]))
+    live = [(f"live{i}", "c", "p", "") for i in range(50)]
+    with RenderCache(path) as cache:
+        list(cache.render(live, plan))
+    with RenderCache(path) as cache:
+        list(cache.render([(f"dead{i}", "c", "p", "") for i in range(50)], plan))
+    # hitting the first run's cards makes them newer than the dead ones
+    with RenderCache(path) as cache:
+        list(cache.render(live, plan))
+    with RenderCache(path, max_bytes=100 * card_size) as cache:
+        list(cache.render([(f"new{i}", "c", "p", "") for i in range(50)], plan))
+    with RenderCache(path) as cache:
+        list(cache.render(live, plan))
+        assert cache.stats()["misses"] == 0
+
+
+def test_replaced_photo_misses(tmp_path, table_cols):
+    headers = HEADERS + ["Photo"]
+    (tmp_path / "a.png").write_bytes(b"\x89PNG\r\n\x1a\nfirst")
+    path = str(tmp_path / "cache.db")
+    row = ("Ann", "Paris", "+1-212-555-0100", "", "a.png")
+    cards = []
+    for content in (b"first", b"first", b"second image"):
+        (tmp_path / "a.png").write_bytes(b"\x89PNG\r\n\x1a\n" + content)
+        plan = ColumnPlan(
+            headers,
+            dict(table_cols, photo="Photo"),
+            photos=PhotoEncoder(base_dir=str(tmp_path)),
+        )
+        with RenderCache(path) as cache:
+            cards += cache.render([row], plan)
+    assert cards[0] == cards[1] != cards[2]
+    assert cards[2] == plan.render(row)
@@ -0,0 +1,159 @@
+import datetime
+import os
+import time
+import zipfile
+
+from row_source import (
+    DelimitedRowSource,
+    StreamingRowSource,
+    TablibRowSource,
+    fit_row,
+    iter_xlsx_rows,
+    open_rows,
+    preview,
+)
+from test_write import SYNTHETIC_HEADERS, generate_rows, write_table
+
+TABLE_DATA = os.path.join(os.path.dirname(__file__), "table_data")
+
+
+def test_csv_is_streamed():
+    src = open_rows(os.path.join(TABLE_DATA, "table.csv"))
+    assert isinstance(src, DelimitedRowSource)
+    assert src.headers == ["Name", "Age", "City", "Phone"]
+    rows = list(src)
+    assert rows[0] == ("Alice", "24", "New York", "+1-212-555-0187")
+    assert len(rows) == 5
+    # iterating again starts from the top
+    assert next(iter(src)) == rows[0]
+
+
+def test_short_rows_are_padded(tmp_path):
+    path = tmp_path / "short.tsv"
+    path.write_text("a\tb\tc\n1\t2\n\n3\t4\t5\t6\n", encoding="utf-8")
+    src = open_rows(str(path))
+    assert list(src) == [("1", "2", ""), ("3", "4", "5")]
+
+
+def test_blank_rows_are_skipped_alike(tmp_path):
+    # an empty line and a line of just commas, converted and previewed alike
+    path = tmp_path / "blank.csv"
+    path.write_text("a,b\n1,2\n\n,\n3,4\n", encoding="utf-8")
+    rows = [("1", "2"), ("3", "4")]
+    assert list(open_rows(str(path))) == rows
+    assert list(TablibRowSource(str(path))) == rows
+    assert preview(str(path)) == (["a", "b"], rows)
+
+
+def test_spreadsheets_are_streamed():
+    csv_rows = list(open_rows(os.path.join(TABLE_DATA, "table.csv")))
+    for name in ("table.xlsx", "table.ods", "table.xls"):
+        src = open_rows(os.path.join(TABLE_DATA, name))
+        assert isinstance(src, StreamingRowSource)
+        assert src.headers == ["Name", "Age", "City", "Phone"]
+        assert list(src) == csv_rows
+
+
+def test_streamed_rows_match_tablib(tmp_path):
+    import xlwt
+
+    # a date and an error cell, which xlrd reads as a number and an error code
+    book = xlwt.Workbook()
+    sheet = book.add_sheet("dates")
+    for j, header in enumerate(["Name", "Birthday", "Score"]):
+        sheet.write(0, j, header)
+    sheet.write(1, 0, "Alice")
+    sheet.write(
+        1, 1, datetime.date(1990, 1, 2), xlwt.easyxf(num_format_str="YYYY-MM-DD")
+    )
+    sheet.row(1).set_cell_error(2, "#DIV/0!")
+    dates = tmp_path / "dates.xls"
+    book.save(str(dates))
+    assert list(open_rows(str(dates))) == [("Alice", "1990-01-02 00:00:00", "#DIV/0!")]
+    records = tmp_path / "records.json"
+    records.write_text(
+        '[{"Name": "Ann", "Age": 24, "Note": null}, {"Name": "Bob", "Age": 3.5, "Note": "x"}]',
+        encoding="utf-8",
+    )
+    names = ("table.xlsx", "table.xls", "table.yaml")
+    paths = [os.path.join(TABLE_DATA, name) for name in names]
+    for path in paths + [str(dates), str(records)]:
+        assert isinstance(open_rows(path), StreamingRowSource)
+        assert list(open_rows(path)) == list(TablibRowSource(path))
+
+
+def test_xlsx_cells_match_openpyxl(tmp_path):
+    from openpyxl import Workbook, load_workbook
+
+    book = Workbook()
+    book.active.append(["other sheet"])
+    sheet = book.create_sheet("people")
+    sheet.append(["Name", "Born", "Score", "Member"])
+    sheet.append(["Ann", datetime.datetime(1990, 1, 2, 3, 4), 2.5, True])
+    sheet["A4"] = "after a gap"
+    sheet["C4"] = 7
+    sheet["D5"] = datetime.date(2001, 2, 3)
+    book.active = 1
+    path = str(tmp_path / "cells.xlsx")
+    book.save(path)
+    expected = load_workbook(path, read_only=True, data_only=True)
+    expected = list(expected.active.iter_rows(values_only=True))
+    assert [fit_row(r, 4) for r in iter_xlsx_rows(path)] == [
+        fit_row(r, 4) for r in expected
+    ]
+    assert list(open_rows(path))[0] == ("Ann", "1990-01-02 03:04:00", "2.5", "True")
+
+
+def test_xlsx_head_without_dimension(tmp_path):
+    # what the generator writes: no <dimension>, which openpyxl then sizes by
+    # reading the whole sheet before its first row
+    path = tmp_path / "big.xlsx"
+    write_table("xlsx", str(path), SYNTHETIC_HEADERS, generate_rows(5000, 0))
+    with zipfile.ZipFile(path) as book:
+        parts = {name: book.read(name) for name in book.namelist()}
+    sheet = parts["xl/worksheets/sheet1.xml"]
+    assert b"<dimension" not in sheet
+    start = time.perf_counter()
+    headers, rows = preview(str(path), 5)
+    assert time.perf_counter() - start < 0.2
+    assert headers == SYNTHETIC_HEADERS and len(rows) == 5
+    # a broken tail proves the reader never got there
+    parts["xl/worksheets/sheet1.xml"] = sheet[: len(sheet) // 2] + b"<broken"
+    with zipfile.ZipFile(path, "w") as book:
+        for name, data in parts.items():
+            book.writestr(name, data)
+    assert preview(str(path), 5) == (headers, rows)
+
+
+def test_ods_cells(tmp_path):
+    # repeated and blank cells, several paragraphs, spaces and a float
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+        ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+        ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+        "<office:body><office:spreadsheet><table:table>"
+        "<table:table-row><table:table-cell><text:p>a</text:p></table:table-cell>"
+        "<table:table-cell><text:p>b</text:p></table:table-cell>"
+        "<table:table-cell><text:p>c</text:p></table:table-cell></table:table-row>"
+        "<table:table-row>"
+        '<table:table-cell office:value-type="float" office:value="24">'
+        "<text:p>24.00</text:p></table:table-cell>"
+        "<table:table-cell/>"
+        '<table:table-cell><text:p>x<text:s text:c="2"/>y</text:p><text:p>z</text:p>'
+        '</table:table-cell><table:table-cell table:number-columns-repeated="1000"/>'
+        "</table:table-row>"
+        '<table:table-row table:number-rows-repeated="1000000"><table:table-cell/>'
+        "</table:table-row>"
+        '<table:table-row><table:table-cell table:number-columns-repeated="3">'
+        "<text:p>r</text:p></table:table-cell></table:table-row>"
+        "</table:table><table:table><table:table-row><table:table-cell>"
+        "<text:p>second sheet</text:p></table:table-cell></table:table-row>"
+        "</table:table></office:spreadsheet></office:body></office:document-content>"
+    )
+    path = tmp_path / "t.ods"
+    with zipfile.ZipFile(path, "w") as book:
+        book.writestr("content.xml", content)
+    src = open_rows(str(path))
+    assert src.headers == ["a", "b", "c"]
+    assert list(src) == [("24", "", "x  y\nz"), ("r", "r", "r")]
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from conftest import ROOT, TABLE_DATA
+from instrument import Instrumentation
+from main import Contact
+from vcard_writer import ShardedWriter
+
+CARDS = [f"BEGIN:VCARD\r\nFN:Contact {i} é\r\nEND:VCARD\n" for i in range(10)]
+
+
+def read_manifest(tmp_path):
+    with open(tmp_path / "out.manifest.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_rolls_over_by_card_count(tmp_path):
+    for workers in (1, 3):
+        with ShardedWriter(
+            str(tmp_path / "out.vcf"), max_cards=4, workers=workers
+        ) as w:
+            for card in CARDS:
+                w.write(card)
+        manifest = read_manifest(tmp_path)
+        assert manifest["cards"] == 10
+        assert [s["file"] for s in manifest["shards"]] == [
+            "out-00001.vcf",
+            "out-00002.vcf",
+            "out-00003.vcf",
+        ]
+        assert [s["cards"] for s in manifest["shards"]] == [4, 4, 2]
+        joined = b""
+        for shard in manifest["shards"]:
+            data = (tmp_path / shard["file"]).read_bytes()
+            assert hashlib.sha256(data).hexdigest() == shard["sha256"]
+            assert len(data) == shard["bytes"]
+            joined += data
+        assert joined == "".join(CARDS).encode("utf-8")
+
+
+def test_rolls_over_by_size(tmp_path):
+    size = len(CARDS[0].encode("utf-8"))
+    with ShardedWriter(str(tmp_path / "out.vcf"), max_bytes=3 * size + 1) as w:
+        for card in CARDS:
+            w.write(card)
+    shards = read_manifest(tmp_path)["shards"]
+    assert [s["cards"] for s in shards] == [3, 3, 3, 1]
+    assert all(s["bytes"] <= 3 * size + 1 for s in shards)
+
+
+def test_contact_sharded_export(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    obj.create_vcard(str(tmp_path / "out.vcf"), shard_cards=2)
+    shards = read_manifest(tmp_path)["shards"]
+    assert len(shards) == 3
+    joined = b"".join((tmp_path / s["file"]).read_bytes() for s in shards)
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert joined == f.read()
+
+
+def test_failed_export_leaves_no_manifest(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+
+    def progress(done):
+        if done == 5:
+            raise KeyboardInterrupt
+
+    # shards written inline and by the pool, the instrumented run aborts itself
+    for workers, instrument in [(1, None), (3, Instrumentation())]:
+        with pytest.raises(KeyboardInterrupt):
+            obj.create_vcard(
+                str(tmp_path / "out.vcf"),
+                workers=workers,
+                shard_cards=3,
+                instrument=instrument,
+                progress=progress,
+            )
+        assert os.listdir(tmp_path) == []
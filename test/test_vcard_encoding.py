@@ -0,0 +1,49 @@
+from vcard_encoding import escape_value, fold_line
+
+
+def legacy_escape(value):
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def unfold(folded):
+    return folded.replace("\r\n ", "")
+
+
+def test_escape_matches_chained_replace():
+    for value in ["", "plain", "a;b,c\\d\ne", "\\;", "ümlaut, 東京;\n", ";;,,\\\\"]:
+        assert escape_value(value) == legacy_escape(value)
+
+
+def test_short_lines_are_untouched():
+    assert fold_line("FN:Alice") == "FN:Alice"
+    assert fold_line("x" * 75) == "x" * 75
+    # 18 characters fit in 75 octets even at 4 each, 19 may not
+    assert fold_line("😀" * 18) == "😀" * 18
+    assert fold_line("😀" * 19) == "😀" * 18 + "\r\n 😀"
+
+
+def test_fold_counts_octets_and_keeps_spaces():
+    for line in [
+        "ADR;TYPE=HOME:;;" + "12 Long Street   " * 20,
+        "FN:" + "東京都" * 40,
+        "NOTE:" + "a" * 73 + "é" + "😀" * 30,
+    ]:
+        folded = fold_line(line)
+        assert unfold(folded) == line
+        parts = folded.split("\r\n")
+        assert all(len(p.encode("utf-8")) <= 75 for p in parts)
+        assert all(p.startswith(" ") for p in parts[1:])
+        # no continuation ends up with nothing but the leading space
+        assert all(len(p) > 1 for p in parts[1:])
+
+
+def test_multibyte_fold_never_splits_a_character():
+    line = "FN:" + "é" * 100
+    for part in fold_line(line).split("\r\n"):
+        part.encode("utf-8").decode("utf-8")
+    assert fold_line(line).split("\r\n")[0] == "FN:" + "é" * 36
@@ -0,0 +1,85 @@
+import os
+
+import tablib
+
+from column_plan import ColumnPlan
+from conftest import ROOT
+from main import Contact
+from record import ContactRecord
+from vcard_reader import export_table, iter_vcards, parse_line, to_dataset
+from vcard_writer import create_vcard
+
+RECORD = {
+    "first_name": "Zoë",
+    "last_name": "O'Brien; Jr",
+    "additional_names": "A,B",
+    "prefix": "Dr.",
+    "suffix": "",
+    "formatted_name": "Dr. Zoë O'Brien\\the second",
+    "phone": [{"phn": "+1 555 0100", "typ": "WORK"}, {"phn": "", "typ": "CELL"}],
+    "email": "zoe@example.com",
+    "address": "221B Baker Street, London\nUnited Kingdom " * 3,
+    "org": "ACME; Research",
+    "title": "Chief " + "東京" * 40,
+    "url": "https://example.com/a,b",
+    "bday": "1990-01-02",
+}
+
+
+def test_reads_checked_in_export():
+    records = list(iter_vcards(os.path.join(ROOT, "contact.vcf")))
+    assert [r["first_name"] for r in records] == ["Alice", "Bob", "Charlie", "David", "Eva"]
+    assert records[0]["last_name"] == "New York"
+    assert records[0]["phone"] == [{"phn": "+1-212-555-0187", "typ": "CELL"}]
+
+
+def test_round_trips_writer_output(tmp_path):
+    path = tmp_path / "one.vcf"
+    card = create_vcard(RECORD)
+    path.write_text(card + card, encoding="utf-8", newline="")
+    records = list(iter_vcards(str(path)))
+    # a record has every field, the ones the card lacks are blank
+    assert records == [ContactRecord(RECORD), ContactRecord(RECORD)]
+    assert create_vcard(records[0]) == card
+
+
+def test_round_trips_contact_output(tmp_path, table_cols):
+    obj = Contact(os.path.join(ROOT, "test", "table_data", "table.csv"))
+    obj.cols = table_cols
+    plan = ColumnPlan(obj.table.headers, obj.cols)
+    cards = list(obj.vcards())
+    path = tmp_path / "out.vcf"
+    obj.create_vcard(str(path))
+    records = list(iter_vcards(str(path)))
+    assert [obj.add_contact(r) for r in records] == cards
+    assert [r["phone"] for r in records] == [plan.data(r)["phone"] for r in obj.table]
+
+
+def test_parse_line_handles_quoted_colons():
+    assert parse_line('X-PROP;LABEL="a:b":value') == (
+        "X-PROP",
+        {"LABEL": ["A:B"]},
+        "value",
+    )
+    assert parse_line("TEL;CELL:123") == ("TEL", {"TYPE": ["CELL"]}, "123")
+
+
+def test_export_back_to_tables(tmp_path):
+    path = tmp_path / "one.vcf"
+    path.write_text(create_vcard(RECORD), encoding="utf-8", newline="")
+    data = to_dataset(str(path))
+    assert data.headers[-4:] == ["phone_1", "phone_1_type", "phone_2", "phone_2_type"]
+    assert data.dict[0]["org"] == "ACME; Research"
+    for ext in ("csv", "xlsx"):
+        out = tmp_path / f"out.{ext}"
+        export_table(str(path), str(out))
+        mode = "rb" if ext == "xlsx" else "r"
+        with open(out, mode, **({} if ext == "xlsx" else {"newline": ""})) as f:
+            loaded = tablib.Dataset().load(f.read(), format=ext)
+        assert loaded.dict[0]["first_name"] == "Zoë"
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.vcf"
+    path.write_bytes(b"")
+    assert list(iter_vcards(str(path))) == []
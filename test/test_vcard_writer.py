@@ -0,0 +1,41 @@
+import io
+import os
+
+from conftest import ROOT, TABLE_DATA
+from main import Contact
+from vcard_writer import VCardWriter
+
+
+class CountingSink(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def test_writer_buffers_until_flush_size():
+    sink = CountingSink()
+    writer = VCardWriter(sink, flush_size=10)
+    writer.write("abcd")
+    writer.write("efgh")
+    assert sink.writes == 0
+    writer.write("ijkl")
+    assert sink.writes == 1
+    writer.write("mn")
+    writer.close()
+    assert sink.getvalue() == "abcdefghijklmn"
+    assert writer.count == 4
+    # file-like sinks belong to the caller
+    assert not sink.closed
+
+
+def test_create_vcard_matches_checked_in_output(tmp_path, table_cols):
+    obj = Contact(os.path.join(TABLE_DATA, "table.csv"))
+    obj.cols = table_cols
+    out = tmp_path / "out.vcf"
+    obj.create_vcard(str(out), flush_size=1)
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert out.read_bytes() == f.read()
@@ -1,11 +1,22 @@
+"""
+Generate table files for the converter to read.
+
+    python test_write.py                      # the 5-row fixtures in table_data/
+    python test_write.py --rows 1000000 --formats csv,xlsx --out big_data/
+
+With --rows the tables are synthetic: Unicode names, long addresses and
+several phone columns, reproducible through --seed.
+"""
+
+import argparse
+import csv
 import os
-import tablib
+import random
+from itertools import islice
 
-# 1. Prepare output folder
-OUT = "table_data"
-os.makedirs(OUT, exist_ok=True)
+import tablib
 
-# 2. Define headers + rows
+# 1. The fixture table
 headers = ["Name", "Age", "City", "Phone"]
 rows = [
     ["Alice", 24, "New York", "+1-212-555-0187"],
@@ -15,13 +26,118 @@ rows = [
     ["Eva", 28, "Phoenix", "+1-602-555-0179"],
 ]
 
-# 3. Build the Tablib Dataset
-data = tablib.Dataset()
-data.headers = headers
-for row in rows:
-    data.append(row)
+# 2. Synthetic tables
+SYNTHETIC_HEADERS = [
+    "Name",
+    "Surname",
+    "Age",
+    "City",
+    "Phone",
+    "Work Phone",
+    "Home Phone",
+    "Email",
+    "Address",
+    "Company",
+    "Title",
+    "Website",
+]
+FIRST_NAMES = [
+    "Alice", "Bob", "Zoë", "José", "Ærøskøbing", "Søren", "Łukasz", "Ítalo",
+    "Анна", "Дмитрий", "Ελένη", "Γιώργος", "太郎", "花子", "민준", "서연",
+    "محمد", "فاطمة", "अर्जुन", "प्रिया", "Chloé", "Mañuel", "Björn", "Nguyễn",
+]  # fmt: skip
+LAST_NAMES = [
+    "Smith", "O'Brien", "García-López", "Müller", "Dvořák", "Kowalski",
+    "Иванов", "Παπαδόπουλος", "山田", "김", "الحسن", "शर्मा", "Lefèvre", "Trần",
+]  # fmt: skip
+CITIES = ["New York", "São Paulo", "Zürich", "Kraków", "東京", "Москва", "Chennai"]
+STREETS = ["Main St", "Rue de l'Église", "Hauptstraße", "Calle Mayor", "銀座通り"]
+COMPANIES = ["ACME, Inc", "Globex; Ltd", "Initech", "Umbrella Corp", "株式会社テスト"]
+TITLES = ["Engineer", "Sales\\Ops", "Director of Partnerships, EMEA", "CEO", ""]
+
+# ods and xlsx are only practical up to ~1M rows, xls can't hold more than this
+XLS_MAX_ROWS = 65535
+
+
+def generate_rows(count, seed=0):
+    """
+    Yield `count` synthetic rows matching SYNTHETIC_HEADERS, deterministic per seed.
+    """
+    rnd = random.Random(seed)
+    for i in range(count):
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+        address = ", ".join(
+            f"{rnd.randint(1, 9999)} {rnd.choice(STREETS)}"
+            for _ in range(rnd.randint(1, 6))
+        )
+        yield [
+            first,
+            last,
+            rnd.randint(18, 90),
+            rnd.choice(CITIES),
+            f"+1-{rnd.randint(200, 999)}-555-{i % 10000:04d}",
+            f"+44 20 7946 {rnd.randint(0, 9999):04d}" if rnd.random() < 0.6 else "",
+            (
+                f"(0{rnd.randint(10, 99)}) {rnd.randint(1000000, 9999999)}"
+                if rnd.random() < 0.3
+                else ""
+            ),
+            f"user{i}@example.com",
+            address,
+            rnd.choice(COMPANIES),
+            rnd.choice(TITLES),
+            f"https://example.com/people/{i}",
+        ]
+
+
+def _write_delimited(path, columns, data, delimiter):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(columns)
+        writer.writerows(data)
+
+
+def _write_xlsx(path, columns, data):
+    from openpyxl import Workbook
 
-# 4. Export to each format, including CSV
+    book = Workbook(write_only=True)
+    sheet = book.create_sheet()
+    sheet.append(columns)
+    for row in data:
+        sheet.append(row)
+    book.save(path)
+
+
+def _write_with_tablib(fmt, path, columns, data):
+    # tablib builds the whole export in memory, fine for the formats that need it
+    dataset = tablib.Dataset(headers=columns)
+    for row in data:
+        dataset.append(row)
+    content = dataset.export(fmt)
+    # CSV, HTML, YAML produce str; others produce bytes
+    mode = "wb" if isinstance(content, (bytes, bytearray)) else "w"
+    with open(path, mode) as f:
+        f.write(content)
+
+
+def write_table(fmt, path, columns, data):
+    """
+    Write `data` (an iterable of rows) under `columns` in format `fmt`.
+    csv/tsv/xlsx are streamed, the other formats go through tablib.
+    """
+    if fmt == "csv":
+        _write_delimited(path, columns, data, ",")
+    elif fmt == "tsv":
+        _write_delimited(path, columns, data, "\t")
+    elif fmt == "xlsx":
+        _write_xlsx(path, columns, data)
+    else:
+        if fmt == "xls":
+            data = islice(data, XLS_MAX_ROWS)
+        _write_with_tablib(fmt, path, columns, data)
+
+
+# 3. Export to each format, including CSV
 export_map = {
     "csv": "table.csv",
     "html": "table.html",
@@ -31,13 +147,26 @@ export_map = {
     "yaml": "table.yaml",
 }
 
-for fmt, fname in export_map.items():
-    out_path = os.path.join(OUT, fname)
-    content = data.export(fmt)
-    # CSV, HTML, YAML produce str; others produce bytes
-    mode = "wb" if isinstance(content, (bytes, bytearray)) else "w"
-    with open(out_path, mode) as f:
-        f.write(content if mode == "w" else content)
 
-# 5. (Optional) print the HTML table to console
-print(data.export("html"))
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, help="synthetic rows (1K to 10M)")
+    parser.add_argument("--formats", default=",".join(export_map))
+    parser.add_argument("--out", default="table_data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    for fmt in args.formats.split(","):
+        if args.rows:
+            fname = f"table_{args.rows}.{fmt}"
+            columns, data = SYNTHETIC_HEADERS, generate_rows(args.rows, args.seed)
+        else:
+            fname = export_map.get(fmt, f"table.{fmt}")
+            columns, data = headers, rows
+        write_table(fmt, os.path.join(args.out, fname), columns, data)
+        print("wrote", os.path.join(args.out, fname))
+
+
+if __name__ == "__main__":
+    main()
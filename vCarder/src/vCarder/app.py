@@ -11,9 +11,40 @@ Usage:
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
+import asyncio
 import re
 import os
 
+from profiler import profile, suggest_mapping
+from row_source import HEAD_READERS
+from vCarder.conversion import Conversion, ConversionCancelled, gui_mappings
+from vCarder.mapping_model import INSERT, ColumnAvailability
+from vCarder.paging import PagedRows, open_preview
+
+
+def preview_row(cells):
+    return toga.sources.Row(**{f"c{i}": v for i, v in enumerate(cells)})
+
+
+class PagedTableSource(toga.sources.Source):
+    """
+    Table data backed by PagedRows: rows are read from the file as the table
+    asks for them and only a few pages are held at a time.
+    """
+
+    def __init__(self, rows: PagedRows):
+        super().__init__()
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def index(self, row):
+        return self.rows.index(row)
+
 
 class VCarderApp(toga.App):
     """Main application class for vCarder."""
@@ -26,8 +57,9 @@ class VCarderApp(toga.App):
         # Main window configuration
         self.main_window = toga.MainWindow(title="vCarder", size=(800, 600))
 
-        # Track selected columns for dynamic exclusion
-        self.selected_columns = set()
+        # Chosen table and the conversion running in the background, if any
+        self.source_path = None
+        self.conversion = None
 
         # Sample data for preview
         self.dummy_data = [
@@ -63,6 +95,8 @@ class VCarderApp(toga.App):
             },
         ]
         self.all_columns = list(self.dummy_data[0].keys())
+        # Track selected columns for dynamic exclusion
+        self.availability = ColumnAvailability(self.all_columns)
 
         # Scrollable main container
         main_scroll = toga.ScrollContainer(horizontal=False, style=Pack(flex=1))
@@ -140,15 +174,25 @@ class VCarderApp(toga.App):
         section.add(
             toga.Label("Data Preview", style=Pack(font_size=16, padding_bottom=10))
         )
+        self.preview_scroll = toga.ScrollContainer(
+            horizontal=True, style=Pack(height=200)
+        )
+        self.show_preview(
+            self.all_columns,
+            [[row[col] for col in self.all_columns] for row in self.dummy_data],
+        )
+        section.add(self.preview_scroll)
+        return section
+
+    def show_preview(self, headings, data, accessors=None):
+        # a Table's headings are fixed once built, so a new file gets a new table
         self.data_table = toga.Table(
-            headings=self.all_columns,
-            data=[[row[col] for col in self.all_columns] for row in self.dummy_data],
+            headings=headings,
+            accessors=accessors,
+            data=data,
             style=Pack(height=150),
         )
-        scroll = toga.ScrollContainer(horizontal=True, style=Pack(height=200))
-        scroll.content = self.data_table
-        section.add(scroll)
-        return section
+        self.preview_scroll.content = self.data_table
 
     def create_field_mapping_section(self):
         section = toga.Box(style=Pack(direction=COLUMN, padding_bottom=20))
@@ -167,8 +211,8 @@ class VCarderApp(toga.App):
             box = toga.Box(style=Pack(direction=ROW, padding=5))
             box.add(toga.Label(f"{field}:", style=Pack(width=120, padding_top=8)))
             sel = toga.Selection(
-                items=self.get_available_columns(),
-                on_change=self.on_mapping_selection,
+                items=self.availability.add(field),
+                on_change=lambda w, f=field, **kw: self.on_mapping_selection(w, f),
                 style=Pack(flex=1, padding=5),
             )
             self.mapping_fields[field] = sel
@@ -187,6 +231,7 @@ class VCarderApp(toga.App):
             "Title",
             "URL",
             "Birthday",
+            "Photo",
         ]
         self.additional_field_selections = {}
         selector = toga.Selection(
@@ -210,10 +255,22 @@ class VCarderApp(toga.App):
         btn_report = toga.Button(
             "Report!", on_press=self.action_report_issue, style=Pack(padding=10)
         )
+        self.btn_cancel = toga.Button(
+            "Cancel",
+            on_press=self.action_cancel_conversion,
+            enabled=False,
+            style=Pack(padding=10),
+        )
+        self.btn_vcard = btn_vcard
         box = toga.Box(style=Pack(direction=ROW, padding=5))
         box.add(btn_vcard)
+        box.add(self.btn_cancel)
         box.add(btn_report)
         section.add(box)
+        self.progress_bar = toga.ProgressBar(max=1, value=0, style=Pack(padding=5))
+        self.progress_label = toga.Label("", style=Pack(padding=5))
+        section.add(self.progress_bar)
+        section.add(self.progress_label)
         return section
 
     def create_footer(self):
@@ -235,29 +292,28 @@ class VCarderApp(toga.App):
         footer.add(toga.Label("© 2025 vCarder", style=Pack(padding=(0, 10))))
         return footer
 
-    def get_available_columns(self):
-        return [c for c in self.all_columns if c not in self.selected_columns]
+    def selection(self, field):
+        if field in self.mapping_fields:
+            return self.mapping_fields[field]
+        return self.additional_field_selections[field]
 
-    def on_mapping_selection(self, widget, **kwargs):
-        # Update selection set
-        self.selected_columns.clear()
-        for sel in list(self.mapping_fields.values()) + list(
-            self.additional_field_selections.values()
-        ):
-            if sel.value:
-                self.selected_columns.add(sel.value)
-        self.update_all_dropdowns()
+    def on_mapping_selection(self, widget, field):
+        if self._updating_dropdowns:
+            return
+        self.apply_edits(self.availability.select(field, widget.value or None))
 
     def on_additional_field_select(self, widget, **kwargs):
         field = widget.value
-        if not field or field in self.additional_field_selections:
-            widget.value = None
-            return
+        if field and field not in self.additional_field_selections:
+            self.add_additional_field(field)
+        widget.value = None
+
+    def add_additional_field(self, field):
         box = toga.Box(style=Pack(direction=ROW, padding=5))
         box.add(toga.Label(f"{field}:", style=Pack(width=120, padding_top=8)))
         sel = toga.Selection(
-            items=self.get_available_columns(),
-            on_change=self.on_mapping_selection,
+            items=self.availability.add(field),
+            on_change=lambda w, f=field, **kw: self.on_mapping_selection(w, f),
             style=Pack(flex=1, padding=5),
         )
         btn = toga.Button(
@@ -269,31 +325,27 @@ class VCarderApp(toga.App):
         box.add(sel)
         box.add(btn)
         self.additional_fields_box.add(box)
-        widget.value = None
+        return sel
 
     def remove_additional_field(self, field):
         # Remove field box and selection
         for child in self.additional_fields_box.children:
             if child.children[0].text.startswith(field):
-                sel = self.additional_field_selections.pop(field)
-                if sel.value:
-                    self.selected_columns.discard(sel.value)
+                self.additional_field_selections.pop(field)
                 self.additional_fields_box.remove(child)
+                self.apply_edits(self.availability.discard(field))
                 break
-        self.update_all_dropdowns()
 
-    def update_all_dropdowns(self):
-        if self._updating_dropdowns:
-            return
+    def apply_edits(self, edits):
+        # only the items that come and go are touched, the widgets keep the rest
         self._updating_dropdowns = True
         try:
-            cols = self.get_available_columns()
-            for sel in list(self.mapping_fields.values()) + list(
-                self.additional_field_selections.values()
-            ):
-                val = sel.value
-                sel.items = [val] + [c for c in cols if c != val] if val else cols
-                sel.value = val
+            for field, op, index, column in edits:
+                items = self.selection(field).items
+                if op == INSERT:
+                    items.insert(index, column)
+                else:
+                    items.remove(items[index])
         finally:
             self._updating_dropdowns = False
 
@@ -301,7 +353,7 @@ class VCarderApp(toga.App):
         try:
             self.main_window.open_file_dialog(
                 title="Select Source File",
-                file_types=["csv", "xlsx", "ods"],
+                file_types=[ext.lstrip(".") for ext in HEAD_READERS],
                 on_result=self.file_dialog_result,
             )
         except ValueError as e:
@@ -309,9 +361,64 @@ class VCarderApp(toga.App):
 
     def file_dialog_result(self, dialog, path):
         if path:
+            try:
+                rows, accessors, columns = open_preview(str(path), make_row=preview_row)
+            except Exception as e:
+                self.main_window.error_dialog("Error", f"Can't read {path}: {e}")
+                return
             self.file_label.text = f"Selected: {os.path.basename(path)}"
+            self.source_path = str(path)
+            self.show_preview(rows.headers, PagedTableSource(rows), accessors)
+            asyncio.create_task(self.count_preview_rows(rows))
+            # mappings made against the previous file's columns no longer apply
+            self.all_columns = columns
+            self.availability = ColumnAvailability(self.all_columns)
+            self._updating_dropdowns = True
+            try:
+                for field in [*self.mapping_fields, *self.additional_field_selections]:
+                    self.selection(field).items = self.availability.add(field)
+            finally:
+                self._updating_dropdowns = False
+            asyncio.create_task(self.suggest_columns(self.source_path))
+
+    async def suggest_columns(self, path):
+        # the profiler reads a bounded sample of the file, still not on the
+        # event loop; the guesses only fill fields that are free
+        loop = asyncio.get_running_loop()
+        try:
+            spec = await loop.run_in_executor(
+                None, lambda: suggest_mapping(profile(path))
+            )
+        except Exception:
+            return
+        if path != self.source_path:
+            return
+        for label, column in gui_mappings(spec).items():
+            if label in self.mapping_fields:
+                sel = self.mapping_fields[label]
+            elif label in self.additional_field_selections:
+                sel = self.additional_field_selections[label]
+            else:
+                sel = self.add_additional_field(label)
+            free = self.availability.owners.get(column, label) == label
+            if self.availability.values[label] is None and free:
+                sel.value = column
+
+    async def count_preview_rows(self, rows):
+        # a worker thread counts the rows for the file label; the table isn't
+        # handed its data again, which on GTK would copy every row into its
+        # list store on this thread. Backends reading rows by index see the
+        # full length through PagedRows.
+        loop = asyncio.get_running_loop()
+        try:
+            total = await loop.run_in_executor(None, rows.count)
+        except Exception:
+            return
+        if rows.source.filePath == self.source_path:
+            name = os.path.basename(self.source_path)
+            self.file_label.text = f"Selected: {name} ({total:,} rows)"
 
-    def action_get_vcard(self, widget):
+    async def action_get_vcard(self, widget):
         mappings = {}
         for k, sel in self.mapping_fields.items():
             if sel.value:
@@ -319,7 +426,71 @@ class VCarderApp(toga.App):
         for k, sel in self.additional_field_selections.items():
             if sel.value:
                 mappings[k] = sel.value
-        print("vCard mappings:", mappings)
+        if not self.source_path:
+            self.main_window.error_dialog("No file", "Choose a source file first.")
+            return
+        if "First Name" not in mappings:
+            self.main_window.error_dialog(
+                "Missing mapping", "Pick the column holding the first name."
+            )
+            return
+        out = await self.main_window.save_file_dialog(
+            title="Save vCards",
+            suggested_filename="contact.vcf",
+            file_types=["vcf"],
+        )
+        if not out:
+            return
+
+        self.conversion = Conversion(self.source_path, str(out), mappings)
+        self.btn_vcard.enabled = False
+        self.btn_cancel.enabled = True
+        self.progress_bar.value = 0
+        self.progress_label.text = "Reading table…"
+        loop = asyncio.get_running_loop()
+
+        def report(done, total, rate, eta):
+            # called on the worker thread, the widgets are updated on the loop
+            loop.call_soon_threadsafe(self.show_progress, done, total, rate, eta)
+
+        try:
+            count = await loop.run_in_executor(None, self.conversion.run, report)
+        except ConversionCancelled:
+            self.progress_label.text = "Cancelled, nothing was written."
+        except Exception as e:
+            self.progress_label.text = ""
+            self.main_window.error_dialog("Conversion failed", str(e))
+        else:
+            self.progress_label.text = (
+                f"Wrote {count:,} vCards to {os.path.basename(str(out))}"
+            )
+        finally:
+            self.conversion = None
+            self.btn_vcard.enabled = True
+            self.btn_cancel.enabled = False
+
+    def show_progress(self, done, total, rate, eta):
+        if total is None:
+            # still counting the rows: an indeterminate bar until the total is in
+            if self.progress_bar.max is not None:
+                self.progress_bar.max = None
+                self.progress_bar.start()
+            text = f"{done:,} rows  {rate:,.0f} rows/sec"
+        else:
+            if self.progress_bar.max is None:
+                self.progress_bar.stop()
+            self.progress_bar.max = max(total, 1)
+            self.progress_bar.value = done
+            text = f"{done:,} / {total:,} rows  {rate:,.0f} rows/sec"
+        if eta is not None:
+            text += f"  about {eta:,.0f}s left"
+        self.progress_label.text = text
+
+    def action_cancel_conversion(self, widget):
+        if self.conversion is not None:
+            self.conversion.cancel()
+            self.btn_cancel.enabled = False
+            self.progress_label.text = "Cancelling…"
 
     def action_report_issue(self, widget):
         self.show_report_dialog()
@@ -0,0 +1,186 @@
+"""
+Table to vCard conversion run off the GUI thread, with progress and cancel.
+"""
+
+import os
+import stat
+import tempfile
+import threading
+import time
+
+from column_plan import resolve_mapping
+from main import Contact
+
+# GUI field label -> converter field; the phone labels all feed the TEL list
+GUI_FIELDS = {
+    "First Name": "first_name",
+    "Last Name": "last_name",
+    "Full Name": "formatted_name",
+    "Phone": "phone",
+    "Additional Phone Number": "phone",
+    "Email": "email",
+    "Address": "address",
+    "Organization": "org",
+    "Title": "title",
+    "URL": "url",
+    "Birthday": "bday",
+    "Photo": "photo",
+}
+
+# seconds between progress reports sent to the window
+REPORT_INTERVAL = 0.1
+
+
+def output_mode(path) -> int:
+    """
+    Permission bits for a file written to `path`: those of the file already
+    there, else what open() would create under the current umask.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        # the umask can only be read by setting it
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+# rows counted between checks that the conversion is still wanted
+COUNT_CHECK_ROWS = 4096
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+def mapping_spec(mappings: dict) -> dict:
+    """
+    The column_plan mapping for the GUI's {field label: column} selections.
+    Labels the converter has no field for are left out.
+    """
+    spec = {}
+    for label, column in mappings.items():
+        field = GUI_FIELDS.get(label)
+        if field == "phone":
+            spec.setdefault("phone", []).append(column)
+        elif field:
+            spec[field] = column
+    return spec
+
+
+def gui_mappings(spec: dict) -> dict:
+    """
+    The {field label: column} selections for a column_plan mapping, the
+    reverse of mapping_spec; phones fill the phone labels in order and
+    columns past those are dropped.
+    """
+    mappings = {}
+    for label, field in GUI_FIELDS.items():
+        if field == "phone":
+            phones = spec.get("phone") or []
+            if isinstance(phones, str):
+                phones = [phones]
+            taken = sum(1 for m in mappings if GUI_FIELDS[m] == "phone")
+            if taken < len(phones):
+                mappings[label] = phones[taken]
+        elif spec.get(field):
+            mappings[label] = spec[field]
+    return mappings
+
+
+class Conversion:
+    """
+    One conversion of `source` to `out`, meant to run in an executor thread
+    through run() while the event loop keeps the window responsive.
+
+    The cards are written to a temporary file next to `out` that replaces it
+    only once every row is done, so a cancelled or failed run leaves neither a
+    partial file nor a damaged previous export behind. The rows are counted
+    by a second thread while converting, so the file isn't read through
+    before the first card; `total` is None until that count is in.
+    """
+
+    def __init__(self, source, out, mappings: dict):
+        self.source = source
+        self.out = out
+        self.mappings = mappings
+        self.total = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._counter = None
+
+    def cancel(self):
+        """
+        Ask the running conversion to stop, it does so after the current card.
+        """
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _count(self, table):
+        # stops early once the conversion is cancelled or over
+        rows = 0
+        for rows, _ in enumerate(table, 1):
+            if rows % COUNT_CHECK_ROWS == 0 and (
+                self._cancel.is_set() or self._finished.is_set()
+            ):
+                return
+        self.total = rows
+
+    def run(self, report=None) -> int:
+        """
+        Convert, calling `report(done, total, rate, eta)` (rows, rows or None
+        while still counting, rows/sec, seconds left or None) at most every
+        REPORT_INTERVAL seconds and once at the end. Raises
+        ConversionCancelled after cancel().
+        Returns the number of cards written.
+        """
+        obj = Contact(self.source)
+        obj.cols = resolve_mapping(mapping_spec(self.mappings), obj.table.headers)
+        self._counter = threading.Thread(
+            target=self._count, args=(obj.table,), daemon=True
+        )
+        self._counter.start()
+        start = last = time.perf_counter()
+
+        def send(done):
+            now = time.perf_counter()
+            rate = done / (now - start) if now > start else 0.0
+            total = self.total
+            eta = (total - done) / rate if rate and total is not None else None
+            report(done, total, rate, eta)
+
+        def progress(done):
+            nonlocal last
+            if self._cancel.is_set():
+                raise ConversionCancelled()
+            now = time.perf_counter()
+            if report is not None and now - last >= REPORT_INTERVAL:
+                last = now
+                send(done)
+
+        fd, tmp = tempfile.mkstemp(
+            suffix=".part",
+            prefix=os.path.basename(self.out) + ".",
+            dir=os.path.dirname(os.path.abspath(self.out)),
+        )
+        os.close(fd)
+        try:
+            count = obj.create_vcard(tmp, progress=progress)
+            if self._cancel.is_set():
+                raise ConversionCancelled()
+            # mkstemp's file is private (0600), give it the mode the export
+            # it replaces had, or a new file's
+            os.chmod(tmp, output_mode(self.out))
+            os.replace(tmp, self.out)
+        finally:
+            self._finished.set()
+            self._counter.join()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.total = count
+        if report is not None:
+            send(count)
+        return count
@@ -0,0 +1,98 @@
+"""
+Which columns each field-mapping dropdown offers, kept up to date incrementally.
+"""
+
+INSERT = "insert"
+REMOVE = "remove"
+
+
+class ColumnAvailability:
+    """
+    The items of every mapping selection: the table's columns, in table
+    order, less the ones other selections hold, so a column is mapped to one
+    field at most.
+
+    A change of one selection only moves the column it let go of and the
+    one it took, so instead of every list being rebuilt, select() and the
+    other changes return edits `(key, INSERT or REMOVE, index, column)`:
+    insert or remove `column` at `index` of the items of selection `key`,
+    applied in order. Held columns are few, so working out an index costs
+    O(selections), not O(columns).
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._order = {c: i for i, c in enumerate(self.columns)}
+        # selection key -> the column it holds, or None
+        self.values = {}
+        # column -> the selection key holding it
+        self.owners = {}
+
+    def items(self, key) -> list:
+        """
+        The full item list of selection `key`, for building its widget.
+        """
+        return [c for c in self.columns if self.owners.get(c, key) == key]
+
+    def add(self, key) -> list:
+        """
+        Track a new, empty selection and return its items.
+        """
+        if key in self.values:
+            raise ValueError(f"selection {key!r} already exists")
+        self.values[key] = None
+        return self.items(key)
+
+    def _index(self, key, column):
+        # position of `column` in the items of `key`: its table position less
+        # the columns before it that other selections hold
+        order = self._order[column]
+        return order - sum(
+            1
+            for held, owner in self.owners.items()
+            if owner != key and self._order[held] < order
+        )
+
+    def _take(self, key, column):
+        edits = [
+            (other, REMOVE, self._index(other, column), column)
+            for other in self.values
+            if other != key
+        ]
+        self.owners[column] = key
+        return edits
+
+    def _release(self, key, column):
+        del self.owners[column]
+        return [
+            (other, INSERT, self._index(other, column), column)
+            for other in self.values
+            if other != key
+        ]
+
+    def select(self, key, column) -> list:
+        """
+        Selection `key` now holds `column` (None for nothing), returns the
+        edits for the other selections; its own items don't change.
+        """
+        old = self.values[key]
+        if column == old:
+            return []
+        if column is not None and self.owners.get(column, key) != key:
+            raise ValueError(f"{column!r} is mapped to {self.owners[column]!r}")
+        edits = []
+        if old is not None:
+            edits += self._release(key, old)
+        if column is not None:
+            edits += self._take(key, column)
+        self.values[key] = column
+        return edits
+
+    def discard(self, key) -> list:
+        """
+        Stop tracking selection `key`, returns the edits that give its column
+        back to the others.
+        """
+        edits = self.select(key, None)
+        del self.values[key]
+        return edits
@@ -0,0 +1,139 @@
+"""
+Rows of a table read a page at a time for the preview table.
+"""
+
+from collections import OrderedDict
+from itertools import islice
+
+from row_source import open_rows
+
+# rows per page, pages kept in memory, and characters shown per cell
+PAGE_SIZE = 200
+MAX_PAGES = 16
+MAX_WIDTH = 60
+
+
+def clip(value, max_width=MAX_WIDTH) -> str:
+    """
+    A cell as one line of at most `max_width` characters.
+    """
+    value = " ".join(str(value).splitlines())
+    if len(value) > max_width:
+        return value[: max_width - 1] + "…"
+    return value
+
+
+class PagedRows:
+    """
+    Sequence over the rows of `filePath` that reads the file only as far as the
+    rows asked for. Rows are read in pages of `page_size`, the `max_pages` most
+    recently used are kept and the rest are read again when needed: moving
+    forward continues from where the last read stopped, going back before it
+    starts over from the top of the file.
+
+    len() is the number of rows read so far until the end has been seen or
+    count() was run (from a worker thread, for big files), then the total.
+    `make_row` turns each row's list of clipped cells into the object handed out.
+    """
+
+    def __init__(
+        self,
+        filePath,
+        page_size=PAGE_SIZE,
+        max_pages=MAX_PAGES,
+        max_width=MAX_WIDTH,
+        make_row=tuple,
+    ):
+        self.source = open_rows(filePath)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_width = max_width
+        self.make_row = make_row
+        self.headers = [clip(h, max_width) for h in self.source.headers]
+        self.known = 0
+        self.total = None
+        # times a jump back made the file be read again from the top
+        self.restarts = 0
+        self._pages = OrderedDict()
+        self._rows = None
+        self._next = 0
+        self.page(0)
+
+    def __len__(self):
+        return self.known if self.total is None else self.total
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0 or (self.total is not None and index >= self.total):
+            raise IndexError(index)
+        rows = self.page(index // self.page_size)
+        offset = index % self.page_size
+        if offset >= len(rows):
+            raise IndexError(index)
+        return rows[offset]
+
+    def index(self, row) -> int:
+        """
+        Position of `row`, which must be from one of the cached pages.
+        """
+        for number, rows in self._pages.items():
+            for offset, cached in enumerate(rows):
+                if cached is row:
+                    return number * self.page_size + offset
+        raise ValueError(row)
+
+    def page(self, number) -> list:
+        """
+        The rows of page `number`, from the cache or read from the file.
+        """
+        rows = self._pages.get(number)
+        if rows is not None:
+            self._pages.move_to_end(number)
+            return rows
+        rows = self._read(number)
+        self._pages[number] = rows
+        if len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+    def _read(self, number):
+        start = number * self.page_size
+        if self._rows is None or start < self._next:
+            if self._rows is not None:
+                self.restarts += 1
+            self._rows = iter(self.source)
+            self._next = 0
+        # skip up to the page without keeping what is passed over
+        for _ in islice(self._rows, start - self._next):
+            self._next += 1
+        rows = [
+            self.make_row([clip(v, self.max_width) for v in row])
+            for row in islice(self._rows, self.page_size)
+        ]
+        self._next += len(rows)
+        self.known = max(self.known, self._next)
+        if len(rows) < self.page_size:
+            self.total = self._next
+        return rows
+
+    def count(self) -> int:
+        """
+        Read through the file once for the number of rows, then len() is final.
+        Doesn't touch the pages, so it can run on a worker thread.
+        """
+        if self.total is None:
+            self.total = self.source.count()
+        return self.total
+
+
+def open_preview(filePath, make_row=tuple):
+    """
+    What the window shows for a newly chosen file: its PagedRows (with the
+    first page read), the table's accessor per column (c0, c1, ..., the
+    names make_row gets to use) and the unclipped column names the mappings
+    are made against.
+    """
+    rows = PagedRows(filePath, make_row=make_row)
+    accessors = [f"c{i}" for i in range(len(rows.headers))]
+    return rows, accessors, list(rows.source.headers)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# outside a briefcase build: the app package and the converter modules it ships
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
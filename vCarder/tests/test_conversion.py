@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+
+from vCarder.conversion import (
+    Conversion,
+    ConversionCancelled,
+    gui_mappings,
+    mapping_spec,
+)
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+TABLE = os.path.join(ROOT, "test", "table_data", "table.csv")
+MAPPINGS = {"First Name": "Name", "Last Name": "City", "Phone": "Phone"}
+
+
+def test_mapping_spec():
+    spec = mapping_spec(
+        {
+            "First Name": "Name",
+            "Phone": "Mobile",
+            "Additional Phone Number": "Work",
+            "Address": "Street",
+            "Organization": "Company",
+        }
+    )
+    assert spec == {
+        "first_name": "Name",
+        "phone": ["Mobile", "Work"],
+        "address": "Street",
+        "org": "Company",
+    }
+
+
+def test_gui_mappings_reverse_mapping_spec():
+    spec = {"first_name": "Name", "phone": ["Mobile", "Work", "Home"], "url": "Site"}
+    mappings = gui_mappings(spec)
+    assert mappings == {
+        "First Name": "Name",
+        "Phone": "Mobile",
+        "Additional Phone Number": "Work",
+        "URL": "Site",
+    }
+    assert mapping_spec(mappings) == dict(spec, phone=["Mobile", "Work"])
+
+
+def test_run_writes_the_reference_output(tmp_path):
+    out = tmp_path / "contact.vcf"
+    reports = []
+    count = Conversion(TABLE, str(out), MAPPINGS).run(
+        lambda *args: reports.append(args)
+    )
+    assert count == 5
+    with open(os.path.join(ROOT, "contact.vcf"), "rb") as f:
+        assert out.read_bytes() == f.read()
+    # the last row is always reported
+    assert reports[-1][:2] == (5, 5)
+    assert os.listdir(tmp_path) == ["contact.vcf"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX permission bits")
+def test_output_keeps_the_usual_mode(tmp_path):
+    out = tmp_path / "contact.vcf"
+    umask = os.umask(0o022)
+    try:
+        Conversion(TABLE, str(out), MAPPINGS).run()
+        assert out.stat().st_mode & 0o777 == 0o644
+        # an export replacing an earlier one keeps that one's mode
+        out.chmod(0o640)
+        Conversion(TABLE, str(out), MAPPINGS).run()
+        assert out.stat().st_mode & 0o777 == 0o640
+    finally:
+        os.umask(umask)
+
+
+def test_cancel_leaves_no_output(tmp_path):
+    out = tmp_path / "contact.vcf"
+    out.write_text("previous export", encoding="utf-8")
+    conversion = Conversion(TABLE, str(out), MAPPINGS)
+    conversion.cancel()
+    with pytest.raises(ConversionCancelled):
+        conversion.run()
+    assert os.listdir(tmp_path) == ["contact.vcf"]
+    assert out.read_text(encoding="utf-8") == "previous export"
+
+
+def test_cancel_stops_the_row_count(tmp_path):
+    table = tmp_path / "big.csv"
+    table.write_text(
+        "Name,City,Phone\n" + "Ann,Paris,+33 1 23 45 67 89\n" * 1000000,
+        encoding="utf-8",
+    )
+    out = tmp_path / "contact.vcf"
+    conversion = Conversion(str(table), str(out), MAPPINGS)
+    reports = []
+
+    def report(done, total, rate, eta):
+        # cancel as soon as the first cards are out, long before a full count
+        reports.append(total)
+        conversion.cancel()
+
+    start = time.perf_counter()
+    with pytest.raises(ConversionCancelled):
+        conversion.run(report)
+    assert time.perf_counter() - start < 2
+    assert reports == [None] and conversion.total is None
+    assert not conversion._counter.is_alive()
+    assert os.listdir(tmp_path) == ["big.csv"]
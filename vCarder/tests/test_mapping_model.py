@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from vCarder.mapping_model import INSERT, ColumnAvailability
+
+COLUMNS = [f"col{i}" for i in range(30)]
+
+
+def apply(widgets, edits):
+    for key, op, index, column in edits:
+        if op == INSERT:
+            widgets[key].insert(index, column)
+        else:
+            assert widgets[key][index] == column
+            del widgets[key][index]
+
+
+def test_edits_keep_every_list_in_step():
+    model = ColumnAvailability(COLUMNS)
+    widgets = {key: model.add(key) for key in "abcdef"}
+    rng = random.Random(7)
+    for _ in range(500):
+        key = rng.choice(list(model.values))
+        free = [c for c in COLUMNS if model.owners.get(c, key) == key]
+        apply(widgets, model.select(key, rng.choice(free + [None])))
+        if rng.random() < 0.05:
+            apply(widgets, model.discard(key))
+            del widgets[key]
+            widgets[key] = model.add(key)
+        for k in model.values:
+            assert widgets[k] == model.items(k)
+
+
+def test_select_only_touches_the_moved_columns():
+    model = ColumnAvailability(COLUMNS)
+    for key in "abc":
+        model.add(key)
+    assert model.select("a", "col3") == [
+        ("b", "remove", 3, "col3"),
+        ("c", "remove", 3, "col3"),
+    ]
+    edits = model.select("a", "col5")
+    assert [e[1:] for e in edits if e[0] == "b"] == [
+        ("insert", 3, "col3"),
+        ("remove", 5, "col5"),
+    ]
+    assert model.select("a", "col5") == []
+    with pytest.raises(ValueError):
+        model.select("b", "col5")
+    assert "col5" not in model.add("d")
@@ -0,0 +1,108 @@
+import csv
+import json
+import os
+import threading
+
+import pytest
+import row_source
+import tablib
+import yaml
+
+from vCarder.paging import PagedRows, clip, open_preview
+
+TABLE_DATA = os.path.join(os.path.dirname(__file__), "..", "..", "test", "table_data")
+
+
+def write_table(path, count):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["n", "text"])
+        for i in range(count):
+            writer.writerow([i, "x" * (i % 100)])
+
+
+def test_clip():
+    assert clip("short") == "short"
+    assert clip("two\nlines") == "two lines"
+    assert clip("abcdef", 4) == "abc…"
+
+
+def test_reads_only_the_pages_asked_for(tmp_path):
+    path = tmp_path / "t.csv"
+    write_table(path, 10000)
+    rows = PagedRows(str(path), page_size=100, max_pages=3, max_width=10)
+    # only the first page is read on open
+    assert len(rows) == 100 and rows.total is None
+    assert rows[5] == ("5", "xxxxx")
+    assert rows[50][1] == "xxxxxxxxx…"
+    assert rows[950] == ("950", "x" * 9 + "…")
+    assert len(rows) == 1000
+    # the cache stays bounded, going back to an evicted page reads again
+    rows[1050], rows[1150]
+    assert len(rows._pages) == 3
+    assert rows.restarts == 0
+    assert rows[0] == ("0", "")
+    assert rows.restarts == 1
+
+
+def test_count_and_end(tmp_path):
+    path = tmp_path / "t.csv"
+    write_table(path, 250)
+    rows = PagedRows(str(path), page_size=100)
+    assert rows.count() == 250 and len(rows) == 250
+    assert rows[-1][0] == "249"
+    small = PagedRows(str(path), page_size=1000)
+    assert small.total == 250
+    with pytest.raises(IndexError):
+        small[250]
+    assert small.index(small[42]) == 42
+
+
+@pytest.mark.parametrize("name", sorted(os.listdir(TABLE_DATA)))
+def test_open_preview(name):
+    # what the window does with a chosen file, without toga
+    rows, accessors, columns = open_preview(
+        os.path.join(TABLE_DATA, name),
+        make_row=lambda cells: {f"c{i}": v for i, v in enumerate(cells)},
+    )
+    assert sorted(columns) == ["Age", "City", "Name", "Phone"]
+    assert accessors == ["c0", "c1", "c2", "c3"]
+    assert rows.headers == columns
+    assert rows.count() == 5 and len(rows) == 5
+    assert rows[0][accessors[columns.index("Name")]] == "Alice"
+
+
+def test_count_alongside_paging_loads_once(tmp_path, monkeypatch):
+    path = tmp_path / "t.yaml"
+    path.write_text(
+        "".join(f"- {{n: {i}, text: x}}\n" for i in range(3000)), encoding="utf-8"
+    )
+    loads = []
+    load = tablib.Dataset.load
+
+    def counted_load(self, *args, **kwargs):
+        loads.append(threading.get_ident())
+        return load(self, *args, **kwargs)
+
+    monkeypatch.setattr(tablib.Dataset, "load", counted_load)
+    # a format read through tablib's whole-file load
+    monkeypatch.delitem(row_source.SOURCES, ".yaml")
+    rows, _, _ = open_preview(str(path))
+    counter = threading.Thread(target=rows.count)
+    counter.start()
+    assert rows[2500] == ("2500", "x")
+    counter.join()
+    assert rows.total == 3000
+    assert len(loads) == 1
+
+
+def test_json_and_yaml_are_paged_without_a_full_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(tablib.Dataset, "load", None)
+    records = [{"n": i, "text": "x"} for i in range(3000)]
+    (tmp_path / "t.json").write_text(json.dumps(records), encoding="utf-8")
+    (tmp_path / "t.yml").write_text(yaml.safe_dump(records), encoding="utf-8")
+    for name in ("t.json", "t.yml"):
+        rows, _, columns = open_preview(str(tmp_path / name))
+        assert columns == ["n", "text"]
+        assert rows[5] == ("5", "x") and rows.total is None
+        assert rows.count() == 3000
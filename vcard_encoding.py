@@ -0,0 +1,59 @@
+# Value escaping and line folding shared by every vCard renderer.
+
+# RFC 6350 3.2: lines SHOULD NOT be longer than 75 octets, excluding the CRLF
+MAX_OCTETS = 75
+# characters that fit in MAX_OCTETS whatever they are, at up to 4 octets each
+_ALWAYS_FITS = MAX_OCTETS // 4
+
+
+def escape_value(value: str) -> str:
+    """
+    Escape special characters in vCard values.
+    Most values contain none of them: each is looked for first, so a value is
+    only copied for the characters it actually contains.
+    """
+    if "\\" in value:
+        value = value.replace("\\", "\\\\")
+    if ";" in value:
+        value = value.replace(";", "\\;")
+    if "," in value:
+        value = value.replace(",", "\\,")
+    if "\n" in value:
+        value = value.replace("\n", "\\n")
+    return value
+
+
+def fold_line(line: str) -> str:
+    """
+    Fold lines longer than 75 octets (UTF-8) according to the vCard spec.
+    Continuation lines start with a single space, which counts towards their
+    75 octets, and multibyte characters are never split.
+    """
+    size = len(line)
+    if size <= _ALWAYS_FITS:
+        return line
+    if line.isascii():
+        if size <= MAX_OCTETS:
+            return line
+        # one octet per character, fold by slicing the str directly
+        step = MAX_OCTETS - 1
+        return "\r\n ".join(
+            [line[:MAX_OCTETS]]
+            + [line[i : i + step] for i in range(MAX_OCTETS, size, step)]
+        )
+    data = line.encode("utf-8")
+    if len(data) <= MAX_OCTETS:
+        return line
+    parts = []
+    start, limit, size = 0, MAX_OCTETS, len(data)
+    while start < size:
+        end = start + limit
+        if end >= size:
+            end = size
+        else:
+            # back up to the first byte of the character we would cut into
+            while data[end] & 0xC0 == 0x80:
+                end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, MAX_OCTETS - 1
+    return "\r\n ".join(parts)
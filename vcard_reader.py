@@ -0,0 +1,202 @@
+import mmap
+import os
+
+import tablib
+
+from record import ContactRecord, Phone
+
+# record keys in the order Contact.add_contact / vcard_writer.create_vcard use them
+FIELDS = [
+    "first_name",
+    "last_name",
+    "additional_names",
+    "prefix",
+    "suffix",
+    "formatted_name",
+    "phone",
+    "email",
+    "address",
+    "org",
+    "title",
+    "url",
+    "bday",
+]
+
+_UNESCAPES = {"n": "\n", "N": "\n", "\\": "\\", ";": ";", ",": ","}
+
+
+def unescape_value(value: str) -> str:
+    """
+    Reverse vcard_encoding.escape_value.
+    """
+    if "\\" not in value:
+        return value
+    out = []
+    i, size = 0, len(value)
+    while i < size:
+        ch = value[i]
+        if ch == "\\" and i + 1 < size:
+            nxt = value[i + 1]
+            out.append(_UNESCAPES.get(nxt, nxt))
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def split_components(value: str) -> list:
+    """
+    Split a structured value (N, ADR) on the `;` that are not escaped.
+    """
+    parts, start, i = [], 0, 0
+    while i < len(value):
+        if value[i] == "\\":
+            i += 2
+            continue
+        if value[i] == ";":
+            parts.append(value[start:i])
+            start = i + 1
+        i += 1
+    parts.append(value[start:])
+    return parts
+
+
+def iter_lines(buf):
+    """
+    Yield the unfolded content lines of `buf` (bytes or an mmap) as str.
+    Continuation lines (starting with a space or tab) are joined back as bytes
+    before decoding, so a fold inside a multibyte character is harmless.
+    """
+    pos, size = 0, len(buf)
+    pending = None
+    while pos < size:
+        end = buf.find(b"\n", pos)
+        if end == -1:
+            end = size
+        line = buf[pos:end]
+        pos = end + 1
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        if line[:1] in (b" ", b"\t"):
+            if pending is not None:
+                pending += line[1:]
+            continue
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+        pending = line
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
+
+
+def parse_line(line: str):
+    """
+    Split a content line into (NAME, {PARAM: [values]}, raw value).
+    """
+    colon = line.find(":")
+    if '"' in line[:colon]:
+        # a quoted parameter value may itself contain ':'
+        quoted, colon = False, -1
+        for i, ch in enumerate(line):
+            if ch == '"':
+                quoted = not quoted
+            elif ch == ":" and not quoted:
+                colon = i
+                break
+    if colon == -1:
+        return None, {}, ""
+    name, *params = line[:colon].split(";")
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition("=")
+        if not val:
+            # vCard 2.1 style bare types, e.g. TEL;CELL:
+            key, val = "TYPE", key
+        parsed.setdefault(key.upper(), []).extend(
+            v.strip('"').upper() for v in val.split(",")
+        )
+    return name.upper(), parsed, line[colon + 1 :]
+
+
+def parse_vcards(buf):
+    """
+    Yield a record.ContactRecord per BEGIN:VCARD ... END:VCARD block of `buf`,
+    what Contact.add_contact and vcard_writer.create_vcard take.
+    """
+    record = None
+    for line in iter_lines(buf):
+        name, params, value = parse_line(line)
+        if name == "BEGIN" and value.upper() == "VCARD":
+            record = ContactRecord()
+        elif record is None:
+            continue
+        elif name == "END" and value.upper() == "VCARD":
+            yield record
+            record = None
+        elif name == "N":
+            parts = [unescape_value(p) for p in split_components(value)] + [""] * 5
+            (
+                record["last_name"],
+                record["first_name"],
+                record["additional_names"],
+                record["prefix"],
+                record["suffix"],
+            ) = parts[:5]
+        elif name == "FN":
+            record["formatted_name"] = unescape_value(value)
+        elif name == "TEL":
+            types = [t for t in params.get("TYPE", []) if t != "VOICE"]
+            record.phone.append(
+                Phone(unescape_value(value), types[0] if types else "CELL")
+            )
+        elif name == "ADR":
+            parts = split_components(value) + [""] * 3
+            record["address"] = record["address"] or unescape_value(parts[2])
+        elif name == "EMAIL":
+            record["email"] = record["email"] or unescape_value(value)
+        elif name in ("ORG", "TITLE", "URL", "BDAY"):
+            key = name.lower()
+            record[key] = record[key] or unescape_value(value)
+
+
+def iter_vcards(filePath):
+    """
+    Stream the contacts of a .vcf file one record at a time.
+    The file is memory-mapped, so even multi-GB backups are read in constant memory.
+    """
+    if os.path.getsize(filePath) == 0:
+        return
+    with open(filePath, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buf:
+        yield from parse_vcards(buf)
+
+
+def to_dataset(filePath) -> tablib.Dataset:
+    """
+    Load a .vcf file into a tablib Dataset, one row per contact and one
+    phone/phone_type column pair per TEL of the contact with the most numbers.
+    """
+    phones = max((len(r["phone"]) for r in iter_vcards(filePath)), default=0)
+    headers = [f for f in FIELDS if f != "phone"]
+    for i in range(1, phones + 1):
+        headers += [f"phone_{i}", f"phone_{i}_type"]
+    data = tablib.Dataset(headers=headers)
+    for record in iter_vcards(filePath):
+        row = [record[f] for f in FIELDS if f != "phone"]
+        for ph in record["phone"]:
+            row += [ph["phn"], ph["typ"]]
+        data.append(row + [""] * (len(headers) - len(row)))
+    return data
+
+
+def export_table(filePath, out) -> None:
+    """
+    Convert a .vcf file to a table, the format comes from the extension of `out`
+    (csv, tsv, xlsx, xls, ods, json, yaml, html...).
+    """
+    fmt = os.path.splitext(out)[1].lstrip(".").lower()
+    content = to_dataset(filePath).export(fmt)
+    mode = "wb" if isinstance(content, (bytes, bytearray)) else "w"
+    with open(out, mode, **({} if mode == "wb" else {"newline": ""})) as f:
+        f.write(content)
@@ -1,64 +1,301 @@
-import textwrap
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 
+from photo import photo_property
+from record import ContactRecord
+from vcard_encoding import escape_value, fold_line
 
-def escape_value(value: str) -> str:
-    """
-    Escape special characters in vCard values.
-    """
-    return (
-        value.replace("\\", "\\\\")
-        .replace(";", "\\;")
-        .replace(",", "\\,")
-        .replace("\n", "\\n")
-    )
-
-
-def fold_line(line: str) -> str:
-    """
-    Fold lines longer than 75 characters according to vCard 3.0 spec.
-    Continuation lines start with a single space.
-    """
-    if len(line) <= 75:
-        return line
-    parts = textwrap.wrap(line, width=75)
-    return "\r\n".join([parts[0]] + [" " + part for part in parts[1:]])
+# characters buffered by VCardWriter before they are handed to the file
+DEFAULT_FLUSH_SIZE = 1 << 16
 
 
-def create_vcard(data: dict) -> str:
+def create_vcard(data) -> str:
     """
-    Generate a vCard 3.0 formatted string from provided data.
+    Generate a vCard 3.0 formatted string from provided data, a
+    record.ContactRecord or a dict of its fields.
     """
+    if not isinstance(data, ContactRecord):
+        data = ContactRecord(data)
     lines = [
         "BEGIN:VCARD",
         "VERSION:3.0",
-        f"N:{escape_value(data['last_name'])};{escape_value(data['first_name'])};{escape_value(data.get('additional_names',''))};{escape_value(data.get('prefix',''))};{escape_value(data.get('suffix',''))}",
-        f"FN:{escape_value(data['formatted_name'])}",
+        f"N:{escape_value(data.last_name)};{escape_value(data.first_name)};{escape_value(data.additional_names)};{escape_value(data.prefix)};{escape_value(data.suffix)}",
+        f"FN:{escape_value(data.formatted_name)}",
     ]
 
-    if data.get("phone"):
-        for ph in data["phone"]:
-            lines.append(f"TEL;TYPE={ph['typ']},VOICE:{escape_value(ph['phn'])}")
-    if data.get("email"):
-        lines.append(f"EMAIL;TYPE=INTERNET,PREF:{escape_value(data['email'])}")
-    if data.get("address"):
-        adr = data["address"]
-        lines.append(f"ADR;TYPE=HOME:;;{escape_value(adr)};;;;")
-    if data.get("org"):
-        lines.append(f"ORG:{escape_value(data['org'])}")
-    if data.get("title"):
-        lines.append(f"TITLE:{escape_value(data['title'])}")
-    if data.get("url"):
-        lines.append(f"URL:{escape_value(data['url'])}")
-    if data.get("bday"):
-        lines.append(f"BDAY:{escape_value(data['bday'])}")
-
-    lines.append("END:VCARD\n")
+    for ph in data.phone:
+        lines.append(f"TEL;TYPE={ph.typ},VOICE:{escape_value(ph.phn)}")
+    if data.email:
+        lines.append(f"EMAIL;TYPE=INTERNET,PREF:{escape_value(data.email)}")
+    if data.address:
+        lines.append(f"ADR;TYPE=HOME:;;{escape_value(data.address)};;;;")
+    if data.org:
+        lines.append(f"ORG:{escape_value(data.org)}")
+    if data.title:
+        lines.append(f"TITLE:{escape_value(data.title)}")
+    if data.url:
+        lines.append(f"URL:{escape_value(data.url)}")
+    if data.bday:
+        lines.append(f"BDAY:{escape_value(data.bday)}")
 
     # Fold long lines
     folded = [fold_line(line) for line in lines]
+    # PHOTO properties come folded
+    if data.photo and (photo := photo_property(data.photo)):
+        folded.append(photo)
+    folded.append("END:VCARD\n")
     return "\r\n".join(folded)
 
 
+class VCardWriter:
+    """
+    Write rendered vCards incrementally to a path or any file-like sink.
+    Cards are buffered until `flush_size` characters are pending, then written
+    in one call, so memory stays flat however many cards go through it.
+    With `append`, a path is added to instead of overwritten.
+    """
+
+    def __init__(
+        self,
+        out="contact.vcf",
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        append: bool = False,
+    ):
+        if isinstance(out, (str, os.PathLike)):
+            mode = "a" if append else "w"
+            self.file = open(out, mode, encoding="utf-8", newline="")
+            self._owns_file = True
+        else:
+            self.file = out
+            self._owns_file = False
+        self.flush_size = flush_size
+        self.count = 0
+        self._buffer = []
+        self._pending = 0
+
+    def write(self, card: str) -> None:
+        self._buffer.append(card)
+        self._pending += len(card)
+        self.count += 1
+        if self._pending >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.file.write("".join(self._buffer))
+            self._buffer.clear()
+            self._pending = 0
+        self.file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._owns_file:
+            self.file.close()
+
+    def abort(self) -> None:
+        """
+        Close after a failed export. What was written stays, a checkpoint
+        resumes from it.
+        """
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class _Shard:
+    """
+    One output file of a ShardedWriter: cards are kept as encoded bytes and
+    hashed as they arrive, the file itself is written by `save`.
+    """
+
+    def __init__(self, path, slot):
+        self.path = path
+        self.slot = slot
+        self.cards = 0
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.chunks = []
+        self.pending = 0
+        self.file = None
+
+    def add(self, data: bytes) -> None:
+        self.chunks.append(data)
+        self.sha256.update(data)
+        self.cards += 1
+        self.size += len(data)
+        self.pending += len(data)
+
+    def save(self, flush_size: int = 0) -> None:
+        """
+        Append the pending chunks to the file (opened on first use); with
+        `flush_size` they are only written once that many bytes are waiting.
+        """
+        if self.pending < flush_size:
+            return
+        if self.file is None:
+            self.file = open(self.path, "wb")
+        self.file.write(b"".join(self.chunks))
+        self.chunks.clear()
+        self.pending = 0
+
+    def discard(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        self.chunks.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self) -> dict:
+        self.save()
+        self.file.close()
+        return {
+            "file": os.path.basename(self.path),
+            "cards": self.cards,
+            "bytes": self.size,
+            "sha256": self.sha256.hexdigest(),
+        }
+
+
+def shard_paths(out) -> tuple:
+    """
+    (manifest path, shard path pattern) of a sharded export to `out`.
+    """
+    base, ext = os.path.splitext(out)
+    return f"{base}.manifest.json", f"{base}-{{:05d}}{ext or '.vcf'}"
+
+
+def remove_shards(out) -> None:
+    """
+    Delete the manifest and every numbered shard of a sharded export to `out`.
+    """
+    manifest, pattern = shard_paths(out)
+    for path in [manifest] + glob.glob(
+        glob.escape(pattern).replace("{:05d}", "[0-9]" * 5)
+    ):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ShardedWriter:
+    """
+    Drop-in for VCardWriter that splits the export over several files.
+    A new shard starts once the current one holds `max_cards` cards or the next
+    card would take it past `max_bytes`. For out="contact.vcf" the shards are
+    contact-00001.vcf, contact-00002.vcf, ... and contact.manifest.json lists
+    each shard's card count, size and SHA-256.
+    With `workers` > 1 a finished shard is written out by a thread pool while
+    the next one fills, so at most `workers` + 1 shards are held in memory.
+    The manifest is only written by a close() after a complete export; an
+    export that raises (abort()) removes its shards instead.
+    """
+
+    def __init__(
+        self,
+        out="contact.vcf",
+        max_cards=None,
+        max_bytes=None,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        workers=1,
+    ):
+        self.manifest_path, self.pattern = shard_paths(out)
+        self.max_cards = max_cards
+        self.max_bytes = max_bytes
+        self.flush_size = flush_size
+        self.count = 0
+        self.shards = []
+        self._pool = ThreadPoolExecutor(workers) if workers > 1 else None
+        self._pending = []
+        self._workers = workers
+        self._shard = None
+
+    def _roll(self) -> None:
+        if self._shard is not None:
+            self._finish(self._shard)
+        slot = len(self.shards)
+        self._shard = _Shard(self.pattern.format(slot + 1), slot)
+        self.shards.append(None)
+
+    def _finish(self, shard) -> None:
+        if self._pool is None:
+            self.shards[shard.slot] = shard.close()
+            return
+        self._pending.append((shard.slot, self._pool.submit(shard.close)))
+        while len(self._pending) >= self._workers:
+            slot, future = self._pending.pop(0)
+            self.shards[slot] = future.result()
+
+    def write(self, card: str) -> None:
+        data = card.encode("utf-8")
+        shard = self._shard
+        if (
+            shard is None
+            or (self.max_cards and shard.cards >= self.max_cards)
+            or (
+                self.max_bytes
+                and shard.size
+                and shard.size + len(data) > self.max_bytes
+            )
+        ):
+            self._roll()
+            shard = self._shard
+        shard.add(data)
+        self.count += 1
+        if self._pool is None:
+            shard.save(self.flush_size)
+
+    def close(self) -> None:
+        if self._shard is not None:
+            self._finish(self._shard)
+            self._shard = None
+        for slot, future in self._pending:
+            self.shards[slot] = future.result()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown()
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"cards": self.count, "shards": self.shards}, f, indent=2)
+            f.write("\n")
+
+    def abort(self) -> None:
+        """
+        Close after a failed export: no manifest, and the shards written so far
+        (and a manifest left by an earlier run over them) are removed.
+        """
+        for _, future in self._pending:
+            future.exception()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._shard is not None:
+            self._shard.discard()
+            self._shard = None
+        for slot in range(len(self.shards)):
+            path = self.pattern.format(slot + 1)
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 if __name__ == "__main__":
     print("Let's collect details for your vCard (v3.0)")
     data = {}